@@ -0,0 +1,67 @@
+"""ADTL benchmark: parsing in memory vs through temporary CSV files
+
+Usage: python dev/benchmarks/bench_adtl.py [n_rows]
+"""
+
+import sys
+import time
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import adtl
+import pandas as pd
+
+from InsightBoard.parsers import adtl_tables, adtl_tables_from_files
+
+from synthetic import LINELIST_SCHEMA, synthetic_linelist, make_project
+
+SPECIFICATION = """
+[adtl]
+  name = "synthetic"
+  description = "Parses the synthetic linelist"
+
+  [adtl.tables]
+    linelist = {{ kind = "oneToOne", schema = "{schema}" }}
+
+[linelist]
+"""
+
+
+def write_specification(root: Path) -> Path:
+    # Map each field of the linelist to the column of the same name
+    make_project(root)
+    schema = (root / "schemas" / "linelist.schema.json").as_posix()
+    spec = SPECIFICATION.format(schema=schema)
+    for field in LINELIST_SCHEMA["properties"]:
+        spec += f'\n  [linelist."{field}"]\n    field = "{field}"\n'
+    spec_file = root / "synthetic.toml"
+    spec_file.write_text(spec)
+    return spec_file
+
+
+def main(n_rows: int = 100_000, repeat: int = 3):
+    df = synthetic_linelist(n_rows)
+    print(f"Synthetic linelist: {n_rows:,} rows, {len(df.columns)} columns")
+    with TemporaryDirectory() as temp_dir:
+        spec_file = write_specification(Path(temp_dir))
+        results = {}
+        for label, parse in [
+            ("in memory", adtl_tables),
+            ("temp files", adtl_tables_from_files),
+        ]:
+            # Best of several runs (the first also imports ADTL's dependencies)
+            elapsed = []
+            for _ in range(repeat):
+                parser = adtl.Parser(str(spec_file), quiet=True)
+                start = time.perf_counter()
+                (results[label],) = parse(parser, df, ["linelist"])
+                elapsed.append(time.perf_counter() - start)
+            print(f"{label:>10}: {min(elapsed):6.2f} s")
+        pd.testing.assert_frame_equal(
+            results["in memory"], results["temp files"], check_dtype=False
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
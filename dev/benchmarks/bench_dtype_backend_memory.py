@@ -0,0 +1,41 @@
+"""Memory benchmark: NumPy-backed vs Arrow-backed pandas dtypes on read
+
+Usage: python dev/benchmarks/bench_dtype_backend_memory.py [n_rows] [backend ...]
+"""
+
+import sys
+import time
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from InsightBoard.database import Database, DatabaseBackend, DtypeBackend
+
+from synthetic import synthetic_linelist, make_project
+
+
+def main(n_rows: int = 1_000_000, backends=None):
+    backends = backends or [DatabaseBackend.PARQUET, DatabaseBackend.SQLITE]
+    df = synthetic_linelist(n_rows)
+    print(f"Synthetic linelist: {n_rows:,} rows, {len(df.columns)} columns")
+    for backend in backends:
+        with TemporaryDirectory() as temp_dir:
+            data_folder = make_project(Path(temp_dir))
+            db = Database(backend, str(data_folder))
+            db.commit_table("linelist", df)
+            for dtype_backend in DtypeBackend:
+                db.set_dtype_backend(dtype_backend)
+                start = time.perf_counter()
+                table = db.read_table("linelist")
+                elapsed = time.perf_counter() - start
+                memory = table.memory_usage(deep=True).sum() / 2**20
+                print(
+                    f"{backend.value:>8} {dtype_backend.value:>8}: "
+                    f"{memory:8.1f} MiB  read {elapsed:6.2f} s"
+                )
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    backends = [DatabaseBackend[b.upper()] for b in sys.argv[2:]]
+    main(n_rows, backends)
@@ -0,0 +1,62 @@
+"""Read benchmark: InsightBoard's file readers vs pandas' default readers
+
+Usage: python dev/benchmarks/bench_readers.py [n_rows] [file type ...]
+"""
+
+import os
+import sys
+import time
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pandas as pd
+
+from InsightBoard import readers
+
+from synthetic import synthetic_linelist
+
+# File type -> (write the linelist to a path, read it with pandas' defaults)
+FILE_TYPES = {
+    "csv": (lambda df, p: df.to_csv(p, index=False), pd.read_csv),
+    "csv.gz": (lambda df, p: df.to_csv(p, index=False), pd.read_csv),
+    "xlsx": (lambda df, p: df.to_excel(p, index=False), pd.read_excel),
+    "parquet": (lambda df, p: df.to_parquet(p), pd.read_parquet),
+    "arrow": (lambda df, p: df.to_feather(p), pd.read_feather),
+    "jsonl": (
+        lambda df, p: df.to_json(p, orient="records", lines=True),
+        lambda p, **kwargs: pd.read_json(p, lines=True, **kwargs),
+    ),
+}
+
+
+def timed(read, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    read(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main(n_rows: int = 1_000_000, file_types=None):
+    file_types = file_types or list(FILE_TYPES)
+    df = synthetic_linelist(n_rows)
+    print(f"Synthetic linelist: {n_rows:,} rows, {len(df.columns)} columns")
+    print(f"Excel engine: {readers.EXCEL_ENGINE or 'openpyxl'}, {os.cpu_count()} CPUs")
+    with TemporaryDirectory() as temp_dir:
+        for file_type in file_types:
+            write, pandas_read = FILE_TYPES[file_type]
+            path = Path(temp_dir) / f"linelist.{file_type}"
+            write(df, path)
+            for dtype_backend in [None, "pyarrow"]:
+                kwargs = {"dtype_backend": dtype_backend} if dtype_backend else {}
+                pandas_time = timed(pandas_read, path, **kwargs)
+                readers_time = timed(readers.read_file, path, path.name, **kwargs)
+                print(
+                    f"{file_type:>8} {dtype_backend or 'numpy':>8}: "
+                    f"pandas {pandas_time:6.2f} s  readers {readers_time:6.2f} s  "
+                    f"({pandas_time / readers_time:4.1f}x)"
+                )
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    main(n_rows, sys.argv[2:])
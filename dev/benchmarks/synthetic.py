@@ -0,0 +1,64 @@
+"""Synthetic linelist generator shared by the benchmark scripts."""
+
+import json
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+
+LINELIST_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "type": "object",
+    "properties": {
+        "Case ID": {"type": "integer", "PrimaryKey": True},
+        "Age": {"type": "integer", "minimum": 0},
+        "Gender": {"type": "string", "enum": ["Male", "Female", "Other"]},
+        "Location": {"type": "string"},
+        "Date of Onset": {"type": "string", "format": "date"},
+        "Outcome": {
+            "type": ["string", "null"],
+            "enum": ["Recovered", "Deceased", None],
+        },
+        "Vaccination Status": {
+            "type": ["string", "null"],
+            "enum": ["Yes", "No", "Partial", "Unknown"],
+        },
+        "Days to Recovery": {"type": ["integer", "null"]},
+    },
+    "required": ["Case ID", "Age", "Gender", "Location", "Date of Onset"],
+}
+
+LOCATIONS = [f"Region {i:03d}" for i in range(250)]
+
+
+def synthetic_linelist(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    onset = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        rng.integers(0, 365, n_rows), unit="D"
+    )
+    outcome = rng.choice(["Recovered", "Deceased", None], n_rows, p=[0.8, 0.1, 0.1])
+    return pd.DataFrame(
+        {
+            "Case ID": np.arange(1, n_rows + 1),
+            "Age": rng.integers(0, 100, n_rows),
+            "Gender": rng.choice(["Male", "Female", "Other"], n_rows),
+            "Location": rng.choice(LOCATIONS, n_rows),
+            "Date of Onset": onset.strftime("%Y-%m-%d"),
+            "Outcome": outcome,
+            "Vaccination Status": rng.choice(
+                ["Yes", "No", "Partial", "Unknown"], n_rows
+            ),
+            "Days to Recovery": np.where(
+                outcome == "Recovered", rng.integers(1, 30, n_rows), None
+            ),
+        }
+    )
+
+
+def make_project(root: Path, table_name: str = "linelist") -> Path:
+    """Create a minimal project layout (schemas/ and data/) and return data folder"""
+    (root / "schemas").mkdir(parents=True, exist_ok=True)
+    (root / "data").mkdir(parents=True, exist_ok=True)
+    with open(root / "schemas" / f"{table_name}.schema.json", "w") as f:
+        json.dump(LINELIST_SCHEMA, f)
+    return root / "data"
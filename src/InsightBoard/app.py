@@ -6,6 +6,7 @@ from dash import html
 from pathlib import Path
 
 from InsightBoard.config import ConfigManager
+from InsightBoard.uploads import register_upload_routes
 from InsightBoard.utils import (
     get_projects_list,
     get_default_project,
@@ -55,3 +56,5 @@ app = dash.Dash(
 )
 app.scripts.config.serve_locally = True
 server = app.server  # Expose the server
+# Chunked file uploads (streamed to disk, see InsightBoard.uploads)
+register_upload_routes(server, app.config.routes_pathname_prefix)
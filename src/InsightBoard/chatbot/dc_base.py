@@ -179,7 +179,7 @@ class DataChat_Base(ABC):
 
     def sql_query(self, query: str) -> pd.DataFrame:
         projectObj = utils.get_project(self.project)
-        return projectObj.database.sql_query(query, self.table)
+        return projectObj.database.cached_sql_query(query, self.table)
 
     def execute_query(self, query, viz):
         try:
@@ -3,4 +3,13 @@ from InsightBoard.database.database import (  # noqa: F401
     DatabaseBackend,
     WritePolicy,
     BackupPolicy,
+    DtypeBackend,
+    HistoryEncoding,
+    SchemaChange,
+    CommitError,
+)
+from InsightBoard.database.commit_queue import (  # noqa: F401
+    CommitQueue,
+    CommitTicket,
+    get_commit_queue,
 )
@@ -0,0 +1,201 @@
+import re
+import json
+import hashlib
+import logging
+import threading
+import pyarrow as pa
+
+from pathlib import Path
+from collections import OrderedDict
+
+from InsightBoard.config import ConfigManager
+
+GENERATIONS_FILENAME = ".generations.json"
+
+# Split SQL into quoted segments (kept verbatim) and everything else
+_SQL_QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+
+def normalize_sql(query: str) -> str:
+    """Normalize SQL text for use as a cache key
+
+    Whitespace is collapsed and trailing semicolons removed, except within quoted
+    literals and identifiers, which are preserved verbatim.
+    """
+    parts = _SQL_QUOTED.split(query.strip().rstrip(";").strip())
+    return "".join(
+        part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts)
+    )
+
+
+def referenced_tables(query: str, tables: [str]) -> [str]:
+    """Return the tables (from a known list) that are referenced by an SQL query"""
+    return sorted(
+        table
+        for table in tables
+        if re.search(rf"(?<![\w]){re.escape(table)}(?![\w])", query)
+    )
+
+
+class TableGenerations:
+    """Per-table write generations, persisted in the data folder
+
+    A table's generation is incremented on every commit, so that cached results
+    can be keyed on the exact state of the tables they were computed from.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, data_folder: str):
+        self.filename = Path(data_folder) / GENERATIONS_FILENAME
+
+    def load(self) -> dict:
+        try:
+            with open(self.filename, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, table_names: [str]) -> dict:
+        generations = self.load()
+        return {table: generations.get(table, 0) for table in table_names}
+
+    def bump(self, table_name: str) -> int:
+        with self._lock:
+            generations = self.load()
+            generations[table_name] = generations.get(table_name, 0) + 1
+            self.filename.parent.mkdir(parents=True, exist_ok=True)
+            temp_filename = self.filename.with_suffix(".tmp")
+            with open(temp_filename, "w") as f:
+                json.dump(generations, f)
+            temp_filename.replace(self.filename)
+        QueryCache().invalidate(str(self.filename.parent), table_name)
+        return generations[table_name]
+
+
+class QueryCache:
+    """LRU cache of query results (as Arrow tables), with optional disk spill
+
+    Entries are keyed by the normalized query text and the write generation of each
+    table that the query references, so entries are never served once a commit has
+    bumped any of those generations. Configure with the [query_cache] section of the
+    InsightBoard configuration: 'max_memory_mb', 'spill_folder' and 'max_spill_mb'.
+    """
+
+    _instance = None
+
+    # Make QueryCache a singleton instance (shared by all projects and databases)
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(QueryCache, cls).__new__(cls, *args, **kwargs)
+            cls._instance._initialised = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialised:
+            return
+        self._initialised = True
+        self.lock = threading.RLock()
+        self.entries = OrderedDict()  # key -> (arrow table, data folder, tables)
+        self.memory_bytes = 0
+        config = ConfigManager()
+        self.configure(
+            max_memory_mb=config.get("query_cache.max_memory_mb", 256),
+            spill_folder=config.get("query_cache.spill_folder", None),
+            max_spill_mb=config.get("query_cache.max_spill_mb", 1024),
+        )
+
+    def configure(self, max_memory_mb=256, spill_folder=None, max_spill_mb=1024):
+        with self.lock:
+            self.max_memory_bytes = int(max_memory_mb * 2**20)
+            self.spill_folder = Path(spill_folder) if spill_folder else None
+            self.max_spill_bytes = int(max_spill_mb * 2**20)
+            if self.spill_folder:
+                self.spill_folder.mkdir(parents=True, exist_ok=True)
+            self.evict()
+
+    @staticmethod
+    def make_key(data_folder: str, kind: str, query: str, generations: dict) -> str:
+        key = json.dumps(
+            [str(data_folder), kind, query, sorted(generations.items())],
+        )
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> pa.Table | None:
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+        # Fall back to the disk spill (entries are immutable, so no lock is needed)
+        spill_file = self.spill_path(key)
+        if spill_file and spill_file.exists():
+            try:
+                with pa.memory_map(str(spill_file), "r") as source:
+                    table = pa.ipc.open_file(source).read_all()
+                spill_file.touch()  # Record access for spill eviction
+                return table
+            except (OSError, pa.ArrowInvalid) as e:
+                logging.warning(
+                    "Discarding unreadable cache file %s: %s", spill_file, e
+                )
+                spill_file.unlink(missing_ok=True)
+        return None
+
+    def put(self, key: str, table: pa.Table, data_folder: str, tables: [str]):
+        if table.nbytes > self.max_memory_bytes:
+            return  # Too large to cache
+        with self.lock:
+            if key in self.entries:
+                self.memory_bytes -= self.entries.pop(key)[0].nbytes
+            self.entries[key] = (table, str(data_folder), set(tables))
+            self.memory_bytes += table.nbytes
+            self.evict()
+
+    def evict(self):
+        # Evict least-recently used entries to disk (if enabled) until within bounds
+        with self.lock:
+            while self.entries and self.memory_bytes > self.max_memory_bytes:
+                key, (table, _, _) = self.entries.popitem(last=False)
+                self.memory_bytes -= table.nbytes
+                self.spill(key, table)
+
+    def invalidate(self, data_folder: str, table_name: str):
+        # Drop in-memory entries computed from a table (spilled entries are keyed
+        #  on the old generation, so can never be served and age out of the spill)
+        with self.lock:
+            for key, (table, folder, tables) in list(self.entries.items()):
+                if folder == str(data_folder) and table_name in tables:
+                    del self.entries[key]
+                    self.memory_bytes -= table.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.memory_bytes = 0
+            if self.spill_folder:
+                for spill_file in self.spill_folder.glob("*.arrow"):
+                    spill_file.unlink(missing_ok=True)
+
+    def spill_path(self, key: str) -> Path | None:
+        if not self.spill_folder:
+            return None
+        return self.spill_folder / f"{key}.arrow"
+
+    def spill(self, key: str, table: pa.Table):
+        spill_file = self.spill_path(key)
+        if not spill_file or table.nbytes > self.max_spill_bytes:
+            return
+        temp_file = spill_file.with_suffix(".tmp")
+        with pa.OSFile(str(temp_file), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        temp_file.replace(spill_file)
+        # Remove least-recently used spill files until within bounds
+        spill_files = sorted(
+            self.spill_folder.glob("*.arrow"), key=lambda f: f.stat().st_mtime
+        )
+        spill_bytes = sum(f.stat().st_size for f in spill_files)
+        while spill_files and spill_bytes > self.max_spill_bytes:
+            oldest = spill_files.pop(0)
+            spill_bytes -= oldest.stat().st_size
+            oldest.unlink(missing_ok=True)
@@ -0,0 +1,132 @@
+import getpass
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from pathlib import Path
+
+COMMIT_LOG_FILENAME = "_commit_log.parquet"
+
+COMMIT_LOG_SCHEMA = pa.schema(
+    [
+        pa.field("commit_id", pa.int64(), nullable=False),
+        pa.field("table_name", pa.string()),
+        pa.field("timestamp", pa.string()),
+        pa.field("user", pa.string()),
+        pa.field("parser", pa.string()),
+        pa.field("source", pa.string()),
+        pa.field("rows_inserted", pa.int64()),
+        pa.field("rows_updated", pa.int64()),
+        pa.field("rows_deleted", pa.int64()),
+        pa.field("rows_unchanged", pa.int64()),
+    ]
+)
+
+
+def current_user() -> str | None:
+    try:
+        return getpass.getuser()
+    except (OSError, KeyError):
+        return None
+
+
+class CommitLog:
+    """Log of commits to the database, one record per commit
+
+    Versioned rows reference their commit by an integer '_commit_id', rather than
+    repeating the commit's details in every row.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, data_folder: str):
+        self.filename = Path(data_folder) / COMMIT_LOG_FILENAME
+
+    def read(self) -> pd.DataFrame:
+        return self.read_table().to_pandas()
+
+    def read_table(self) -> pa.Table:
+        if not self.filename.exists():
+            return COMMIT_LOG_SCHEMA.empty_table()
+        return pq.read_table(self.filename, schema=COMMIT_LOG_SCHEMA)
+
+    def get(self, commit_id: int) -> dict | None:
+        log = self.read()
+        records = log[log["commit_id"] == commit_id].to_dict("records")
+        return records[0] if records else None
+
+    def begin(self, table_name: str, timestamp: str, commit_info: dict = None) -> int:
+        # Reserve a commit id; row counts are recorded once the commit completes
+        commit_info = commit_info or {}
+        with self._lock:
+            table = self.read_table()
+            commit_id = (pc.max(table["commit_id"]).as_py() or 0) + 1
+            record = {
+                "commit_id": commit_id,
+                "table_name": table_name,
+                "timestamp": timestamp,
+                "user": commit_info.get("user") or current_user(),
+                "parser": commit_info.get("parser"),
+                "source": commit_info.get("source"),
+            }
+            self.write(pa.concat_tables([table, self.to_table([record])]))
+        return commit_id
+
+    def finish(
+        self,
+        commit_id: int,
+        inserted: int,
+        updated: int,
+        deleted: int = 0,
+        unchanged: int = 0,
+    ):
+        with self._lock:
+            table = self.read_table()
+            mask = pc.equal(table["commit_id"], commit_id)
+            counts = {
+                "rows_inserted": inserted,
+                "rows_updated": updated,
+                "rows_deleted": deleted,
+                "rows_unchanged": unchanged,
+            }
+            for name, count in counts.items():
+                column = pc.if_else(mask, pa.scalar(count, pa.int64()), table[name])
+                table = table.set_column(
+                    table.schema.get_field_index(name), name, column
+                )
+            self.write(table)
+
+    def discard(self, commit_id: int):
+        # Remove a reserved commit (e.g. if the write failed)
+        with self._lock:
+            table = self.read_table()
+            mask = pc.not_equal(table["commit_id"], commit_id)
+            self.write(table.filter(mask))
+
+    def append_records(self, records: [dict]) -> [int]:
+        # Record historical commits (e.g. when migrating), returning their ids
+        with self._lock:
+            table = self.read_table()
+            first_id = (pc.max(table["commit_id"]).as_py() or 0) + 1
+            commit_ids = list(range(first_id, first_id + len(records)))
+            records = [
+                {**record, "commit_id": commit_id}
+                for commit_id, record in zip(commit_ids, records, strict=True)
+            ]
+            self.write(pa.concat_tables([table, self.to_table(records)]))
+        return commit_ids
+
+    def to_table(self, records: [dict]) -> pa.Table:
+        columns = {
+            field.name: [record.get(field.name) for record in records]
+            for field in COMMIT_LOG_SCHEMA
+        }
+        return pa.Table.from_pydict(columns, schema=COMMIT_LOG_SCHEMA)
+
+    def write(self, table: pa.Table):
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        temp_filename = self.filename.with_suffix(".tmp")
+        pq.write_table(table, temp_filename)
+        temp_filename.replace(self.filename)
@@ -0,0 +1,283 @@
+import uuid
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from InsightBoard.database.db_base import CommitError, WritePolicy
+
+# Number of tickets kept (for status queries) once their commits have completed
+MAX_TICKETS = 100
+
+# Commit queues, one per database (data folder and backend)
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+class CommitTicket:
+    """Handle on a queued commit of one or more tables
+
+    'future' resolves to the row counts of each dataset (as returned by
+    commit_tables), or raises CommitError listing the tables that failed.
+    """
+
+    def __init__(self, ticket_id: str, table_names: [str]):
+        self.ticket_id = ticket_id
+        self.table_names = table_names
+        self.counts = [None] * len(table_names)
+        self.committed = {}
+        self.failed = {}
+        self.started = False
+        self.future = Future()
+        self._remaining = len(table_names)
+
+    @property
+    def status(self) -> str:
+        if self.future.done():
+            return "failed" if self.future.exception() else "committed"
+        return "committing" if self.started else "queued"
+
+    def result(self, timeout: float = None) -> [dict]:
+        return self.future.result(timeout)
+
+    def record(self, index: int, counts: dict = None, error: Exception = None):
+        # Record the outcome of one dataset; resolve the ticket after the last
+        table_name = self.table_names[index]
+        if error is not None:
+            self.failed[table_name] = error
+        else:
+            self.counts[index] = counts
+            self.committed[table_name] = counts
+        self._remaining -= 1
+        if self._remaining == 0:
+            if self.failed:
+                self.future.set_exception(CommitError(self.committed, self.failed))
+            else:
+                self.future.set_result(self.counts)
+
+
+class CommitQueue:
+    """Serialise commits to the database through a single writer thread
+
+    Datasets are queued per table. Consecutive datasets for a table with the same
+    write policy, commit details and columns are coalesced, so that several commits
+    submitted close together are written with one merge and one rewrite of the
+    table. Each ticket reports the row counts of its own datasets. Use
+    get_commit_queue for the (single) queue of a database.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.tickets = OrderedDict()
+        self._pending = OrderedDict()  # table name -> deque of batches
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(
+        self,
+        table_names: [str],
+        datasets: list,
+        write_policy: WritePolicy = None,
+        commit_info: dict = None,
+    ) -> CommitTicket:
+        # Queue datasets (DataFrames, or lists of records) for commit
+        if not isinstance(table_names, list):
+            table_names = [table_names]
+        if not isinstance(datasets, list):
+            datasets = [datasets]
+        if len(table_names) != len(datasets):
+            raise ValueError(
+                f"Length of table_names ({len(table_names)}) does not match length of "
+                f"datasets ({len(datasets)})"
+            )
+        write_policy = write_policy or self.database.write_policy
+        if not isinstance(write_policy, WritePolicy):
+            raise ValueError("WritePolicy must be an instance of WritePolicy.")
+        with self._lock:
+            ticket = CommitTicket(uuid.uuid4().hex, table_names)
+            self.tickets[ticket.ticket_id] = ticket
+            self.prune_tickets()
+            for index, (table_name, data) in enumerate(zip(table_names, datasets)):
+                df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+                batch = {
+                    "ticket": ticket,
+                    "index": index,
+                    "df": df,
+                    "write_policy": write_policy,
+                    "commit_info": commit_info,
+                }
+                self._pending.setdefault(table_name, deque()).append(batch)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self.run, name="commit-queue", daemon=True
+                )
+                self._worker.start()
+        return ticket
+
+    def get(self, ticket_id: str) -> CommitTicket | None:
+        return self.tickets.get(ticket_id)
+
+    def prune_tickets(self):
+        # Forget the oldest completed tickets
+        completed = [
+            ticket_id
+            for ticket_id, ticket in self.tickets.items()
+            if ticket.future.done()
+        ]
+        for ticket_id in completed[: max(0, len(self.tickets) - MAX_TICKETS)]:
+            del self.tickets[ticket_id]
+
+    def run(self):
+        # Writer loop: commit pending batches until the queue is empty
+        while True:
+            with self._lock:
+                commits = self.take_batches()
+                if not commits:
+                    self._worker = None
+                    return
+            self.commit(commits)
+
+    def take_batches(self) -> [tuple]:
+        # Remove the leading run of compatible batches of each table
+        commits = []
+        for table_name in list(self._pending):
+            queue = self._pending[table_name]
+            batches = [queue.popleft()]
+            key = self.batch_key(batches[0])
+            while queue and self.batch_key(queue[0]) == key:
+                batches.append(queue.popleft())
+            if not queue:
+                del self._pending[table_name]
+            for batch in batches:
+                batch["ticket"].started = True
+            commits.append((table_name, batches))
+        return commits
+
+    def batch_key(self, batch: dict) -> tuple:
+        return (
+            batch["write_policy"],
+            tuple(sorted((batch["commit_info"] or {}).items())),
+            tuple(batch["df"].columns),
+        )
+
+    def coalesce(self, table_name: str, batches: [dict]) -> pd.DataFrame:
+        # Combine batches into one dataset; later batches replace earlier rows on
+        #  upsert, and earlier rows are kept on append
+        if len(batches) == 1:
+            return batches[0]["df"]
+        df = pd.concat([batch["df"] for batch in batches], ignore_index=True)
+        primary_key = self.database.get_primary_key(table_name)
+        if primary_key and primary_key in df.columns:
+            keep = (
+                "last" if batches[0]["write_policy"] == WritePolicy.UPSERT else "first"
+            )
+            df = df.drop_duplicates(subset=primary_key, keep=keep)
+        return df
+
+    def commit(self, commits: [tuple]):
+        # Tables sharing a write policy and commit details are committed together,
+        #  so that the backend may write them concurrently
+        groups = OrderedDict()
+        for table_name, batches in commits:
+            key = self.batch_key(batches[0])[:2]
+            groups.setdefault(key, []).append((table_name, batches))
+        database = self.database
+        for group in groups.values():
+            write_policy = group[0][1][0]["write_policy"]
+            commit_info = group[0][1][0]["commit_info"]
+            table_names = [table_name for table_name, _ in group]
+            results, failed, batch_counts = {}, {}, {}
+            try:
+                # Counts of each coalesced batch, from the records before the commit
+                for table_name, batches in group:
+                    if len(batches) > 1:
+                        batch_counts[table_name] = self.batch_counts(
+                            database, table_name, batches
+                        )
+                datasets = [
+                    self.coalesce(table_name, batches) for table_name, batches in group
+                ]
+                database.set_write_policy(write_policy)
+                counts = database.commit_tables(table_names, datasets, commit_info)
+                results = dict(zip(table_names, counts))
+            except CommitError as e:
+                results, failed = e.committed, e.failed
+            except Exception as e:
+                logging.error("Error committing queued tables: %s", e)
+                failed = {table_name: e for table_name in table_names}
+            with self._lock:
+                for table_name, batches in group:
+                    counts = batch_counts.get(
+                        table_name, [results.get(table_name)] * len(batches)
+                    )
+                    for batch, batch_count in zip(batches, counts):
+                        batch["ticket"].record(
+                            batch["index"],
+                            batch_count if table_name in results else None,
+                            failed.get(table_name),
+                        )
+
+    def batch_counts(self, database, table_name: str, batches: [dict]) -> [dict]:
+        """Row counts of each batch, as if the batches were committed one after
+        another (rather than coalesced): rows are 'inserted' if their key is new,
+        'unchanged' if their values match the record (or on append), and 'updated'
+        otherwise"""
+        primary_key = database.get_primary_key(table_name)
+        counts = [{"inserted": 0, "updated": 0, "unchanged": 0} for _ in batches]
+        if not primary_key:
+            for count, batch in zip(counts, batches):
+                count["inserted"] = len(batch["df"])
+            return counts
+        keys = pd.concat([batch["df"][primary_key] for batch in batches]).unique()
+        try:
+            stored = database.read_rows(table_name, keys.tolist())
+        except Exception:
+            stored = pd.DataFrame(columns=[primary_key])  # Table not yet written
+        records = {
+            row[primary_key]: row for row in stored.astype(object).to_dict("records")
+        }
+        for count, batch in zip(counts, batches):
+            for row in batch["df"].to_dict("records"):
+                record = records.get(row[primary_key])
+                if record is None:
+                    count["inserted"] += 1
+                    records[row[primary_key]] = row
+                elif batch["write_policy"] == WritePolicy.APPEND or all(
+                    same_value(value, record.get(name)) for name, value in row.items()
+                ):
+                    count["unchanged"] += 1
+                else:
+                    count["updated"] += 1
+                    records[row[primary_key]] = {**record, **row}
+        return counts
+
+
+def same_value(a, b) -> bool:
+    # Whether two values are equal (missing values are equal; arrays read from a
+    #  table are compared as lists)
+    a, b = [x.tolist() if isinstance(x, np.ndarray) else x for x in (a, b)]
+    missing = [pd.api.types.is_scalar(x) and pd.isna(x) for x in (a, b)]
+    if any(missing):
+        return all(missing)
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+def get_commit_queue(database) -> CommitQueue:
+    """The commit queue of a database, shared by every Database instance with the
+    same data folder and backend, so that each database has a single writer"""
+    key = (Path(database.data_folder).resolve(), database.BACKEND)
+    with _queues_lock:
+        queue = _queues.get(key)
+        if queue is None:
+            queue = _queues[key] = CommitQueue(database)
+        else:
+            # Commit with the most recent instance (and so its current settings)
+            queue.database = database
+        return queue
@@ -2,11 +2,15 @@ from InsightBoard.database.db_base import (  # noqa: F401
     DatabaseBackend,
     WritePolicy,
     BackupPolicy,
+    DtypeBackend,
+    HistoryEncoding,
+    SchemaChange,
+    CommitError,
     DatabaseBase,
 )
 from InsightBoard.database.db_parquet import DatabaseParquet, DatabaseParquetVersioned
-from InsightBoard.database.db_sqlite import DatabaseSQLite
-from InsightBoard.database.db_duckdb import DatabaseDuckDB
+from InsightBoard.database.db_sqlite import DatabaseSQLite, DatabaseSQLiteVersioned
+from InsightBoard.database.db_duckdb import DatabaseDuckDB, DatabaseDuckDBVersioned
 
 
 class Database:
@@ -22,7 +26,11 @@ class Database:
                 return DatabaseParquetVersioned(data_folder)
             case DatabaseBackend.SQLITE:
                 return DatabaseSQLite(data_folder)
+            case DatabaseBackend.SQLITE_VERSIONED:
+                return DatabaseSQLiteVersioned(data_folder)
             case DatabaseBackend.DUCKDB:
                 return DatabaseDuckDB(data_folder)
+            case DatabaseBackend.DUCKDB_VERSIONED:
+                return DatabaseDuckDBVersioned(data_folder)
             case _:
                 raise ValueError(f"Backend '{backend}' not supported.")
@@ -1,18 +1,47 @@
+import os
+import re
 import json
+import logging
+import threading
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 
 from abc import ABC, abstractmethod
 from enum import Enum
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from cachetools import cached, TTLCache
 
+from InsightBoard.database.commit_log import CommitLog
+from InsightBoard.database.cache import (
+    QueryCache,
+    TableGenerations,
+    normalize_sql,
+    referenced_tables,
+)
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+# Content hash of each stored row, used to skip rows that a commit would not change
+ROW_HASH_COLUMN = "_row_hash"
+
+# Maximum number of rows returned by a table search
+DEFAULT_SEARCH_LIMIT = 1000
+
 
 class DatabaseBackend(Enum):
     DEFAULT = "parquet"
     PARQUET = "parquet"
     PARQUET_VERSIONED = "parquet_versioned"
     SQLITE = "sqlite"
+    SQLITE_VERSIONED = "sqlite_versioned"
     DUCKDB = "duckdb"
+    DUCKDB_VERSIONED = "duckdb_versioned"
 
 
 class WritePolicy(Enum):
@@ -27,6 +56,80 @@ class BackupPolicy(Enum):
     )
 
 
+class DtypeBackend(Enum):
+    NUMPY = "numpy"  # NumPy-backed dtypes (pandas default, object dtype for strings)
+    PYARROW = "pyarrow"  # Arrow-backed dtypes (pd.ArrowDtype), lower memory use
+
+
+class HistoryEncoding(Enum):
+    FULL = "full"  # Each version is a complete copy of the record
+    DELTA = "delta"  # Updates record only the fields that changed
+
+
+class SchemaChange(Enum):
+    ADD_COLUMN = "add_column"  # New (nullable) field in the schema
+    WIDEN_TYPE = "widen_type"  # Stored values are representable in the new type
+    CHANGE_TYPE = "change_type"  # Any other type change (requires a rewrite)
+
+
+class CommitError(Exception):
+    """Some tables of a multi-table commit could not be written
+
+    Each table is committed independently, so a failure does not undo the others:
+    'committed' maps the tables that were written to their row counts, and 'failed'
+    maps the tables that were not to the exception raised.
+    """
+
+    def __init__(self, committed: dict, failed: dict):
+        self.committed = committed
+        self.failed = failed
+        errors = "; ".join(f"'{table}': {e}" for table, e in failed.items())
+        written = ", ".join(f"'{table}'" for table in committed) or "none"
+        super().__init__(
+            f"Failed to commit {len(failed)} table(s) ({errors}). "
+            f"Tables committed: {written}."
+        )
+
+
+# Default number of tables committed concurrently (where the backend allows it)
+DEFAULT_COMMIT_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def search_terms(query: str) -> [str]:
+    # Lower-case words of a search query; a trailing '*' matches words by prefix
+    return re.findall(r"\w+\*?", query.lower())
+
+
+def search_tokens(df: pd.DataFrame, keys: pd.Series) -> pd.DataFrame:
+    # Distinct (token, key) pairs: the lower-case words in the fields of each row
+    text = pd.Series("", index=df.index)
+    for col in df.columns:
+        # Text first, so that nulls of Arrow-backed (e.g. numeric) columns can be ''
+        values = df[col].astype(object)
+        text = text + " " + values.where(df[col].notna(), "").astype(str)
+    tokens = pd.DataFrame(
+        {"token": text.str.lower().str.findall(r"\w+"), "key": keys}
+    ).explode("token")
+    return tokens.dropna().drop_duplicates().reset_index(drop=True)
+
+
+def parse_array_string(x: str) -> list | None:
+    """Parse the string representation of a list, e.g. '["a", "b"]' or '[a, b]'"""
+    x = x.strip()
+    if not x:
+        return None
+    try:
+        value = json.loads(x)
+        if isinstance(value, list):
+            return value
+    except json.JSONDecodeError:
+        pass
+    if x.startswith("[") and x.endswith("]"):
+        x = x[1:-1]
+    items = [item.strip().strip("'\"") for item in x.split(",")]
+    return [item for item in items if item]
+
+
 class DatabaseBase(ABC):
     def __init__(
         self,
@@ -37,6 +140,14 @@ class DatabaseBase(ABC):
         self.data_folder = data_folder
         self.write_policy = WritePolicy.UPSERT
         self.backup_policy = BackupPolicy.NONE
+        self.dtype_backend = DtypeBackend.NUMPY
+        self.history_encoding = HistoryEncoding.FULL
+        self.search_index = False
+        self.backend_options = {}
+        self.commit_workers = DEFAULT_COMMIT_WORKERS
+        # Whether tables are stored independently, so can be committed concurrently
+        self.parallel_commits = False
+        self.commit_log = CommitLog(data_folder)
 
     def set_write_policy(self, policy: WritePolicy):
         if not isinstance(policy, WritePolicy):
@@ -48,7 +159,160 @@ class DatabaseBase(ABC):
             raise ValueError("BackupPolicy must be an instance of BackupPolicy.")
         self.backup_policy = policy
 
-    def commit_tables_dict(self, table_names: [str], datasets: [dict]):
+    def set_dtype_backend(self, dtype_backend: DtypeBackend):
+        if not isinstance(dtype_backend, DtypeBackend):
+            raise ValueError("DtypeBackend must be an instance of DtypeBackend.")
+        self.dtype_backend = dtype_backend
+
+    def set_history_encoding(self, history_encoding: HistoryEncoding):
+        # Storage of record versions (used by backends that keep version history)
+        if not isinstance(history_encoding, HistoryEncoding):
+            raise ValueError("HistoryEncoding must be an instance of HistoryEncoding.")
+        self.history_encoding = history_encoding
+
+    def set_search_index(self, search_index: bool):
+        # Maintain a full-text index of each table (with a primary key) on commit
+        if not isinstance(search_index, bool):
+            raise ValueError("Search index must be True or False.")
+        self.search_index = search_index
+
+    def set_backend_options(self, options: dict):
+        # Backend-specific options (e.g. SQLite PRAGMAs); ignored by other backends
+        if not isinstance(options, dict):
+            raise ValueError("Backend options must be a dictionary.")
+        self.backend_options = {**self.backend_options, **options}
+
+    def set_commit_workers(self, commit_workers: int):
+        # Maximum number of tables committed concurrently (1 commits in sequence)
+        if not isinstance(commit_workers, int) or commit_workers < 1:
+            raise ValueError("Commit workers must be a positive integer.")
+        self.commit_workers = commit_workers
+
+    def dtype_backend_kwargs(self) -> dict:
+        # Keyword arguments for pandas readers (read_sql_query, read_csv, etc.)
+        if self.dtype_backend == DtypeBackend.PYARROW:
+            return {"dtype_backend": "pyarrow"}
+        return {}
+
+    def table_to_pandas(
+        self, table: pa.Table, dtype_backend: DtypeBackend = None
+    ) -> pd.DataFrame:
+        dtype_backend = dtype_backend or self.dtype_backend
+        if dtype_backend == DtypeBackend.PYARROW:
+            # Zero-copy where possible; list columns remain Arrow lists
+            return table.to_pandas(types_mapper=pd.ArrowDtype)
+        df = table.to_pandas()
+        # Arrow list columns arrive as numpy arrays; present them as python lists
+        for field in table.schema:
+            if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+                df[field.name] = pd.Series(
+                    table[field.name].to_pylist(), index=df.index, dtype=object
+                )
+        return df
+
+    def bump_generation(self, table_name: str) -> int:
+        # Record a write to the table; invalidates cached results that depend on it
+        return TableGenerations(self.data_folder).bump(table_name)
+
+    def cached_read_table(self, table_name: str) -> pd.DataFrame:
+        return self.cached_result(
+            "read_table", table_name, [table_name], lambda: self.read_table(table_name)
+        )
+
+    def cached_sql_query(self, query: str, tablename: str) -> pd.DataFrame:
+        # The normalized text is only the cache key; the query is run as written
+        #  (normalizing joins lines, so a '--' comment would swallow the rest)
+        key = normalize_sql(query)
+        tables = set(referenced_tables(key, self.get_tables_list())) | {tablename}
+        return self.cached_result(
+            "sql_query", key, sorted(tables), lambda: self.sql_query(query, tablename)
+        )
+
+    def cached_result(self, kind: str, query: str, tables: [str], func):
+        # Serve results from the shared query cache, keyed on the query and the write
+        #  generations of the tables it depends on; results are stored as Arrow
+        cache = QueryCache()
+        generations = TableGenerations(self.data_folder).get(tables)
+        key = cache.make_key(
+            self.data_folder, f"{self.BACKEND.value}:{kind}", query, generations
+        )
+        table = cache.get(key)
+        if table is None:
+            df = func()
+            try:
+                table = pa.Table.from_pandas(df)
+            except (pa.ArrowException, TypeError, ValueError):
+                return df  # Not representable in Arrow; return uncached
+            cache.put(key, table, self.data_folder, tables)
+        return self.table_to_pandas(table)
+
+    def analytics_connect(self):
+        # In-memory DuckDB connection exposing every project table as a view
+        if not duckdb:
+            raise ImportError(
+                "Multi-table queries require DuckDB, "
+                "which is available as an optional dependency. "
+                "Please install it using 'pip install \"insightboard[duckdb]\"'."
+            )
+        conn = duckdb.connect()
+        for table_name in self.get_tables_list():
+            self.create_analytics_view(conn, table_name)
+        return conn
+
+    def analytics_query(self, query: str) -> pd.DataFrame:
+        # Run a (multi-table) query in the DuckDB analytical engine
+        conn = self.analytics_connect()
+        try:
+            return self.table_to_pandas(conn.execute(query).arrow())
+        finally:
+            conn.close()
+
+    def create_analytics_view(self, conn, table_name: str):
+        # Backends expose tables without copying where DuckDB can scan them directly
+        conn.register(table_name, self.read_table(table_name))
+
+    def search_table(
+        self, table_name: str, query: str, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> pd.DataFrame:
+        """Rows in which every word of the query appears (in any field)
+
+        Uses the table's full-text index where enabled, otherwise scans the table.
+        """
+        terms = search_terms(query)
+        if not terms:
+            return self.cached_read_table(table_name).head(limit)
+        if self.search_index and self.get_primary_key(table_name):
+            df = self.search_index_query(table_name, terms, limit)
+            if df is not None:
+                return df
+        return self.search_scan(table_name, terms, limit)
+
+    def search_scan(self, table_name: str, terms: [str], limit: int) -> pd.DataFrame:
+        df = self.cached_read_table(table_name)
+        tokens = search_tokens(df, pd.Series(range(len(df)), index=df.index))
+        matches = None
+        for term in terms:
+            if term.endswith("*"):
+                rows = tokens.loc[tokens["token"].str.startswith(term[:-1]), "key"]
+            else:
+                rows = tokens.loc[tokens["token"] == term, "key"]
+            matches = set(rows) if matches is None else matches & set(rows)
+        return df.take(sorted(matches)[:limit])
+
+    def search_index_query(
+        self, table_name: str, terms: [str], limit: int
+    ) -> pd.DataFrame | None:
+        # Search the table's full-text index (None if the backend has no index)
+        return None
+
+    def read_rows(self, table_name: str, keys: list) -> pd.DataFrame:
+        # Rows of the table with the given primary keys
+        df = self.cached_read_table(table_name)
+        return df[df[self.get_primary_key(table_name)].isin(keys)].copy()
+
+    def commit_tables_dict(
+        self, table_names: [str], datasets: [dict], commit_info: dict = None
+    ):
         if not isinstance(table_names, list):
             table_names = [table_names]
         if not isinstance(datasets, list):
@@ -60,9 +324,11 @@ class DatabaseBase(ABC):
             )
         for idx, data in enumerate(datasets):
             datasets[idx] = pd.DataFrame(data)
-        self.commit_tables(table_names, datasets)
+        return self.commit_tables(table_names, datasets, commit_info)
 
-    def commit_tables(self, table_names: [str], datasets: [pd.DataFrame]):
+    def commit_tables(
+        self, table_names: [str], datasets: [pd.DataFrame], commit_info: dict = None
+    ):
         if not isinstance(table_names, list):
             table_names = [table_names]
         if not isinstance(datasets, list):
@@ -72,10 +338,39 @@ class DatabaseBase(ABC):
                 f"Length of table_names ({len(table_names)}) does not match length of "
                 "datasets ({len(datasets)})"
             )
-        for table_name, df in zip(table_names, datasets, strict=True):
-            self.commit_table(table_name, df)
+        # Commits to the same table are made in order, by the same worker
+        commits = {}
+        for idx, table_name in enumerate(table_names):
+            commits.setdefault(table_name, []).append(idx)
+        counts = [None] * len(datasets)
+        committed, failed = {}, {}
 
-    @cached(TTLCache(maxsize=1, ttl=10))
+        def commit(table_name):
+            try:
+                for idx in commits[table_name]:
+                    counts[idx] = self.commit_table(
+                        table_name, datasets[idx], commit_info
+                    )
+                committed[table_name] = {
+                    key: sum(counts[idx][key] for idx in commits[table_name])
+                    for key in ["inserted", "updated", "unchanged"]
+                }
+            except Exception as e:
+                logging.error("Error committing table '%s': %s", table_name, e)
+                failed[table_name] = e
+
+        workers = self.commit_workers if self.parallel_commits else 1
+        if workers > 1 and len(commits) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(commit, commits))
+        else:
+            for table_name in commits:
+                commit(table_name)
+        if failed:
+            raise CommitError(committed, failed)
+        return counts
+
+    @cached(TTLCache(maxsize=1, ttl=10), lock=threading.RLock())
     def get_primary_key(self, table_name: str):
         schema = self.get_table_schema(table_name)
         # Find field that has the 'PrimaryKey' set to 'True'
@@ -89,14 +384,14 @@ class DatabaseBase(ABC):
             raise ValueError(f"Table '{table_name}' has more than one primary key.")
         return primary_key
 
-    @cached(TTLCache(maxsize=1, ttl=10))
+    @cached(TTLCache(maxsize=1, ttl=10), lock=threading.RLock())
     def get_primary_keys(self, table_name: str):
         primary_key = self.get_primary_key(table_name)
         if not primary_key:
             return []
         return self.read_table_column(table_name, primary_key).tolist()
 
-    @cached(TTLCache(maxsize=1, ttl=10))
+    @cached(TTLCache(maxsize=1, ttl=10), lock=threading.RLock())
     def get_table_schema(self, table_name: str):
         schema_filename = (
             Path(self.data_folder).parent / "schemas" / f"{table_name}.schema.json"
@@ -108,6 +403,74 @@ class DatabaseBase(ABC):
             return {}
         return schema
 
+    def get_array_columns(self, table_name: str) -> [str]:
+        # Return the names of fields declared with json type 'array'
+        schema = self.get_table_schema(table_name)
+        array_columns = []
+        for field_name, props in schema.get("properties", {}).items():
+            json_type = props.get("type", [])
+            if not isinstance(json_type, list):
+                json_type = [json_type]
+            if "array" in json_type:
+                array_columns.append(field_name)
+        return array_columns
+
+    def coerce_array_columns(self, df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+        # Ensure that 'array' fields hold lists (legacy tables stored them as strings)
+        array_columns = [
+            col for col in self.get_array_columns(table_name) if col in df.columns
+        ]
+        if not array_columns:
+            return df
+        df = df.copy()
+        for col in array_columns:
+            df[col] = df[col].map(
+                lambda x: parse_array_string(x) if isinstance(x, str) else x
+            )
+        return df
+
+    def row_hashes(self, df: pd.DataFrame, table_name: str) -> np.ndarray:
+        # Content hash of each row, over its data columns in name order; array
+        #  values are hashed as their JSON text
+        columns = sorted(col for col in df.columns if col != ROW_HASH_COLUMN)
+        frame = df[columns].copy()
+        for col in self.get_array_columns(table_name):
+            if col in frame.columns:
+                frame[col] = frame[col].map(
+                    lambda x: json.dumps(x) if isinstance(x, list) else x
+                )
+        hashes = pd.util.hash_pandas_object(frame, index=False)
+        return hashes.to_numpy().view(np.int64)
+
+    def unchanged_rows(
+        self,
+        df: pd.DataFrame,
+        stored: pd.DataFrame,
+        primary_key: str,
+        write_policy: WritePolicy = None,
+    ) -> np.ndarray:
+        """Mask of incoming rows that a commit would leave unchanged
+
+        'stored' holds the primary key and row hash (nullable) of the stored records.
+        On upsert, rows whose key is stored with an identical hash are unchanged; on
+        append, any row whose key is already stored is left as it is.
+        """
+        write_policy = write_policy or self.write_policy
+        if write_policy not in (WritePolicy.APPEND, WritePolicy.UPSERT):
+            raise ValueError(
+                f"Requested WritePolicy '{write_policy}' is not supported."
+            )
+        if stored.empty:
+            return np.zeros(len(df), dtype=bool)
+        stored = stored.drop_duplicates(primary_key, keep="last")
+        matched = df[[primary_key]].merge(
+            stored, on=primary_key, how="left", indicator=True
+        )
+        if write_policy == WritePolicy.APPEND:
+            return (matched["_merge"] == "both").to_numpy()
+        hashes = matched[ROW_HASH_COLUMN].astype("Int64")
+        return hashes.eq(df[ROW_HASH_COLUMN].to_numpy()).fillna(False).to_numpy(bool)
+
     def field_is_nullable(self, props: dict):
         # Check if the 'properties' JSON specification allows the field to be nullable
         json_type = props.get("type", [])
@@ -141,9 +504,28 @@ class DatabaseBase(ABC):
         pass  # pragma: no cover
 
     @abstractmethod
-    def commit_table(self, table_name: str, df: pd.DataFrame):
+    def commit_table(
+        self, table_name: str, df: pd.DataFrame, commit_info: dict = None
+    ) -> dict:
+        # commit_info: details of the commit's origin ('user', 'parser', 'source');
+        #  returns the number of rows 'inserted', 'updated' and 'unchanged'
         pass  # pragma: no cover
 
     @abstractmethod
     def sql_query(self, query: str, tablename: str) -> pd.DataFrame:
         pass  # pragma: no cover
+
+    @abstractmethod
+    def rollback(self, commit_id: int, commit_info: dict = None) -> int:
+        # Undo a commit, recording the rollback as a new commit (returns its id)
+        pass  # pragma: no cover
+
+    @abstractmethod
+    def diff_table_schema(self, table_name: str) -> [tuple]:
+        # List of (SchemaChange, column, stored type, schema type) for a stored table
+        pass  # pragma: no cover
+
+    @abstractmethod
+    def evolve_table(self, table_name: str) -> [tuple]:
+        # Bring a stored table in line with its schema, returning the changes applied
+        pass  # pragma: no cover
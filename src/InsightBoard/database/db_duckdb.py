@@ -1,9 +1,11 @@
 import logging
+import numpy as np
+import pandas as pd
 
 from pathlib import Path
 
-from InsightBoard.database.db_sql import DatabaseSQL
-from InsightBoard.database.db_base import DatabaseBackend
+from InsightBoard.database.db_sql import DatabaseSQL, DatabaseSQLVersioned
+from InsightBoard.database.db_base import DatabaseBackend, search_tokens
 
 try:
     import duckdb
@@ -11,6 +13,7 @@ except ImportError:
     duckdb = None
 
 DATABASE_DUCKDB_VERSION = "1.0.0"
+DATABASE_DUCKDB_VERSIONED_VERSION = "1.0.0"
 
 
 class DatabaseDuckDB(DatabaseSQL):
@@ -28,6 +31,88 @@ class DatabaseDuckDB(DatabaseSQL):
             )
         self.db_backend = duckdb
 
+    # override (DatabaseBase)
+    def analytics_connect(self):
+        # Every table is native to the database file, so no views are required
+        return self.connect()
+
+    # override (DatabaseSQL)
+    def canonical_sql_type(self, sql_type: str, conn) -> str:
+        # Resolve aliases (e.g. TEXT is reported as VARCHAR, REAL as FLOAT)
+        return conn.execute(f"SELECT typeof(CAST(NULL AS {sql_type}))").fetchone()[0]
+
+    # override (DatabaseSQL)
+    def sql_type_widens(self, stored_type: str, sql_type: str) -> bool:
+        numeric_types = ["INTEGER", "BIGINT", "FLOAT", "DOUBLE"]
+        if stored_type in numeric_types and sql_type in numeric_types:
+            return numeric_types.index(stored_type) < numeric_types.index(sql_type)
+        # Scalars can always be represented as text
+        return sql_type == "VARCHAR" and not stored_type.endswith("[]")
+
+    # override (DatabaseSQL)
+    def create_keys_table(
+        self, keys: list, key_type: str, conn, row_hashes: list = None
+    ):
+        row_hashes = row_hashes or [None] * len(keys)
+        conn.register("_keys", pd.DataFrame({"k": keys, "h": row_hashes}))
+        conn.execute(
+            f"CREATE TEMP TABLE _commit_keys AS SELECT CAST(k AS {key_type}) AS k, "
+            "CAST(h AS BIGINT) AS h FROM _keys"
+        )
+        conn.unregister("_keys")
+
+    # override (DatabaseSQL)
+    def index_rows(self, tablename: str, index_name: str, condition: str, conn):
+        # The FTS extension is fetched on demand (so may be unavailable offline), and
+        #  its index is rebuilt in full on every change, so keep an inverted index
+        primary_key = self.get_primary_key(tablename)
+        df = self.query_to_pandas(f'SELECT * FROM "{tablename}"{condition}', conn)
+        conn.register("_search_tokens", search_tokens(df, df[primary_key]))
+        conn.execute(f"INSERT INTO {index_name} SELECT token, key FROM _search_tokens")
+        conn.unregister("_search_tokens")
+
+    # override (DatabaseSQL)
+    def query_to_pandas(self, query: str, conn) -> pd.DataFrame:
+        # Fetch results as Arrow, avoiding the row-wise DBAPI path in pandas
+        return self.table_to_pandas(conn.execute(query).arrow())
+
+    # override (DatabaseSQL)
+    def write_table_upsert(self, tablename: str, df: pd.DataFrame, conn):
+        # DuckDB cannot 'ON CONFLICT DO UPDATE' LIST columns, so replace matching
+        #  keys with set-based statements instead
+        logging.info("Upserting into table: %s", tablename)
+        primary_key = self.get_primary_key(tablename)
+        df = df.replace({np.nan: None})
+        columns = '"' + '", "'.join(df.columns) + '"'
+        # Columns not supplied keep their existing values (as with 'DO UPDATE')
+        missing_columns = [
+            row[1]
+            for row in conn.execute(f"PRAGMA table_info('{tablename}')").fetchall()
+            if row[1] not in df.columns
+        ]
+        conn.register("_incoming", df)
+        incoming = "_incoming"
+        if missing_columns:
+            existing = ", ".join(f't."{col_name}"' for col_name in missing_columns)
+            conn.execute(
+                "CREATE TEMP TABLE _merged AS "
+                f"SELECT _incoming.*, {existing} FROM _incoming "
+                f'LEFT JOIN {tablename} t ON t."{primary_key}" = _incoming."{primary_key}"'
+            )
+            incoming = "_merged"
+            columns = '"' + '", "'.join([*df.columns, *missing_columns]) + '"'
+        conn.execute(
+            f'DELETE FROM {tablename} WHERE "{primary_key}" IN '
+            f'(SELECT "{primary_key}" FROM _incoming)'
+        )
+        conn.execute(
+            f"INSERT INTO {tablename} ({columns}) SELECT {columns} FROM {incoming}"
+        )
+        if missing_columns:
+            conn.execute("DROP TABLE _merged")
+        conn.unregister("_incoming")
+        conn.commit()
+
     # override
     def json_type_to_sql(self, props):
         if "enum" in props:
@@ -38,7 +123,13 @@ class DatabaseDuckDB(DatabaseSQL):
         json_format = props.get("format", "")
 
         def base_type(json_types):
-            if "string" in json_types and json_format in ["date"]:
+            if "array" in json_types:
+                # Native LIST type of the declared item type
+                item_types = props.get("items", {}).get("type", ["string"])
+                if not isinstance(item_types, list):
+                    item_types = [item_types]
+                return f"{base_type(item_types)}[]"
+            elif "string" in json_types and json_format in ["date"]:
                 return "DATE"
             elif "string" in json_types and json_format in ["date-time"]:
                 return "TIMESTAMP"
@@ -54,8 +145,6 @@ class DatabaseDuckDB(DatabaseSQL):
                 return "REAL"
             elif "boolean" in json_types:
                 return "BOOLEAN"
-            elif "array" in json_types:
-                return "TEXT"  # Could use ARRAY here
             else:
                 logging.warn(f"Unsupported JSON type: {json_types}, defaulting to TEXT")
                 return "TEXT"
@@ -65,3 +154,27 @@ class DatabaseDuckDB(DatabaseSQL):
         if self.field_is_nullable(props):
             sql_type = f"{sql_type} NULL"
         return sql_type
+
+
+class DatabaseDuckDBVersioned(DatabaseSQLVersioned, DatabaseDuckDB):
+    def __init__(self, data_folder: str = ""):
+        super().__init__(data_folder)
+        self.BACKEND = DatabaseBackend.DUCKDB_VERSIONED
+        self.db_version = DATABASE_DUCKDB_VERSIONED_VERSION
+        self.db_filename = Path(self.data_folder) / "db.ver.duckdb"
+
+    # override (DatabaseSQL)
+    def alter_column_types(self, tablename: str, type_changes: [tuple], conn):
+        # DuckDB cannot alter an indexed table; indexes are recreated afterwards
+        for (index_name,) in conn.execute(
+            "SELECT index_name FROM duckdb_indexes() WHERE table_name = ?",
+            [tablename],
+        ).fetchall():
+            conn.execute(f'DROP INDEX "{index_name}"')
+        super().alter_column_types(tablename, type_changes, conn)
+
+    # override (DatabaseSQLVersioned)
+    def stage_rows(self, df: pd.DataFrame, conn):
+        conn.register("_incoming_rows", df.replace({np.nan: None}))
+        conn.execute("CREATE TEMP TABLE _incoming AS SELECT * FROM _incoming_rows")
+        conn.unregister("_incoming_rows")
@@ -3,25 +3,61 @@ import json
 import shutil
 import logging
 import sqlite3
+import numpy as np
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 import pyarrow.parquet as pq
 
 from pathlib import Path
 from pyarrow import Table
 from datetime import datetime
 from tempfile import NamedTemporaryFile
+from urllib.parse import quote
 
 from InsightBoard.database.db_base import (
     DatabaseBackend,
     WritePolicy,
     BackupPolicy,
+    DtypeBackend,
+    HistoryEncoding,
+    SchemaChange,
     DatabaseBase,
+    ROW_HASH_COLUMN,
+    search_tokens,
 )
+from InsightBoard.database.cache import TableGenerations, referenced_tables
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
 
 
 DATABASE_PARQUET_VERSION = "1.0.0"
-DATABASE_PARQUET_VERSIONED_VERSION = "1.0.0"
+DATABASE_PARQUET_VERSIONED_VERSION = "1.1.0"
+
+# Columns added to each row of versioned tables (and the legacy per-row metadata)
+VERSION_COLUMNS = ["_version", "_deleted", "_commit_id"]
+LEGACY_METADATA_COLUMN = "_metadata"
+# Delta-encoded versions store only the fields that changed (others are null), and
+#  list the fields that were changed to null
+DELTA_COLUMN = "_delta"
+NULLED_COLUMN = "_nulled"
+DELTA_COLUMNS = [DELTA_COLUMN, NULLED_COLUMN]
+
+# Partitioned tables are folders of Hive-style partitions ('_partition=<value>'),
+#  each holding a single file, with the table's schema kept in '_common_metadata'
+PARTITION_COLUMN = "_partition"
+PARTITION_FILENAME = "part-0.parquet"
+PARTITION_NULL_VALUE = "__HIVE_DEFAULT_PARTITION__"
+COMMON_METADATA_FILENAME = "_common_metadata"
+# Partitions of date fields, by the length of the ISO date prefix
+PARTITION_GRANULARITIES = {"year": 4, "month": 7, "day": 10}
+
+# Sidecar search indexes, of the (token, key) pairs of each table, sorted by token
+SEARCH_FOLDER = "_search"
 
 
 class DatabaseParquet(DatabaseBase):
@@ -29,6 +65,10 @@ class DatabaseParquet(DatabaseBase):
         super().__init__(DatabaseBackend.PARQUET, data_folder)
         self.suffix = "parquet"
         self.db_version = DATABASE_PARQUET_VERSION
+        self.store_row_hashes = True
+        self.partition_tables = True
+        # Each table is a separate file, so tables can be committed concurrently
+        self.parallel_commits = True
 
     # override
     def db_metadata(self):
@@ -48,37 +88,399 @@ class DatabaseParquet(DatabaseBase):
         ]
 
     # override
-    def read_table(self, table_name: str) -> pd.DataFrame:
-        file_path = f"{self.data_folder}/{table_name}.{self.suffix}"
-        table = pq.read_table(file_path)
-        return table.to_pandas()
+    def read_table(
+        self, table_name: str, dtype_backend: DtypeBackend = None, filters=None
+    ) -> pd.DataFrame:
+        """Read a table, optionally filtered by a list of (column, op, value) tuples
+
+        Filters on the partition field of a partitioned table skip the partitions
+        that cannot match without reading them.
+        """
+        table = self.read_arrow_table(table_name, filters=filters)
+        if ROW_HASH_COLUMN in table.column_names:
+            table = table.drop_columns([ROW_HASH_COLUMN])
+        # Fields added to (or widened in) the schema are filled in virtually
+        table = self.evolve_arrow_table(table, table_name)
+        return self.table_to_pandas(table, dtype_backend)
 
     # override
     def read_table_column(self, table_name: str, column_name: str) -> pd.Series:
-        file_path = f"{self.data_folder}/{table_name}.{self.suffix}"
-        table = pq.read_table(file_path)
-        return table[column_name].to_pandas()
+        try:
+            table = self.read_arrow_table(table_name, columns=[column_name])
+        except pa.ArrowInvalid:
+            # Not yet stored (e.g. a field newly added to the schema)
+            table = self.read_arrow_table(table_name, columns=[])
+        table = self.evolve_arrow_table(table, table_name)
+        return self.table_to_pandas(table.select([column_name]))[column_name]
 
     # override
-    def commit_table(self, table_name: str, df: pd.DataFrame):
-        self.write_table_parquet(table_name, df)
+    def commit_table(
+        self, table_name: str, df: pd.DataFrame, commit_info: dict = None
+    ) -> dict:
+        counts = self.write_table_parquet(table_name, df, commit_info=commit_info)
+        if counts["inserted"] or counts["updated"]:
+            self.bump_generation(table_name)
+            primary_key = self.get_primary_key(table_name)
+            if primary_key:
+                self.update_search_index(table_name, df[primary_key].tolist())
+        return counts
 
     # override
     def sql_query(self, query: str, tablename: str) -> pd.DataFrame:
+        if duckdb:
+            # Query Parquet files in place; supports queries across multiple tables
+            return self.analytics_query(query)
+        # Without DuckDB, only the given table is available (copied to SQLite, so
+        #  queries use SQLite's dialect and arrays are JSON text)
+        other_tables = [
+            table
+            for table in referenced_tables(query, self.get_tables_list())
+            if table != tablename
+        ]
+        if other_tables:
+            raise ImportError(
+                f"Queries across multiple tables ({', '.join(other_tables)}) "
+                "require DuckDB, which is available as an optional dependency. "
+                "Please install it using 'pip install \"insightboard[duckdb]\"'."
+            )
         # Read the Parquet file into a Pandas DataFrame and transfer to SQLite
-        data = self.read_table(tablename)
+        data = self.read_table(tablename, dtype_backend=DtypeBackend.NUMPY)
         with NamedTemporaryFile(suffix=".db", delete=False) as tempfile:
             Path(tempfile.name).unlink()  # Remove the file if it exists
             conn = sqlite3.connect(tempfile.name)  # Create or connect
+            # SQLite has no array type; store lists as JSON (queryable with JSON1)
+            for col in self.get_array_columns(tablename):
+                if col in data.columns:
+                    data[col] = data[col].map(
+                        lambda x: json.dumps(x) if isinstance(x, list) else x
+                    )
             data.to_sql(tablename, conn, if_exists="replace", index=False)
             # Run a SQL query on the SQLite database and close the connection
-            df = pd.read_sql_query(query, conn)
+            df = pd.read_sql_query(query, conn, **self.dtype_backend_kwargs())
             conn.close()
         Path(tempfile.name).unlink()
         return df
 
+    # override
+    def search_index_query(
+        self, table_name: str, terms: [str], limit: int
+    ) -> pd.DataFrame | None:
+        if table_name not in self.get_tables_list():
+            return None
+        file_path = self.search_index_path(table_name)
+        if self.search_index_generation(file_path) != self.table_generation(table_name):
+            # Rebuild an index that is missing, or stale (e.g. after a rollback)
+            self.update_search_index(table_name)
+        keys = None
+        for term in terms:
+            if term.endswith("*"):
+                prefix = term[:-1]
+                filters = [("token", ">=", prefix), ("token", "<", f"{prefix}\uffff")]
+            else:
+                filters = [("token", "==", term)]
+            matches = pq.read_table(file_path, columns=["key"], filters=filters)
+            matches = set(matches["key"].to_pylist())
+            keys = matches if keys is None else keys & matches
+        return self.read_rows(table_name, sorted(keys)[:limit])
+
+    # override
+    def read_rows(self, table_name: str, keys: list) -> pd.DataFrame:
+        primary_key = self.get_primary_key(table_name)
+        return self.read_table(table_name, filters=[(primary_key, "in", keys)])
+
+    # override
+    def rollback(self, commit_id: int, commit_info: dict = None) -> int:
+        # Prior versions of rows are not kept (see DatabaseParquetVersioned)
+        raise ValueError(
+            f"Rollback is not supported by the '{self.BACKEND.value}' backend."
+        )
+
+    # override
+    def diff_table_schema(self, table_name: str) -> [tuple]:
+        return self.diff_arrow_schema(self.read_table_schema(table_name), table_name)
+
+    # override
+    def evolve_table(self, table_name: str) -> [tuple]:
+        changes = self.diff_table_schema(table_name)
+        if any(change == SchemaChange.CHANGE_TYPE for change, *_ in changes):
+            # Only type changes that are not widening require the file be rewritten
+            file_path = self.table_path(table_name)
+            if file_path.is_dir():
+                files = sorted(file_path.glob(f"*/{PARTITION_FILENAME}"))
+            else:
+                files = [file_path]
+            for filename in files:
+                table = self.evolve_arrow_table(
+                    pq.read_table(filename, partitioning=None),
+                    table_name,
+                    destructive=True,
+                )
+                # Stored row hashes no longer reflect the converted values
+                if ROW_HASH_COLUMN in table.column_names:
+                    table = table.drop_columns([ROW_HASH_COLUMN])
+                table = table.replace_schema_metadata(self.db_metadata())
+                pq.write_table(table, filename)
+            if file_path.is_dir():
+                if files:
+                    self.write_common_metadata(file_path, table.schema, replace=True)
+                self.backup_partitions(table_name, files)
+            else:
+                self.backup(file_path)
+        # Other changes are applied on read, and persisted by the next commit
+        if changes:
+            self.bump_generation(table_name)
+        return changes
+
+    # override
+    def create_analytics_view(self, conn, table_name: str):
+        file_path = self.table_path(table_name)
+        internal_columns = [ROW_HASH_COLUMN]
+        source = f"read_parquet({self.table_path_literal(table_name)})"
+        if file_path.is_dir():
+            # Partitions are scanned together (a partition may lack newer fields)
+            internal_columns.append(PARTITION_COLUMN)
+            source = (
+                f"read_parquet({self.table_path_literal(table_name)}, "
+                "hive_partitioning = true, union_by_name = true)"
+            )
+        stored_columns = self.read_table_schema(table_name).names + [PARTITION_COLUMN]
+        exclude = ", ".join(
+            col_name for col_name in internal_columns if col_name in stored_columns
+        )
+        exclude = f" EXCLUDE ({exclude})" if exclude else ""
+        conn.execute(
+            f'CREATE VIEW "{table_name}" AS '
+            f"SELECT *{exclude}{self.virtual_columns_sql(table_name)} FROM {source}"
+        )
+
     # Utility functions
 
+    def virtual_columns_sql(self, table_name: str) -> str:
+        # Select-list entries for fields that are in the schema but not yet stored
+        return "".join(
+            f', NULL AS "{col_name}"'
+            for change, col_name, *_ in self.diff_table_schema(table_name)
+            if change == SchemaChange.ADD_COLUMN
+        )
+
+    def table_path_literal(self, table_name: str) -> str:
+        # Path to the table's file(s) as a (quoted) SQL string literal
+        file_path = self.table_path(table_name)
+        if file_path.is_dir():
+            file_path = file_path / "*" / PARTITION_FILENAME
+        return "'" + str(file_path).replace("'", "''") + "'"
+
+    def table_path(self, table_name: str) -> Path:
+        # The table's file, or folder of partitions
+        return Path(self.data_folder) / f"{table_name}.{self.suffix}"
+
+    def search_index_path(self, table_name: str) -> Path:
+        return Path(self.data_folder) / SEARCH_FOLDER / f"{table_name}.parquet"
+
+    def search_index_generation(self, file_path: Path) -> int | None:
+        # Table generation that the search index was built at
+        if not file_path.exists():
+            return None
+        metadata = pq.read_schema(file_path).metadata or {}
+        return int(metadata.get(b"generation", -1))
+
+    def table_generation(self, table_name: str) -> int:
+        return TableGenerations(self.data_folder).get([table_name])[table_name]
+
+    def update_search_index(self, table_name: str, keys: list = None):
+        """Re-index the rows with the given keys (every row if None)
+
+        The index is updated in place only if it is current up to the preceding
+        commit, and otherwise rebuilt.
+        """
+        primary_key = self.get_primary_key(table_name)
+        if not (self.search_index and primary_key):
+            return
+        file_path = self.search_index_path(table_name)
+        generation = self.table_generation(table_name)
+        if (
+            keys is not None
+            and self.search_index_generation(file_path) == generation - 1
+        ):
+            tokens = pq.read_table(file_path).to_pandas()
+            rows = self.read_rows(table_name, keys)
+            tokens = pd.concat(
+                [
+                    tokens[~tokens["key"].isin(keys)],
+                    search_tokens(rows, rows[primary_key]),
+                ],
+                ignore_index=True,
+            )
+        else:
+            rows = self.read_table(table_name)
+            tokens = search_tokens(rows, rows[primary_key])
+        table = pa.Table.from_pandas(
+            tokens.sort_values("token", ignore_index=True), preserve_index=False
+        ).replace_schema_metadata({"generation": str(generation)})
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = file_path.with_suffix(".tmp")
+        pq.write_table(table, temp_path)
+        temp_path.replace(file_path)
+
+    def read_table_schema(self, table_name: str) -> pa.Schema:
+        file_path = self.table_path(table_name)
+        if file_path.is_dir():
+            return pq.read_schema(file_path / COMMON_METADATA_FILENAME)
+        return pq.read_schema(file_path)
+
+    def read_arrow_table(
+        self, table_name: str, columns: [str] = None, filters=None
+    ) -> pa.Table:
+        # Read stored data (including row hashes) from a file or partitioned folder
+        file_path = self.table_path(table_name)
+        if not file_path.is_dir():
+            return pq.read_table(file_path, columns=columns, filters=filters)
+        expression = self.partition_filter_expression(table_name, filters)
+        table = self.table_dataset(table_name).to_table(
+            columns=columns, filter=expression
+        )
+        if PARTITION_COLUMN in table.column_names:
+            table = table.drop_columns([PARTITION_COLUMN])
+        return table
+
+    def table_dataset(self, table_name: str) -> ds.Dataset:
+        # Dataset over a table's partitions, using the schema common to all of them
+        file_path = self.table_path(table_name)
+        schema = pq.read_schema(file_path / COMMON_METADATA_FILENAME)
+        return ds.dataset(
+            str(file_path),
+            schema=schema.append(pa.field(PARTITION_COLUMN, pa.string())),
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive"
+            ),
+            ignore_prefixes=[".", COMMON_METADATA_FILENAME],
+        )
+
+    def get_partition(self, table_name: str) -> tuple | None:
+        """Partition field of a table, and its granularity, from the table schema
+
+        A field annotated with '"Partition": true' partitions a table by its value;
+        date fields can instead be partitioned by "year", "month" or "day".
+        """
+        if not self.partition_tables:
+            return None
+        schema = self.get_table_schema(table_name)
+        partitions = [
+            (field_name, props["Partition"])
+            for field_name, props in schema.get("properties", {}).items()
+            if props.get("Partition", False)
+        ]
+        if len(partitions) > 1:
+            raise ValueError(f"Table '{table_name}' has more than one partition field.")
+        if not partitions:
+            return None
+        field_name, granularity = partitions[0]
+        if granularity is True:
+            granularity = None
+        elif granularity not in PARTITION_GRANULARITIES:
+            raise ValueError(
+                f"Unsupported partition '{granularity}' for field '{field_name}'."
+            )
+        return field_name, granularity
+
+    def partition_values(self, values: pd.Series, granularity: str = None):
+        # Partition of each value: the value itself, or the prefix of its ISO date
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime("%Y-%m-%d")
+        values = values.astype("string")
+        if granularity:
+            values = values.str[: PARTITION_GRANULARITIES[granularity]]
+        return values
+
+    def partition_path(self, folder: Path, value: str | None) -> Path:
+        value = PARTITION_NULL_VALUE if value is None else quote(value, safe="")
+        return folder / f"{PARTITION_COLUMN}={value}" / PARTITION_FILENAME
+
+    def partition_filter_expression(self, table_name: str, filters):
+        # Filter expression, with the partitions that can match added as a condition
+        #  on the partition column (which prunes the others from the scan)
+        if not filters:
+            return None
+        expression = pq.filters_to_expression(filters)
+        field_name, granularity = self.get_partition(table_name) or (None, None)
+        for col_name, op, value in filters:
+            if col_name != field_name:
+                continue
+            partition = pc.field(PARTITION_COLUMN)
+            values = value if op in ["in", "not in"] else [value]
+            values = self.partition_values(pd.Series(values), granularity).tolist()
+            if op == "in":
+                expression &= partition.isin(values)
+            elif op == "==":
+                expression &= partition == values[0]
+            elif granularity and op in [">", ">="]:
+                expression &= partition >= values[0]
+            elif granularity and op in ["<", "<="]:
+                expression &= partition <= values[0]
+        return expression
+
+    def write_common_metadata(self, folder: Path, schema: pa.Schema, replace=False):
+        # Record the schema common to all partitions (widening types as required)
+        metadata_path = folder / COMMON_METADATA_FILENAME
+        if metadata_path.exists() and not replace:
+            schema = pa.unify_schemas(
+                [pq.read_schema(metadata_path), schema], promote_options="permissive"
+            )
+        pq.write_metadata(schema.remove_metadata(), metadata_path)
+
+    def repartition_table(self, table_name: str):
+        """Rewrite a table to match the partitioning declared in its schema"""
+        file_path = self.table_path(table_name)
+        partition = self.get_partition(table_name)
+        logging.info("Repartitioning table: %s", table_name)
+        table = self.read_arrow_table(table_name)
+        temp_path = file_path.with_name(f"{file_path.name}.tmp")
+        shutil.rmtree(temp_path, ignore_errors=True)
+        if partition:
+            field_name, granularity = partition
+            values = self.partition_values(
+                self.table_to_pandas(table.select([field_name]))[field_name],
+                granularity,
+            )
+            for value in values.drop_duplicates().tolist():
+                mask = values.isna() if value is pd.NA else values.eq(value)
+                filename = self.partition_path(
+                    temp_path, None if value is pd.NA else value
+                )
+                filename.parent.mkdir(parents=True)
+                pq.write_table(
+                    table.filter(mask.fillna(False).to_numpy(bool)), filename
+                )
+            self.write_common_metadata(temp_path, table.schema, replace=True)
+        else:
+            pq.write_table(table, temp_path)
+        old_path = file_path.with_name(f"{file_path.name}.old")
+        file_path.rename(old_path)
+        temp_path.rename(file_path)
+        if old_path.is_dir():
+            shutil.rmtree(old_path)
+        else:
+            old_path.unlink()
+
+    def backup_partitions(
+        self, table_name: str, files: [Path], backup_policy: BackupPolicy = None
+    ):
+        # Copy the partitions written by a commit to a timestamped folder
+        backup_policy = backup_policy or self.backup_policy
+        if backup_policy == BackupPolicy.TIMESTAMPED_COPIES:
+            datetime_stamp = datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
+            backup_folder = (
+                Path(self.data_folder)
+                / "backup"
+                / f"{table_name}_{datetime_stamp}.{self.suffix}"
+            )
+            for filename in files:
+                (backup_folder / filename.parent.name).mkdir(
+                    parents=True, exist_ok=True
+                )
+                shutil.copy(filename, backup_folder / filename.parent.name)
+
     def backup(self, file_path, backup_policy: BackupPolicy = None):
         backup_policy = backup_policy or self.backup_policy
         if backup_policy == BackupPolicy.TIMESTAMPED_COPIES:
@@ -99,62 +501,275 @@ class DatabaseParquet(DatabaseBase):
         df: pd.DataFrame,
         write_policy: WritePolicy = None,
         backup_policy: BackupPolicy = None,
+        commit_info: dict = None,
     ):
-        """Plain Parquet writer, no version history"""
+        """Plain Parquet writer, no version history (commit_info is not recorded)
+
+        Each row's content hash is stored alongside it, so that rows which would not
+        change are dropped before anything is written. Returns the number of rows
+        'inserted', 'updated' and 'unchanged'.
+        """
         write_policy = write_policy or self.write_policy
         backup_policy = backup_policy or self.backup_policy
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
         if len(df) == 0:
-            return
-        file_path = Path(self.data_folder) / f"{table_name}.{self.suffix}"
+            return counts
+        file_path = self.table_path(table_name)
         file_path.parent.mkdir(parents=True, exist_ok=True)
         primary_key = self.get_primary_key(table_name)
         if primary_key and primary_key not in df.columns:
             raise ValueError(
                 f"Primary key '{primary_key}' not found in new DataFrame columns."
             )
+        df = self.coerce_array_columns(df, table_name)
+        partition = self.get_partition(table_name)
+        if file_path.exists() and bool(partition) != file_path.is_dir():
+            # Partitioning has been added to (or removed from) the table schema
+            self.repartition_table(table_name)
+        hash_rows = self.store_row_hashes and primary_key
+        if hash_rows:
+            df = df.assign(**{ROW_HASH_COLUMN: self.row_hashes(df, table_name)})
+        if file_path.exists() and hash_rows:
+            # Drop unchanged rows, reading only the stored keys and hashes
+            stored = self.read_row_hashes(table_name, primary_key)
+            unchanged = self.unchanged_rows(df, stored, primary_key, write_policy)
+            df = df[~unchanged]
+            counts["unchanged"] = int(unchanged.sum())
+            if len(df) == 0:
+                return counts
+        if partition:
+            partition_counts = self.write_table_partitions(
+                table_name, df, write_policy, backup_policy
+            )
+            partition_counts["unchanged"] += counts["unchanged"]
+            return partition_counts
         if file_path.exists():
-            old_df = pq.read_table(file_path).to_pandas()
+            # Merge using NumPy-backed dtypes so that comparisons are like-for-like
+            old_df = self.table_to_pandas(pq.read_table(file_path), DtypeBackend.NUMPY)
+            old_df = self.coerce_array_columns(old_df, table_name)
+            if hash_rows and ROW_HASH_COLUMN not in old_df.columns:
+                # Tables written before row hashes were stored
+                old_df[ROW_HASH_COLUMN] = self.row_hashes(old_df, table_name)
             if not primary_key:
                 # No primary key, just append the new data
                 combined_df = self.dataframe_append(df, old_df, primary_key=None)
+                counts["inserted"] = len(df)
             else:
+                existing = df[primary_key].isin(old_df[primary_key])
                 match write_policy:
                     case WritePolicy.APPEND:
                         combined_df = self.dataframe_append(df, old_df, primary_key)
+                        counts["unchanged"] += int(existing.sum())
                     case WritePolicy.UPSERT:
                         combined_df = self.dataframe_upsert(df, old_df, primary_key)
+                        counts["updated"] = int(existing.sum())
                     case _:
                         raise ValueError(
                             f"Requested WritePolicy '{write_policy}' is not supported."
                         )
+                counts["inserted"] = int((~existing).sum())
         else:
             # First time writing to the file
             combined_df = self.dataframe_new(df, table_name)
+            counts["inserted"] = len(df)
         # Write the updated DataFrame to the Parquet file
+        self.write_parquet_file(combined_df, file_path, table_name)
+        # Create a timestamped version of the database as a backup
+        self.backup(file_path, backup_policy)
+        return counts
+
+    def write_table_partitions(
+        self,
+        table_name: str,
+        df: pd.DataFrame,
+        write_policy: WritePolicy,
+        backup_policy: BackupPolicy,
+    ) -> dict:
+        """Write to a partitioned table, rewriting only the partitions affected
+
+        On upsert, records whose partition field has changed are also removed from
+        the partition they were in.
+        """
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        folder = self.table_path(table_name)
+        primary_key = self.get_primary_key(table_name)
+        field_name, granularity = self.get_partition(table_name)
+        if field_name not in df.columns:
+            raise ValueError(
+                f"Partition field '{field_name}' not found in new DataFrame columns."
+            )
+        partitions = self.partition_values(df[field_name], granularity)
+        affected = set(partitions.dropna().tolist())
+        if partitions.isna().any():
+            affected.add(None)
+        existing = pd.Series(False, index=df.index)
+        if primary_key and folder.exists():
+            stored = (
+                self.table_dataset(table_name)
+                .to_table(columns=[primary_key, PARTITION_COLUMN])
+                .to_pandas()
+            )
+            stored = stored[stored[primary_key].isin(df[primary_key])]
+            existing = df[primary_key].isin(stored[primary_key])
+            if write_policy == WritePolicy.UPSERT:
+                affected |= {
+                    None if pd.isna(value) else value
+                    for value in stored[PARTITION_COLUMN].tolist()
+                }
+        if primary_key:
+            match write_policy:
+                case WritePolicy.APPEND:
+                    df, partitions = df[~existing], partitions[~existing]
+                    counts["unchanged"] = int(existing.sum())
+                case WritePolicy.UPSERT:
+                    counts["updated"] = int(existing.sum())
+                case _:
+                    raise ValueError(
+                        f"Requested WritePolicy '{write_policy}' is not supported."
+                    )
+        counts["inserted"] = int((~existing).sum())
+        files = []
+        for value in sorted(affected, key=str):
+            mask = partitions.isna() if value is None else partitions.eq(value)
+            rows = df[mask.fillna(False).to_numpy(bool)]
+            filename = self.partition_path(folder, value)
+            if filename.exists():
+                old_df = self.table_to_pandas(
+                    pq.read_table(filename, partitioning=None), DtypeBackend.NUMPY
+                )
+                old_df = self.coerce_array_columns(old_df, table_name)
+                if primary_key:
+                    if ROW_HASH_COLUMN not in old_df.columns:
+                        old_df[ROW_HASH_COLUMN] = self.row_hashes(old_df, table_name)
+                    old_df = old_df[~old_df[primary_key].isin(df[primary_key])]
+                combined_df = pd.concat([old_df, rows], ignore_index=True)
+                if len(combined_df) == 0:
+                    # Every record has moved to another partition
+                    shutil.rmtree(filename.parent)
+                    continue
+            elif len(rows):
+                combined_df = self.dataframe_new(rows.copy(), table_name)
+            else:
+                continue
+            filename.parent.mkdir(parents=True, exist_ok=True)
+            table = self.write_parquet_file(combined_df, filename, table_name)
+            self.write_common_metadata(folder, table.schema)
+            files.append(filename)
+        self.backup_partitions(table_name, files, backup_policy)
+        return counts
+
+    def write_parquet_file(self, combined_df, file_path: Path, table_name) -> pa.Table:
         if isinstance(combined_df, Table):
             table = combined_df
         elif isinstance(combined_df, pd.DataFrame):
             table = Table.from_pandas(combined_df)
         else:
             raise ValueError("Invalid DataFrame type.")
-        # Pad any missing columns with null values
-        table = self.pad_missing_columns(table, table_name)
+        # Add missing columns (as nulls) and widen types to match the schema
+        table = self.evolve_arrow_table(table, table_name)
+        table = self.cast_array_columns(table, table_name)
         table = table.replace_schema_metadata(self.db_metadata())
         pq.write_table(table, file_path)
-        # Create a timestamped version of the database as a backup
-        self.backup(file_path)
+        return table
 
-    def pad_missing_columns(self, table: pa.Table, table_name) -> pa.Table:
-        schema = self.get_table_schema(table_name)
-        columns = schema.get("properties", {}).keys()
-        for col_name in columns:
+    def read_row_hashes(self, table_name: str, primary_key: str) -> pd.DataFrame:
+        # Stored keys and row hashes (null for tables written before hashes were)
+        try:
+            table = self.read_arrow_table(
+                table_name, columns=[primary_key, ROW_HASH_COLUMN]
+            )
+        except pa.ArrowInvalid:
+            table = self.read_arrow_table(table_name, columns=[primary_key])
+            table = table.append_column(
+                ROW_HASH_COLUMN, pa.nulls(len(table), pa.int64())
+            )
+        return table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+
+    def diff_arrow_schema(self, stored_schema: pa.Schema, table_name) -> [tuple]:
+        # Compare a stored Arrow schema against the table's JSON schema
+        changes = []
+        target_schema = self.json_schema_to_pyarrow(self.get_table_schema(table_name))
+        for field in target_schema:
+            if field.name not in stored_schema.names:
+                changes.append((SchemaChange.ADD_COLUMN, field.name, None, field.type))
+                continue
+            stored_type = stored_schema.field(field.name).type
+            if self.pyarrow_types_equal(stored_type, field.type):
+                continue
+            if self.pyarrow_type_widens(stored_type, field.type):
+                change = SchemaChange.WIDEN_TYPE
+            else:
+                change = SchemaChange.CHANGE_TYPE
+            changes.append((change, field.name, stored_type, field.type))
+        return changes
+
+    def evolve_arrow_table(
+        self, table: pa.Table, table_name, destructive: bool = False
+    ) -> pa.Table:
+        # Add missing columns as (typed) nulls and widen column types; other type
+        #  changes are only applied on request as they may fail or lose information
+        for change, col_name, _, target_type in self.diff_arrow_schema(
+            table.schema, table_name
+        ):
+            if change == SchemaChange.ADD_COLUMN:
+                table = table.append_column(
+                    pa.field(col_name, target_type), pa.nulls(len(table), target_type)
+                )
+            elif change == SchemaChange.WIDEN_TYPE or destructive:
+                idx = table.column_names.index(col_name)
+                try:
+                    column = table[col_name].cast(target_type)
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                    raise ValueError(
+                        f"Cannot convert column '{col_name}' of table '{table_name}' "
+                        f"to {target_type}: {e}"
+                    )
+                table = table.set_column(idx, col_name, column)
+        return table
+
+    def pyarrow_types_equal(self, a: pa.DataType, b: pa.DataType) -> bool:
+        # Compare types, ignoring the names of list item fields
+        if pa.types.is_list(a) and pa.types.is_list(b):
+            return self.pyarrow_types_equal(a.value_type, b.value_type)
+        return a == b
+
+    def pyarrow_type_widens(self, stored: pa.DataType, target: pa.DataType) -> bool:
+        # Whether every stored value is representable in the target type
+        if pa.types.is_null(stored):
+            return True
+        if pa.types.is_integer(stored) and pa.types.is_floating(target):
+            return True
+        if pa.types.is_list(stored) and pa.types.is_list(target):
+            return self.pyarrow_types_equal(
+                stored.value_type, target.value_type
+            ) or self.pyarrow_type_widens(stored.value_type, target.value_type)
+        return False
+
+    def cast_array_columns(self, table: pa.Table, table_name) -> pa.Table:
+        # Store 'array' fields as Arrow lists, even where pandas could not infer one
+        json_schema = self.get_table_schema(table_name)
+        properties = json_schema.get("properties", {})
+        for col_name in self.get_array_columns(table_name):
             if col_name not in table.column_names:
-                table = table.append_column(col_name, pa.array([None] * len(table)))
+                continue
+            idx = table.column_names.index(col_name)
+            target_type = self.json_type_to_pyarrow(
+                ["array"], json_items=properties[col_name].get("items")
+            )
+            if table.schema.field(idx).type != target_type:
+                table = table.set_column(
+                    idx, col_name, table[col_name].cast(target_type)
+                )
         return table
 
     # Function to map JSON types to PyArrow types
-    def json_type_to_pyarrow(self, json_type, json_format=None):
-        if "string" in json_type:
+    def json_type_to_pyarrow(self, json_type, json_format=None, json_items=None):
+        if "array" in json_type:
+            item_type = (json_items or {}).get("type", "string")
+            if not isinstance(item_type, list):
+                item_type = [item_type]
+            return pa.list_(self.json_type_to_pyarrow(item_type))
+        elif "string" in json_type:
             return pa.string()
         elif "integer" in json_type:
             return pa.int64()
@@ -162,8 +777,6 @@ class DatabaseParquet(DatabaseBase):
             return pa.float64()
         elif "boolean" in json_type:
             return pa.bool_()
-        elif "array" in json_type:
-            return pa.string()  # Default to string, can be pa.list_(pa.string())
         else:
             return pa.string()
             logging.warn(f"Unrecognised JSON type: {json_type}")
@@ -177,8 +790,9 @@ class DatabaseParquet(DatabaseBase):
                 json_type = [json_type]
             nullable = self.field_is_nullable(field_props)
             json_format = field_props.get("format")
+            json_items = field_props.get("items")
             # Convert JSON type to equivalent PyArrow type
-            pyarrow_type = self.json_type_to_pyarrow(json_type, json_format)
+            pyarrow_type = self.json_type_to_pyarrow(json_type, json_format, json_items)
             field = pa.field(field_name, pyarrow_type, nullable=nullable)
             fields.append(field)
         return pa.schema(fields)
@@ -194,6 +808,10 @@ class DatabaseParquet(DatabaseBase):
                 df[col_name] = None
         # Create Table from pandas dataframe using the schema
         table = pa.Table.from_pandas(df, schema=schema)
+        if ROW_HASH_COLUMN in df.columns:
+            table = table.append_column(
+                ROW_HASH_COLUMN, pa.array(df[ROW_HASH_COLUMN], type=pa.int64())
+            )
         return table
 
     def dataframe_append(self, df, old_df, primary_key=None):
@@ -218,19 +836,28 @@ class DatabaseParquetVersioned(DatabaseParquet):
         self.BACKEND = DatabaseBackend.PARQUET_VERSIONED
         self.suffix = "ver.parquet"
         self.db_version = DATABASE_PARQUET_VERSIONED_VERSION
+        # Unchanged records are not given new versions (see dataframe_upsert)
+        self.store_row_hashes = False
+        # Record versions are kept together in a single file
+        self.partition_tables = False
 
     # override (DatabaseBase)
-    def read_table(self, table_name: str) -> pd.DataFrame:
+    def read_table(
+        self, table_name: str, dtype_backend: DtypeBackend = None
+    ) -> pd.DataFrame:
         # Use DatabaseParquet implementation to read the table
-        table = super().read_table(table_name)
-        # Remove deleted records
-        table = table[table["_deleted"] == False]  # noqa: E712
+        table = super().read_table(table_name, dtype_backend)
         # Return only the most recent version of each record
         table = table.sort_values(by=["_version"]).drop_duplicates(
             subset=self.get_primary_key(table_name), keep="last"
         )
-        # Remove metadata columns
-        table = table.drop(columns=["_version", "_deleted", "_metadata"])
+        # Remove deleted records
+        table = table[table["_deleted"] == False]  # noqa: E712
+        # Remove metadata columns (including those of tables not yet migrated)
+        table = table.drop(
+            columns=VERSION_COLUMNS + DELTA_COLUMNS + [LEGACY_METADATA_COLUMN],
+            errors="ignore",
+        )
         # Restore ordering
         table = table.sort_index()
         return table
@@ -239,21 +866,223 @@ class DatabaseParquetVersioned(DatabaseParquet):
     def read_table_column(self, table_name: str, column_name: str) -> pd.Series:
         return self.read_table(table_name)[column_name]
 
-    # Utility function
-    def row_metadata(self, data: dict = None):
-        # Convert metadata to JSON string
-        if not data:
-            data = {}
-        data_required = {
-            "timestamp": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+    # override (DatabaseParquet)
+    def read_rows(self, table_name: str, keys: list) -> pd.DataFrame:
+        # Versions are filtered after reading, so filter the current records
+        return DatabaseBase.read_rows(self, table_name, keys)
+
+    # override (DatabaseParquet)
+    def read_arrow_table(
+        self, table_name: str, columns: [str] = None, filters=None
+    ) -> pa.Table:
+        # Fields omitted from delta-encoded versions are filled in from earlier ones
+        if (
+            columns is not None
+            and DELTA_COLUMN in self.read_table_schema(table_name).names
+        ):
+            return self.read_arrow_table(table_name, filters=filters).select(columns)
+        table = super().read_arrow_table(table_name, columns, filters)
+        return self.materialize_versions(table, table_name)
+
+    # override (DatabaseParquet)
+    def create_analytics_view(self, conn, table_name: str):
+        # Present the current state of each record, as read_table does
+        file_path = Path(self.data_folder) / f"{table_name}.{self.suffix}"
+        if DELTA_COLUMN in pq.read_schema(file_path).names:
+            # Delta-encoded versions are filled in before they can be queried
+            return DatabaseBase.create_analytics_view(self, conn, table_name)
+        primary_key = self.get_primary_key(table_name)
+        latest = (
+            f'QUALIFY row_number() OVER (PARTITION BY "{primary_key}" '
+            "ORDER BY _version DESC) = 1"
+            if primary_key
+            else ""
+        )
+        stored_columns = pq.read_schema(file_path).names
+        exclude = ", ".join(
+            col_name
+            for col_name in VERSION_COLUMNS + [LEGACY_METADATA_COLUMN]
+            if col_name in stored_columns
+        )
+        # Select the latest version of each record, then remove deleted records
+        conn.execute(
+            f'CREATE VIEW "{table_name}" AS '
+            f"SELECT * EXCLUDE ({exclude})"
+            f"{self.virtual_columns_sql(table_name)} FROM ("
+            f"SELECT * FROM read_parquet({self.table_path_literal(table_name)}) "
+            f"{latest}) WHERE NOT _deleted"
+        )
+
+    # override (DatabaseParquet)
+    def write_table_parquet(
+        self,
+        table_name: str,
+        df: pd.DataFrame,
+        write_policy: WritePolicy = None,
+        backup_policy: BackupPolicy = None,
+        commit_info: dict = None,
+    ):
+        """Versioned Parquet writer, recording each write in the commit log"""
+        if len(df) == 0:
+            return {"inserted": 0, "updated": 0, "unchanged": 0}
+        self.migrate_row_metadata(table_name)
+        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        commit_id = self.commit_log.begin(table_name, timestamp, commit_info)
+        try:
+            super().write_table_parquet(
+                table_name, df.assign(_commit_id=commit_id), write_policy, backup_policy
+            )
+        except Exception:
+            self.commit_log.discard(commit_id)
+            raise
+        # Record the number of rows written by the commit
+        file_path = Path(self.data_folder) / f"{table_name}.{self.suffix}"
+        versions = pq.read_table(
+            file_path,
+            columns=["_version"],
+            filters=[("_commit_id", "==", commit_id)],
+        )["_version"]
+        inserted = pc.sum(pc.equal(versions, 1)).as_py() or 0
+        counts = {
+            "inserted": inserted,
+            "updated": len(versions) - inserted,
+            "unchanged": len(df) - len(versions),
+        }
+        self.commit_log.finish(
+            commit_id,
+            counts["inserted"],
+            counts["updated"],
+            unchanged=counts["unchanged"],
+        )
+        return counts
+
+    # override (DatabaseParquet)
+    def rollback(self, commit_id: int, commit_info: dict = None) -> int:
+        """Undo a commit by writing new versions of the records that it changed
+
+        Records are restored to their previous version, or marked as deleted if the
+        commit inserted them. Records changed again by a later commit are left as
+        they are.
+        """
+        commit = self.commit_log.get(commit_id)
+        if not commit:
+            raise ValueError(f"Commit {commit_id} not found.")
+        table_name = commit["table_name"]
+        primary_key = self.get_primary_key(table_name)
+        if not primary_key:
+            raise ValueError(f"Table '{table_name}' has no primary key to roll back.")
+        self.migrate_row_metadata(table_name)
+        file_path = Path(self.data_folder) / f"{table_name}.{self.suffix}"
+        stored = pq.read_table(file_path)
+        df = self.table_to_pandas(
+            self.materialize_versions(stored, table_name), DtypeBackend.NUMPY
+        )
+        # History of the records written by the commit
+        history = df[
+            df[primary_key].isin(df.loc[df["_commit_id"] == commit_id, primary_key])
+        ]
+        latest = history.sort_values("_version").drop_duplicates(
+            primary_key, keep="last"
+        )
+        current = latest[latest["_commit_id"] == commit_id]
+        if len(current) < len(latest):
+            logging.warning(
+                "Rollback of commit %d skips %d record(s) changed by later commits",
+                commit_id,
+                len(latest) - len(current),
+            )
+        # Restore the version preceding the commit, where there is one
+        versions = history.merge(
+            current[[primary_key, "_version"]],
+            on=primary_key,
+            suffixes=("", "_rollback"),
+        )
+        restored = (
+            versions[versions["_version"] < versions["_version_rollback"]]
+            .sort_values("_version")
+            .drop_duplicates(primary_key, keep="last")
+            .drop(columns=["_version_rollback"])
+        )
+        # Otherwise the record was inserted by the commit, so mark it as deleted
+        deleted = current[~current[primary_key].isin(restored[primary_key])].copy()
+        deleted["_deleted"] = True
+        next_version = current.set_index(primary_key)["_version"] + 1
+        rows = pd.concat([restored, deleted], ignore_index=True)
+        rows["_version"] = rows[primary_key].map(next_version)
+        if DELTA_COLUMN in rows.columns:
+            # Restored versions are written in full
+            rows[DELTA_COLUMN] = False
+            rows[NULLED_COLUMN] = None
+        commit_info = {
+            "source": f"rollback of commit {commit_id}",
+            **(commit_info or {}),
+        }
+        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        rollback_id = self.commit_log.begin(table_name, timestamp, commit_info)
+        rows["_commit_id"] = rollback_id
+        try:
+            stored_df = self.table_to_pandas(stored, DtypeBackend.NUMPY)
+            self.write_parquet_file(
+                pd.concat([stored_df, rows], ignore_index=True), file_path, table_name
+            )
+        except Exception:
+            self.commit_log.discard(rollback_id)
+            raise
+        self.backup(file_path)
+        self.commit_log.finish(rollback_id, 0, len(restored), len(deleted))
+        self.bump_generation(table_name)
+        return rollback_id
+
+    def migrate_row_metadata(self, table_name: str):
+        """Replace per-row JSON '_metadata' (from earlier versions) by commit log ids
+
+        Each distinct metadata value (i.e. each historical commit) is recorded in the
+        commit log, in timestamp order.
+        """
+        file_path = Path(self.data_folder) / f"{table_name}.{self.suffix}"
+        if not file_path.exists():
+            return
+        if LEGACY_METADATA_COLUMN not in pq.read_schema(file_path).names:
+            return
+        logging.info("Migrating row metadata to the commit log: %s", table_name)
+        table = pq.read_table(file_path)
+        df = table.select([LEGACY_METADATA_COLUMN, "_version"]).to_pandas()
+        commits = []
+        for metadata, rows in df.groupby(LEGACY_METADATA_COLUMN, sort=False):
+            data = json.loads(metadata)
+            commits.append(
+                {
+                    "metadata": metadata,
+                    "table_name": table_name,
+                    "timestamp": data.get("timestamp"),
+                    "user": data.get("user"),
+                    "parser": data.get("parser"),
+                    "source": data.get("source"),
+                    "rows_inserted": int((rows["_version"] == 1).sum()),
+                    "rows_updated": int((rows["_version"] > 1).sum()),
+                    "rows_deleted": 0,
+                }
+            )
+        commits.sort(key=lambda commit: commit["timestamp"] or "")
+        commit_ids = self.commit_log.append_records(commits)
+        commit_id_map = {
+            commit["metadata"]: commit_id
+            for commit, commit_id in zip(commits, commit_ids, strict=True)
         }
-        data = {**data_required, **data}
-        return json.dumps(data)
+        commit_id_column = pa.array(
+            df[LEGACY_METADATA_COLUMN].map(commit_id_map), type=pa.int64()
+        )
+        table = table.drop_columns([LEGACY_METADATA_COLUMN]).append_column(
+            "_commit_id", commit_id_column
+        )
+        table = table.replace_schema_metadata(self.db_metadata())
+        pq.write_table(table, file_path)
 
     # override (DatabaseParquet)
     def dataframe_new(self, df, table_name):
         # Add metadata columns to the new Table
-        table = super().dataframe_new(df, table_name)
+        commit_ids = df["_commit_id"]
+        table = super().dataframe_new(df.drop(columns=["_commit_id"]), table_name)
         table = table.append_column(
             "_version",
             pa.array([1] * len(df), type=pa.int64()),
@@ -263,8 +1092,8 @@ class DatabaseParquetVersioned(DatabaseParquet):
             pa.array([False] * len(df), type=pa.bool_()),
         )
         table = table.append_column(
-            "_metadata",
-            pa.array([self.row_metadata()] * len(df), type=pa.string()),
+            "_commit_id",
+            pa.array(commit_ids, type=pa.int64()),
         )
         return table
 
@@ -277,41 +1106,199 @@ class DatabaseParquetVersioned(DatabaseParquet):
         # Combine old and new DataFrames (no duplicate primary keys)
         df.loc[:, ["_version"]] = 1
         df.loc[:, ["_deleted"]] = False
-        df.loc[:, ["_metadata"]] = self.row_metadata()
         return pd.concat([old_df, df], ignore_index=True)
 
     # override (DatabaseParquet)
-    def dataframe_upsert(self, df, old_df, primary_key):
-        # Create new versions of existing records
+    def write_parquet_file(self, combined_df, file_path: Path, table_name) -> pa.Table:
+        if isinstance(combined_df, pd.DataFrame):
+            combined_df = Table.from_pandas(combined_df, preserve_index=False)
+        if file_path.exists():
+            # Versions stored with nulls are read back with NumPy-backed dtypes (e.g.
+            #  integers as floats); keep the stored types where no value is lost
+            for field in pq.read_schema(file_path):
+                if field.name not in combined_df.column_names:
+                    continue
+                idx = combined_df.column_names.index(field.name)
+                column = combined_df[field.name]
+                if self.pyarrow_types_equal(column.type, field.type):
+                    continue
+                try:
+                    combined_df = combined_df.set_column(
+                        idx, field.name, column.cast(field.type)
+                    )
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    pass
+        if NULLED_COLUMN in combined_df.column_names:
+            combined_df = combined_df.set_column(
+                combined_df.column_names.index(NULLED_COLUMN),
+                NULLED_COLUMN,
+                combined_df[NULLED_COLUMN].cast(pa.list_(pa.string())),
+            )
+        return super().write_parquet_file(combined_df, file_path, table_name)
+
+    def materialize_versions(self, table: pa.Table, table_name) -> pa.Table:
+        # Fill in the fields that delta-encoded versions do not store
+        if DELTA_COLUMN not in table.column_names:
+            return table
+        delta = table[DELTA_COLUMN].fill_null(False).to_numpy(zero_copy_only=False)
+        if not delta.any():
+            return table
+        primary_key = self.get_primary_key(table_name)
+        data_columns = self.version_data_columns(table.column_names, primary_key)
+        stored = pd.DataFrame(
+            {
+                col_name: ~delta
+                | pc.is_valid(table[col_name]).to_numpy(zero_copy_only=False)
+                for col_name in data_columns
+            }
+        )
+        nulled = table[NULLED_COLUMN].combine_chunks()
+        nulled = pd.Series(
+            pc.list_flatten(nulled).to_numpy(zero_copy_only=False),
+            index=pc.list_parent_indices(nulled).to_numpy(),
+        )
+        sources = self.version_sources(
+            table[primary_key].to_pandas(),
+            table["_version"].to_numpy(),
+            self.mark_nulled(stored, nulled),
+        )
+        for col_name in data_columns:
+            table = table.set_column(
+                table.column_names.index(col_name),
+                col_name,
+                table[col_name].take(sources[col_name].to_numpy()),
+            )
+        return table
+
+    def materialize_dataframe(self, df: pd.DataFrame, primary_key) -> pd.DataFrame:
+        # As materialize_versions, for versions already read into a DataFrame
+        if DELTA_COLUMN not in df.columns:
+            return df
+        delta = df[DELTA_COLUMN].eq(True).to_numpy()
+        if not delta.any():
+            return df
+        df = df.reset_index(drop=True)
+        data_columns = self.version_data_columns(df.columns, primary_key)
+        stored = pd.DataFrame(
+            {col_name: ~delta | df[col_name].notna() for col_name in data_columns}
+        )
+        nulled = df[NULLED_COLUMN].explode().dropna()
+        sources = self.version_sources(
+            df[primary_key],
+            df["_version"].to_numpy(),
+            self.mark_nulled(stored, nulled),
+        )
+        return df.assign(
+            **{
+                col_name: df[col_name].iloc[sources[col_name]].to_numpy()
+                for col_name in data_columns
+            }
+        )
+
+    def version_data_columns(self, column_names, primary_key) -> [str]:
+        return [
+            col_name
+            for col_name in column_names
+            if col_name not in VERSION_COLUMNS + DELTA_COLUMNS + [primary_key]
+        ]
+
+    def mark_nulled(self, stored: pd.DataFrame, nulled: pd.Series) -> pd.DataFrame:
+        # Fields changed to null are stored (as null), rather than omitted
+        for col_name, rows in nulled.groupby(nulled).groups.items():
+            if col_name in stored.columns:
+                stored.loc[rows, col_name] = True
+        return stored
+
+    def version_sources(
+        self, keys: pd.Series, versions: np.ndarray, stored: pd.DataFrame
+    ) -> pd.DataFrame:
+        # For each version and field, the row holding its value: the version itself
+        #  if it stores the field, otherwise the closest earlier version that does
+        codes = pd.factorize(keys)[0]
+        order = np.lexsort((versions, codes))
+        rows = np.arange(len(keys))
+        sources = pd.DataFrame(
+            np.where(stored.to_numpy()[order], rows[order, None], np.nan),
+            columns=stored.columns,
+        )
+        sources = sources.groupby(codes[order]).ffill().to_numpy()
+        missing = np.isnan(sources)
+        sources[missing] = np.broadcast_to(rows[order, None], sources.shape)[missing]
+        unsorted = np.empty_like(sources)
+        unsorted[order] = sources
+        return pd.DataFrame(unsorted.astype(np.int64), columns=stored.columns)
+
+    def changed_fields(
+        self, df: pd.DataFrame, previous: pd.DataFrame, primary_key
+    ) -> pd.DataFrame:
+        # Whether each field of the new rows differs from the previous version of its
+        #  record (rows are aligned by primary key, and numbered from zero)
+        previous = (
+            previous.set_index(primary_key)
+            .reindex(df[primary_key])
+            .reset_index(drop=True)
+        )
+        df = df.reset_index(drop=True)
+
+        def comparable(values: pd.Series) -> pd.Series:
+            # Compare arrays by their items (stored arrays are read as ndarrays)
+            return values.map(
+                lambda x: tuple(x) if isinstance(x, (list, np.ndarray)) else x
+            )
+
+        changed = {}
+        for col_name in self.version_data_columns(df.columns, primary_key):
+            new = df[col_name]
+            if col_name in previous.columns:
+                old = previous[col_name]
+                same = (comparable(new) == comparable(old)) | (new.isna() & old.isna())
+            else:
+                same = new.isna()
+            changed[col_name] = ~same.to_numpy(dtype=bool)
+        return pd.DataFrame(changed, index=df.index)
+
+    def encode_deltas(
+        self, df: pd.DataFrame, changed: pd.DataFrame, update: np.ndarray
+    ) -> pd.DataFrame:
+        # Keep only the changed fields of updated records, listing those changed to
+        #  null (the fields of new records are kept in full)
         df = df.copy()
-        #
-        # Make a copy of the old data frame returning only the most recent version of each record
-        filtered_old_df = old_df.sort_values(by=["_version"]).drop_duplicates(
-            subset=primary_key, keep="last"
+        nulled = [[] for _ in range(len(df))]
+        for col_name in changed.columns:
+            is_changed = changed[col_name].to_numpy()
+            cleared = update & is_changed & df[col_name].isna().to_numpy()
+            for row in np.flatnonzero(cleared):
+                nulled[row].append(col_name)
+            df[col_name] = df[col_name].astype(object).where(~update | is_changed, None)
+        df[DELTA_COLUMN] = update
+        df[NULLED_COLUMN] = [names if names else None for names in nulled]
+        return df
+
+    # override (DatabaseParquet)
+    def dataframe_upsert(self, df, old_df, primary_key):
+        # Create new versions of existing records, using the most recent version of
+        #  each record (filled in, where versions are delta-encoded)
+        latest = (
+            self.materialize_dataframe(old_df, primary_key)
+            .sort_values(by=["_version"])
+            .drop_duplicates(subset=primary_key, keep="last")
         )
-        # Remove deleted records
-        filtered_old_df = filtered_old_df[filtered_old_df["_deleted"] == False]  # noqa: E712
-        # Remove new rows where:
-        #  1. the primary key is already in the filtered (most recent) old DataFrame
-        #  2. there is no change to the remaining row data
-        data_columns = df.columns.difference(["_version", "_deleted", "_metadata"])
-        for key in df[primary_key]:
-            if key in filtered_old_df[primary_key].values:
-                df1 = df.loc[df[primary_key] == key].reset_index(drop=True)
-                df2 = filtered_old_df.loc[
-                    filtered_old_df[primary_key] == key, data_columns
-                ].reset_index(drop=True)
-                if df1.equals(df2):
-                    df = df[df[primary_key] != key]
-        # Add metadata columns to the remaining DataFrame
-        df.loc[:, ["_version"]] = 1
-        df.loc[:, ["_deleted"]] = False
-        df.loc[:, ["_metadata"]] = self.row_metadata()
-        # Index on old_df (not filtered_old_df) to prevent skipping deleted records
-        for key in df[primary_key]:
-            if key in old_df[primary_key].values:
-                df.loc[df[primary_key] == key, "_version"] = (
-                    old_df.loc[old_df[primary_key] == key, "_version"].max() + 1
-                )
+        # Deleted records are reinserted in full
+        current = latest[latest["_deleted"] == False]  # noqa: E712
+        # Remove new rows of existing records in which no field has changed
+        df = df.reset_index(drop=True)
+        changed = self.changed_fields(df, current, primary_key)
+        update = df[primary_key].isin(current[primary_key]).to_numpy()
+        keep = ~update | changed.any(axis=1).to_numpy()
+        df = df[keep].reset_index(drop=True)
+        changed = changed[keep].reset_index(drop=True)
+        update = update[keep]
+        # Add metadata columns, numbering versions on old_df (not current) so that
+        #  deleted records are not skipped
+        next_version = old_df.groupby(primary_key)["_version"].max() + 1
+        df["_version"] = df[primary_key].map(next_version).fillna(1).astype("int64")
+        df["_deleted"] = False
+        if self.history_encoding == HistoryEncoding.DELTA:
+            df = self.encode_deltas(df, changed, update)
         # Combine old and new DataFrames (versioned)
         return pd.concat([old_df, df], ignore_index=True)
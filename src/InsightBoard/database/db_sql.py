@@ -11,8 +11,23 @@ from InsightBoard.database.db_base import (
     DatabaseBase,
     BackupPolicy,
     WritePolicy,
+    SchemaChange,
+    ROW_HASH_COLUMN,
+    search_tokens,
 )
 
+# Prefix of the tables recording prior versions of rows, for rollback
+HISTORY_PREFIX = "_history_"
+# Prefix of the tables recording the content hash of each row
+ROW_HASHES_PREFIX = "_row_hashes_"
+# Prefix of the full-text index of each table (and of SQLite's FTS5 shadow tables)
+SEARCH_PREFIX = "_search_"
+# Prefix of the tables holding every version of each row (versioned backends)
+VERSIONS_PREFIX = "_versions_"
+# Columns recording the validity of each version, as the ids of the commits that
+#  wrote ('_valid_from') and replaced ('_valid_to', null if current) it
+VALID_COLUMNS = ["_valid_from", "_valid_to", "_deleted"]
+
 
 # Abstract class for SQL databases
 class DatabaseSQL(DatabaseBase):
@@ -35,34 +50,82 @@ class DatabaseSQL(DatabaseBase):
         if not self.db_filename.exists():
             return []
         else:
-            conn = self.db_backend.connect(self.db_filename)
+            conn = self.connect()
             cursor = conn.cursor()
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
             tables = cursor.fetchall()
             conn.close()
-            return [table[0] for table in tables]
+            # Exclude internal tables ('sqlite_stat1' created by ANALYZE, history, row
+            #  hashes and search indexes)
+            return [
+                table[0]
+                for table in tables
+                if not table[0].startswith(
+                    ("sqlite_", HISTORY_PREFIX, ROW_HASHES_PREFIX, SEARCH_PREFIX)
+                )
+            ]
 
     # override
     def read_table(self, tablename: str) -> pd.DataFrame:
-        conn = self.db_backend.connect(self.db_filename)
-        df = pd.read_sql_query(f"SELECT * FROM {tablename}", conn)
+        conn = self.connect()
+        df = self.query_to_pandas(f"SELECT * FROM {tablename}", conn)
         conn.close()
-        return df
+        return self.decode_array_columns(df, tablename)
 
     # override
     def read_table_column(self, tablename: str, column_name: str) -> pd.Series:
-        conn = self.db_backend.connect(self.db_filename)
-        df = pd.read_sql_query(f'SELECT "{column_name}" FROM {tablename}', conn)
+        conn = self.connect()
+        df = self.query_to_pandas(f'SELECT "{column_name}" FROM {tablename}', conn)
         conn.close()
-        return df
+        return self.decode_array_columns(df, tablename)
 
     # override
-    def commit_table(self, tablename: str, df: pd.DataFrame):
+    def commit_table(
+        self, tablename: str, df: pd.DataFrame, commit_info: dict = None
+    ) -> dict:
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
         if len(df) == 0:
-            return
+            return counts
+        df = self.coerce_array_columns(df, tablename)
+        primary_key = self.get_primary_key(tablename)
+        if primary_key:
+            df = df.assign(**{ROW_HASH_COLUMN: self.row_hashes(df, tablename)})
+            if self.does_table_exist(tablename):
+                # Drop rows that would not change, before any backup or write
+                stored = self.read_row_hashes(tablename, df)
+                unchanged = self.unchanged_rows(df, stored, primary_key)
+                df = df[~unchanged]
+                counts["unchanged"] = int(unchanged.sum())
+        df = self.encode_array_columns(df, tablename)
+        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        commit_id = self.commit_log.begin(tablename, timestamp, commit_info)
+        try:
+            if len(df):
+                counts["inserted"], counts["updated"] = self.write_table(
+                    tablename, df, commit_id
+                )
+        except Exception:
+            self.commit_log.discard(commit_id)
+            raise
+        self.commit_log.finish(
+            commit_id,
+            counts["inserted"],
+            counts["updated"],
+            unchanged=counts["unchanged"],
+        )
+        if counts["inserted"] or counts["updated"]:
+            self.bump_generation(tablename)
+        return counts
+
+    def write_table(self, tablename: str, df: pd.DataFrame, commit_id: int):
+        # Write to the table, recording prior versions of the rows in its history
+        row_hashes = None
+        if ROW_HASH_COLUMN in df.columns:
+            row_hashes = df[[self.get_primary_key(tablename), ROW_HASH_COLUMN]]
+            df = df.drop(columns=[ROW_HASH_COLUMN])
         if not self.does_table_exist(tablename):
             # Create the table
-            conn = self.db_backend.connect(self.db_filename)
+            conn = self.connect()
             primary_key = self.get_primary_key(tablename)
             if not primary_key:
                 # Create a new table (without a primary key)
@@ -72,26 +135,183 @@ class DatabaseSQL(DatabaseBase):
                 self.write_table_create_with_primary_key(
                     tablename, df, primary_key, conn
                 )
+            counts = self.record_history(tablename, df, commit_id, conn, new=True)
         else:
             # Append or upsert into an existing table
             self.backup(self.db_filename)
-            conn = self.db_backend.connect(self.db_filename)
+            conn = self.connect()
+            self.apply_schema_changes(tablename, conn, destructive=False)
+            counts = self.record_history(tablename, df, commit_id, conn)
             if self.write_policy == WritePolicy.APPEND:
                 self.write_table_append(tablename, df, conn)
             elif self.write_policy == WritePolicy.UPSERT:
                 self.write_table_upsert(tablename, df, conn)
             else:
                 raise ValueError(f"Invalid write policy: {self.write_policy}")
+        if row_hashes is not None:
+            self.write_row_hashes(tablename, row_hashes, conn)
+        if self.get_primary_key(tablename):
+            self.update_search_index(
+                tablename, df[self.get_primary_key(tablename)].tolist(), conn
+            )
+        # Maintain secondary indexes and refresh planner statistics after the load
+        self.create_indexes(tablename, conn)
+        conn.execute(f'ANALYZE "{tablename}"')
+        conn.commit()
+        conn.close()
+        return counts
+
+    # override
+    def rollback(self, commit_id: int, commit_info: dict = None) -> int:
+        """Undo a commit using the prior versions of rows recorded in its history
+
+        Rows are restored to their previous values, or deleted if the commit inserted
+        them. Rows changed again by a later commit are left as they are.
+        """
+        commit = self.commit_log.get(commit_id)
+        if not commit:
+            raise ValueError(f"Commit {commit_id} not found.")
+        tablename = commit["table_name"]
+        primary_key = self.get_primary_key(tablename)
+        if not primary_key:
+            raise ValueError(f"Table '{tablename}' has no primary key to roll back.")
+        history_table = f'"{HISTORY_PREFIX}{tablename}"'
+        conn = self.connect()
+        changes = self.query_to_pandas(
+            f"SELECT * FROM {history_table} WHERE _commit_id = {int(commit_id)}", conn
+        )
+        later_keys = [
+            row[0]
+            for row in conn.execute(
+                f'SELECT DISTINCT "{primary_key}" FROM {history_table} '
+                f"WHERE _commit_id > {int(commit_id)} "
+                f'AND "{primary_key}" IN (SELECT "{primary_key}" FROM {history_table} '
+                f"WHERE _commit_id = {int(commit_id)})"
+            ).fetchall()
+        ]
+        if later_keys:
+            logging.warning(
+                "Rollback of commit %d skips %d record(s) changed by later commits",
+                commit_id,
+                len(later_keys),
+            )
+            changes = changes[~changes[primary_key].isin(later_keys)]
+        inserted = changes[changes["_history_op"] == "insert"]
+        updated = changes[changes["_history_op"] == "update"].drop(
+            columns=["_commit_id", "_history_op"]
+        )
+        commit_info = {
+            "source": f"rollback of commit {commit_id}",
+            **(commit_info or {}),
+        }
+        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        rollback_id = self.commit_log.begin(tablename, timestamp, commit_info)
+        try:
+            # Record the rows being replaced, so that the rollback can also be undone
+            self.backup(self.db_filename)
+            self.record_history(
+                tablename, changes[[primary_key]], rollback_id, conn, upsert=True
+            )
+            # Restored rows no longer match their recorded hashes
+            self.write_row_hashes(
+                tablename,
+                changes[[primary_key]].assign(**{ROW_HASH_COLUMN: None}),
+                conn,
+            )
+            if len(inserted):
+                conn.executemany(
+                    f'DELETE FROM {tablename} WHERE "{primary_key}" = ?',
+                    [(key,) for key in inserted[primary_key].tolist()],
+                )
+            if len(updated):
+                self.write_table_upsert(tablename, updated, conn)
+            self.update_search_index(tablename, changes[primary_key].tolist(), conn)
+            conn.commit()
+        except Exception:
+            self.commit_log.discard(rollback_id)
+            raise
+        finally:
+            conn.close()
+        self.commit_log.finish(rollback_id, 0, len(updated), len(inserted))
+        self.bump_generation(tablename)
+        return rollback_id
 
     # override
     def sql_query(self, query: str, tablename: str) -> pd.DataFrame:
-        conn = self.db_backend.connect(self.db_filename)
-        df = pd.read_sql_query(query, conn)
+        conn = self.connect()
+        df = self.query_to_pandas(query, conn)
         conn.close()
         return df
 
+    # override
+    def search_index_query(
+        self, tablename: str, terms: [str], limit: int
+    ) -> pd.DataFrame | None:
+        if not self.does_table_exist(tablename):
+            return None
+        conn = self.connect()
+        # Index the table if it was committed before the index was enabled
+        self.update_search_index(tablename, None, conn, create_only=True)
+        conn.commit()
+        primary_key = self.get_primary_key(tablename)
+        df = self.query_to_pandas(
+            f'SELECT * FROM "{tablename}" WHERE "{primary_key}" IN '
+            f"({self.search_keys_query(tablename, terms)}) "
+            f'ORDER BY "{primary_key}" LIMIT {int(limit)}',
+            conn,
+        )
+        conn.close()
+        return self.decode_array_columns(df, tablename)
+
+    # override
+    def diff_table_schema(self, tablename: str, conn=None) -> [tuple]:
+        close_conn = conn is None
+        conn = conn or self.connect()
+        stored_types = {
+            row[1]: row[2]
+            for row in conn.execute(
+                f"PRAGMA table_info('{self.storage_table(tablename)}')"
+            ).fetchall()
+        }
+        changes = []
+        schema = self.get_table_schema(tablename)
+        for col_name, props in schema.get("properties", {}).items():
+            sql_type = self.json_type_to_sql(props).removesuffix(" NULL")
+            sql_type = self.canonical_sql_type(sql_type, conn)
+            stored_type = stored_types.get(col_name)
+            if stored_type is None:
+                changes.append((SchemaChange.ADD_COLUMN, col_name, None, sql_type))
+            elif stored_type != sql_type:
+                if self.sql_type_widens(stored_type, sql_type):
+                    change = SchemaChange.WIDEN_TYPE
+                else:
+                    change = SchemaChange.CHANGE_TYPE
+                changes.append((change, col_name, stored_type, sql_type))
+        if close_conn:
+            conn.close()
+        return changes
+
+    # override
+    def evolve_table(self, tablename: str) -> [tuple]:
+        conn = self.connect()
+        changes = self.apply_schema_changes(tablename, conn, destructive=True)
+        if any(change == SchemaChange.CHANGE_TYPE for change, *_ in changes):
+            # Stored row hashes no longer reflect the converted values
+            self.clear_row_hashes(tablename, conn)
+        if changes:
+            self.update_search_index(tablename, None, conn)
+        self.create_indexes(tablename, conn)
+        conn.commit()
+        conn.close()
+        if changes:
+            self.bump_generation(tablename)
+        return changes
+
     # Utility functions
 
+    def connect(self):
+        return self.db_backend.connect(self.db_filename)
+
     def backup(self, file_path, backup_policy: BackupPolicy = None):
         backup_policy = backup_policy or self.backup_policy
         if backup_policy == BackupPolicy.TIMESTAMPED_COPIES:
@@ -106,6 +326,21 @@ class DatabaseSQL(DatabaseBase):
                 backup_folder / f"{file_stem}_{datetime_stamp}.{self.suffix}",
             )
 
+    def query_to_pandas(self, query: str, conn) -> pd.DataFrame:
+        return pd.read_sql_query(query, conn, **self.dtype_backend_kwargs())
+
+    def encode_array_columns(self, df: pd.DataFrame, tablename: str) -> pd.DataFrame:
+        # Convert list values to the backend's native array representation
+        return df
+
+    def decode_array_columns(self, df: pd.DataFrame, tablename: str) -> pd.DataFrame:
+        # Convert the backend's native array representation back to lists
+        return df
+
+    def storage_table(self, tablename: str) -> str:
+        # Name of the table holding a table's rows
+        return tablename
+
     def does_table_exist(self, tablename: str):
         return tablename in self.get_tables_list()
 
@@ -114,7 +349,7 @@ class DatabaseSQL(DatabaseBase):
         logging.info("Creating table (no primary key): %s", tablename)
         self.initialise_table(tablename)
         df = df.replace({np.nan: None})
-        df.to_sql(tablename, conn, index=False)
+        df.to_sql(tablename, conn, index=False, if_exists="append")
 
     def write_table_create_with_primary_key(
         self, tablename: str, df: pd.DataFrame, primary_key, conn
@@ -159,7 +394,7 @@ class DatabaseSQL(DatabaseBase):
         conn.commit()
 
     def initialise_table(self, tablename: str):
-        conn = self.db_backend.connect(self.db_filename)
+        conn = self.connect()
         schema = self.get_table_schema(tablename)
         columns = schema.get("properties", {})
         column_definitions = []
@@ -173,6 +408,606 @@ class DatabaseSQL(DatabaseBase):
         conn.execute(f"CREATE TABLE {tablename} ({sql_schema});")
         conn.close()
 
+    def apply_schema_changes(self, tablename: str, conn, destructive: bool = True):
+        # New fields are added in place (existing rows read as null); type changes
+        #  are left to the backend, and are skipped unless 'destructive' is set
+        changes = self.diff_table_schema(tablename, conn)
+        for change, col_name, _, sql_type in changes:
+            if change == SchemaChange.ADD_COLUMN:
+                logging.info("Adding column '%s' to table: %s", col_name, tablename)
+                conn.execute(
+                    f"ALTER TABLE {self.storage_table(tablename)} "
+                    f'ADD COLUMN "{col_name}" {sql_type}'
+                )
+        type_changes = [
+            (change, col_name, sql_type)
+            for change, col_name, _, sql_type in changes
+            if change == SchemaChange.WIDEN_TYPE
+            or (change == SchemaChange.CHANGE_TYPE and destructive)
+        ]
+        if type_changes:
+            self.alter_column_types(self.storage_table(tablename), type_changes, conn)
+        return changes
+
+    def alter_column_types(self, tablename: str, type_changes: [tuple], conn):
+        for _, col_name, sql_type in type_changes:
+            logging.info("Altering column '%s' of table: %s", col_name, tablename)
+            conn.execute(
+                f'ALTER TABLE {tablename} ALTER COLUMN "{col_name}" TYPE {sql_type}'
+            )
+
+    def canonical_sql_type(self, sql_type: str, conn) -> str:
+        # Type name as reported by the database for a declared type
+        return sql_type.upper()
+
+    def sql_type_widens(self, stored_type: str, sql_type: str) -> bool:
+        # Whether every stored value is representable in the new type
+        return False
+
+    def record_history(
+        self,
+        tablename: str,
+        df: pd.DataFrame,
+        commit_id: int,
+        conn,
+        new: bool = False,
+        upsert: bool = None,
+    ):
+        """Record the rows that a commit is about to change in the history table
+
+        Existing rows are copied ('update') before they are overwritten, and keys that
+        do not yet exist are recorded ('insert'). Returns the number of rows inserted
+        and updated by the commit.
+        """
+        primary_key = self.get_primary_key(tablename)
+        if not primary_key:
+            return len(df), 0
+        if upsert is None:
+            upsert = self.write_policy == WritePolicy.UPSERT
+        history_table = f'"{HISTORY_PREFIX}{tablename}"'
+        columns = self.ensure_history_table(tablename, conn)
+        keys = df[primary_key].dropna().drop_duplicates().tolist()
+        self.create_keys_table(keys, dict(columns)[primary_key], conn)
+        if upsert and not new:
+            column_list = ", ".join(f'"{col_name}"' for col_name, _ in columns)
+            conn.execute(
+                f"INSERT INTO {history_table} ({column_list}, _commit_id, _history_op) "
+                f"SELECT {column_list}, {int(commit_id)}, 'update' FROM {tablename} "
+                f'WHERE "{primary_key}" IN (SELECT k FROM _commit_keys)'
+            )
+        query = (
+            f'INSERT INTO {history_table} ("{primary_key}", _commit_id, _history_op) '
+            f"SELECT k, {int(commit_id)}, 'insert' FROM _commit_keys"
+        )
+        if not new:
+            query += f' WHERE k NOT IN (SELECT "{primary_key}" FROM {tablename})'
+        conn.execute(query)
+        conn.execute("DROP TABLE _commit_keys")
+        counts = dict(
+            conn.execute(
+                f"SELECT _history_op, COUNT(*) FROM {history_table} "
+                f"WHERE _commit_id = {int(commit_id)} GROUP BY _history_op"
+            ).fetchall()
+        )
+        return counts.get("insert", 0), counts.get("update", 0)
+
+    def ensure_history_table(self, tablename: str, conn) -> [tuple]:
+        # Create (or add new columns to) the table's history; returns the table's
+        #  (column name, type) pairs
+        columns = [
+            (row[1], row[2])
+            for row in conn.execute(f"PRAGMA table_info('{tablename}')").fetchall()
+        ]
+        history_name = f"{HISTORY_PREFIX}{tablename}"
+        exists = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
+            [history_name],
+        ).fetchall()
+        if not exists:
+            column_definitions = ", ".join(
+                f'"{col_name}" {sql_type}' for col_name, sql_type in columns
+            )
+            conn.execute(
+                f'CREATE TABLE "{history_name}" ({column_definitions}, '
+                "_commit_id INTEGER, _history_op TEXT)"
+            )
+            for col_name in ["_commit_id", self.get_primary_key(tablename)]:
+                index_name = f"idx_{history_name}_{col_name}".replace(" ", "_")
+                conn.execute(
+                    f'CREATE INDEX "{index_name}" ON "{history_name}" ("{col_name}")'
+                )
+        else:
+            history_columns = [
+                row[1]
+                for row in conn.execute(
+                    f"PRAGMA table_info('{history_name}')"
+                ).fetchall()
+            ]
+            for col_name, sql_type in columns:
+                if col_name not in history_columns:
+                    conn.execute(
+                        f'ALTER TABLE "{history_name}" '
+                        f'ADD COLUMN "{col_name}" {sql_type}'
+                    )
+        return columns
+
+    def create_keys_table(
+        self, keys: list, key_type: str, conn, row_hashes: list = None
+    ):
+        # Temporary table of the primary keys touched by a commit (and row hashes)
+        row_hashes = row_hashes or [None] * len(keys)
+        conn.execute(f"CREATE TEMP TABLE _commit_keys (k {key_type}, h BIGINT)")
+        if keys:
+            conn.executemany(
+                "INSERT INTO _commit_keys VALUES (?, ?)",
+                list(zip(keys, row_hashes, strict=True)),
+            )
+
+    def primary_key_type(self, tablename: str, conn) -> str:
+        primary_key = self.get_primary_key(tablename)
+        return dict(
+            (row[1], row[2])
+            for row in conn.execute(
+                f"PRAGMA table_info('{self.storage_table(tablename)}')"
+            ).fetchall()
+        )[primary_key]
+
+    def ensure_row_hashes_table(self, tablename: str, conn) -> str:
+        # Create the table's row hashes if required; returns its (quoted) name
+        primary_key = self.get_primary_key(tablename)
+        key_type = self.primary_key_type(tablename, conn)
+        hashes_name = f"{ROW_HASHES_PREFIX}{tablename}"
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS "{hashes_name}" '
+            f'("{primary_key}" {key_type}, {ROW_HASH_COLUMN} BIGINT)'
+        )
+        index_name = f"idx_{hashes_name}_{primary_key}".replace(" ", "_")
+        conn.execute(
+            f'CREATE INDEX IF NOT EXISTS "{index_name}" '
+            f'ON "{hashes_name}" ("{primary_key}")'
+        )
+        return f'"{hashes_name}"'
+
+    def read_row_hashes(self, tablename: str, df: pd.DataFrame) -> pd.DataFrame:
+        # Stored keys and row hashes (null where not recorded) of the incoming rows
+        primary_key = self.get_primary_key(tablename)
+        conn = self.connect()
+        key_type = self.primary_key_type(tablename, conn)
+        keys = df[primary_key].dropna().drop_duplicates().tolist()
+        self.create_keys_table(keys, key_type, conn)
+        rows = conn.execute(self.row_hashes_query(tablename, conn)).fetchall()
+        conn.execute("DROP TABLE _commit_keys")
+        conn.commit()
+        conn.close()
+        # Hashes use the full 64-bit range, so must not pass through floats
+        return pd.DataFrame(
+            {
+                primary_key: [row[0] for row in rows],
+                ROW_HASH_COLUMN: pd.array([row[1] for row in rows], dtype="Int64"),
+            }
+        )
+
+    def row_hashes_query(self, tablename: str, conn) -> str:
+        # Query for the stored keys and row hashes of the keys in '_commit_keys'
+        primary_key = self.get_primary_key(tablename)
+        hashes_table = self.ensure_row_hashes_table(tablename, conn)
+        return (
+            f'SELECT t."{primary_key}", h.{ROW_HASH_COLUMN} FROM {tablename} t '
+            f'JOIN _commit_keys c ON t."{primary_key}" = c.k '
+            f'LEFT JOIN {hashes_table} h ON h."{primary_key}" = t."{primary_key}"'
+        )
+
+    def clear_row_hashes(self, tablename: str, conn):
+        # Forget every recorded hash (e.g. once stored values have been converted)
+        conn.execute(f"DELETE FROM {self.ensure_row_hashes_table(tablename, conn)}")
+
+    def write_row_hashes(self, tablename: str, row_hashes: pd.DataFrame, conn):
+        # Replace the recorded hashes of the given keys (null hashes never match)
+        primary_key = self.get_primary_key(tablename)
+        hashes_table = self.ensure_row_hashes_table(tablename, conn)
+        row_hashes = row_hashes.dropna(subset=[primary_key]).drop_duplicates(
+            primary_key, keep="last"
+        )
+        key_type = self.primary_key_type(tablename, conn)
+        self.create_keys_table(
+            row_hashes[primary_key].tolist(),
+            key_type,
+            conn,
+            row_hashes[ROW_HASH_COLUMN].tolist(),
+        )
+        conn.execute(
+            f'DELETE FROM {hashes_table} WHERE "{primary_key}" IN '
+            "(SELECT k FROM _commit_keys)"
+        )
+        conn.execute(
+            f"INSERT INTO {hashes_table} SELECT k, h FROM _commit_keys "
+            "WHERE h IS NOT NULL"
+        )
+        conn.execute("DROP TABLE _commit_keys")
+
+    def update_search_index(
+        self, tablename: str, keys: list, conn, create_only: bool = False
+    ):
+        # Re-index the rows with the given keys (every row if None); a new index is
+        #  always built from every row
+        if not (self.search_index and self.get_primary_key(tablename)):
+            return
+        index_name = f'"{SEARCH_PREFIX}{tablename}"'
+        created = not conn.execute(
+            "SELECT name FROM sqlite_master WHERE name = ?",
+            [f"{SEARCH_PREFIX}{tablename}"],
+        ).fetchall()
+        if created:
+            self.create_search_index(tablename, index_name, conn)
+            keys = None
+        elif create_only:
+            return
+        if keys is None:
+            conn.execute(f"DELETE FROM {index_name}")
+            self.index_rows(tablename, index_name, "", conn)
+            return
+        primary_key = self.get_primary_key(tablename)
+        key_type = self.primary_key_type(tablename, conn)
+        self.create_keys_table(list(dict.fromkeys(keys)), key_type, conn)
+        conn.execute(
+            f"DELETE FROM {index_name} WHERE key IN (SELECT k FROM _commit_keys)"
+        )
+        self.index_rows(
+            tablename,
+            index_name,
+            f' WHERE "{primary_key}" IN (SELECT k FROM _commit_keys)',
+            conn,
+        )
+        conn.execute("DROP TABLE _commit_keys")
+
+    def create_search_index(self, tablename: str, index_name: str, conn):
+        # Inverted index of the (lower-case) words in each row
+        key_type = self.primary_key_type(tablename, conn)
+        conn.execute(f"CREATE TABLE {index_name} (token TEXT, key {key_type})")
+        conn.execute(
+            f'CREATE INDEX "idx_{SEARCH_PREFIX}{tablename}_token" '
+            f"ON {index_name} (token)"
+        )
+
+    def index_rows(self, tablename: str, index_name: str, condition: str, conn):
+        # Add the rows matching a condition to the search index
+        primary_key = self.get_primary_key(tablename)
+        df = self.decode_array_columns(
+            self.query_to_pandas(f'SELECT * FROM "{tablename}"{condition}', conn),
+            tablename,
+        )
+        tokens = search_tokens(df, df[primary_key])
+        if len(tokens):
+            conn.executemany(
+                f"INSERT INTO {index_name} VALUES (?, ?)",
+                tokens.astype(object).values.tolist(),
+            )
+
+    def search_keys_query(self, tablename: str, terms: [str]) -> str:
+        # Keys of the rows containing every term (terms are word characters only)
+        index_name = f'"{SEARCH_PREFIX}{tablename}"'
+        queries = []
+        for term in terms:
+            if term.endswith("*"):
+                prefix = term[:-1]
+                condition = f"token >= '{prefix}' AND token < '{prefix}\uffff'"
+            else:
+                condition = f"token = '{term}'"
+            queries.append(f"SELECT key FROM {index_name} WHERE {condition}")
+        return " INTERSECT ".join(queries)
+
+    def get_indexed_columns(self, tablename: str) -> [str]:
+        # Fields annotated with '"Index": true' in the table schema
+        schema = self.get_table_schema(tablename)
+        return [
+            col_name
+            for col_name, props in schema.get("properties", {}).items()
+            if props.get("Index", False) and not props.get("PrimaryKey", False)
+        ]
+
+    def create_indexes(self, tablename: str, conn):
+        # Create any secondary indexes requested in the schema (idempotent)
+        array_columns = self.get_array_columns(tablename)
+        for col_name in self.get_indexed_columns(tablename):
+            if col_name in array_columns:
+                logging.warning(
+                    "Index requested on array field '%s' is not supported, skipping",
+                    col_name,
+                )
+                continue
+            index_name = f"idx_{tablename}_{col_name}".replace(" ", "_")
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "{index_name}" '
+                f'ON {self.storage_table(tablename)} ("{col_name}")'
+            )
+
     @abstractmethod
     def json_type_to_sql(self, props):
         pass  # pragma: no cover
+
+
+# Version history for the SQL databases (mixed in ahead of a DatabaseSQL backend)
+class DatabaseSQLVersioned(DatabaseSQL):
+    """Keep every version of each row, as a type 2 slowly changing dimension
+
+    Rows are stored in '_versions_<table>', each version being valid from the commit
+    that wrote it until the commit that replaced it. The table itself is a view of
+    the current versions, so reads remain a single (indexed) query.
+    """
+
+    # override
+    def get_tables_list(self):
+        if not self.db_filename.exists():
+            return []
+        conn = self.connect()
+        tables = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table';"
+        ).fetchall()
+        conn.close()
+        return [
+            table[0].removeprefix(VERSIONS_PREFIX)
+            for table in tables
+            if table[0].startswith(VERSIONS_PREFIX)
+        ]
+
+    # override
+    def write_table(self, tablename: str, df: pd.DataFrame, commit_id: int):
+        # Close the current versions of the incoming rows, then insert their new
+        #  versions, with one set-based statement each
+        primary_key = self.get_primary_key(tablename)
+        storage = self.storage_table(tablename)
+        commit_id = int(commit_id)
+        if not self.does_table_exist(tablename):
+            logging.info("Creating versioned table: %s", tablename)
+            self.initialise_table(tablename)
+            conn = self.connect()
+        else:
+            self.backup(self.db_filename)
+            conn = self.connect()
+            self.apply_schema_changes(tablename, conn, destructive=False)
+        if primary_key:
+            df = df.drop_duplicates(primary_key, keep="last")
+        self.stage_rows(df, conn)
+        if primary_key:
+            if self.write_policy == WritePolicy.APPEND:
+                # Existing rows are left as they are
+                conn.execute(
+                    f'DELETE FROM _incoming WHERE "{primary_key}" IN '
+                    f'(SELECT "{primary_key}" FROM "{tablename}")'
+                )
+            elif self.write_policy != WritePolicy.UPSERT:
+                raise ValueError(f"Invalid write policy: {self.write_policy}")
+            conn.execute(
+                f"UPDATE {storage} SET _valid_to = {commit_id} "
+                f'WHERE _valid_to IS NULL AND "{primary_key}" IN '
+                f'(SELECT "{primary_key}" FROM _incoming)'
+            )
+        # Columns not supplied keep their values from the version being replaced
+        columns = self.stored_columns(tablename, conn)
+        select = [
+            f'i."{col_name}"'
+            if col_name in df.columns
+            else (f'p."{col_name}"' if primary_key else "NULL")
+            for col_name in columns
+        ]
+        query = (
+            f"INSERT INTO {storage} ({self.column_list(columns)}, {', '.join(VALID_COLUMNS)}) "
+            f"SELECT {', '.join(select)}, {commit_id}, NULL, 0 FROM _incoming i"
+        )
+        if primary_key:
+            query += (
+                f' LEFT JOIN {storage} p ON p."{primary_key}" = i."{primary_key}" '
+                f"AND p._valid_to = {commit_id}"
+            )
+        conn.execute(query)
+        conn.execute("DROP TABLE _incoming")
+        written = self.count_versions(storage, f"_valid_from = {commit_id}", conn)
+        updated = self.count_versions(
+            storage, f"_valid_to = {commit_id} AND _deleted = 0", conn
+        )
+        if primary_key:
+            self.update_search_index(tablename, df[primary_key].tolist(), conn)
+        self.create_indexes(tablename, conn)
+        conn.execute(f"ANALYZE {storage}")
+        conn.commit()
+        conn.close()
+        return written - updated, updated
+
+    # override
+    def rollback(self, commit_id: int, commit_info: dict = None) -> int:
+        """Undo a commit by reinstating the versions that it replaced
+
+        Rows inserted by the commit are given a deleted version, so that the rollback
+        can itself be undone. Rows changed again by a later commit are left as they
+        are.
+        """
+        commit = self.commit_log.get(commit_id)
+        if not commit:
+            raise ValueError(f"Commit {commit_id} not found.")
+        tablename = commit["table_name"]
+        primary_key = self.get_primary_key(tablename)
+        if not primary_key:
+            raise ValueError(f"Table '{tablename}' has no primary key to roll back.")
+        storage = self.storage_table(tablename)
+        commit_id = int(commit_id)
+        conn = self.connect()
+        later = self.count_versions(
+            storage, f"_valid_from = {commit_id} AND _valid_to IS NOT NULL", conn
+        )
+        if later:
+            logging.warning(
+                "Rollback of commit %d skips %d record(s) changed by later commits",
+                commit_id,
+                later,
+            )
+        commit_info = {
+            "source": f"rollback of commit {commit_id}",
+            **(commit_info or {}),
+        }
+        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        rollback_id = self.commit_log.begin(tablename, timestamp, commit_info)
+        try:
+            self.backup(self.db_filename)
+            columns = self.stored_columns(tablename, conn)
+            column_list = self.column_list(columns)
+            valid_columns = ", ".join(VALID_COLUMNS)
+            # Close the commit's versions that are still current
+            conn.execute(
+                f"UPDATE {storage} SET _valid_to = {rollback_id} "
+                f"WHERE _valid_from = {commit_id} AND _valid_to IS NULL"
+            )
+            closed = (
+                f'SELECT "{primary_key}" FROM {storage} '
+                f"WHERE _valid_from = {commit_id} AND _valid_to = {rollback_id}"
+            )
+            # Reinstate the versions that the commit replaced
+            conn.execute(
+                f"INSERT INTO {storage} ({column_list}, {valid_columns}) "
+                f"SELECT {column_list}, {rollback_id}, NULL, _deleted FROM {storage} "
+                f'WHERE _valid_to = {commit_id} AND "{primary_key}" IN ({closed})'
+            )
+            # Delete the rows that the commit inserted
+            deleted_select = ", ".join(
+                "NULL" if col_name == ROW_HASH_COLUMN else f'"{col_name}"'
+                for col_name in columns
+            )
+            conn.execute(
+                f"INSERT INTO {storage} ({column_list}, {valid_columns}) "
+                f"SELECT {deleted_select}, {rollback_id}, NULL, 1 FROM {storage} "
+                f"WHERE _valid_from = {commit_id} AND _valid_to = {rollback_id} "
+                f'AND "{primary_key}" NOT IN (SELECT "{primary_key}" FROM {storage} '
+                f"WHERE _valid_to = {commit_id})"
+            )
+            updated = self.count_versions(
+                storage, f"_valid_from = {rollback_id} AND _deleted = 0", conn
+            )
+            deleted = self.count_versions(
+                storage, f"_valid_from = {rollback_id} AND _deleted = 1", conn
+            )
+            keys = conn.execute(
+                f'SELECT "{primary_key}" FROM {storage} '
+                f"WHERE _valid_from = {rollback_id}"
+            ).fetchall()
+            self.update_search_index(tablename, [key[0] for key in keys], conn)
+            conn.commit()
+        except Exception:
+            self.commit_log.discard(rollback_id)
+            raise
+        finally:
+            conn.close()
+        self.commit_log.finish(rollback_id, 0, updated, deleted)
+        self.bump_generation(tablename)
+        return rollback_id
+
+    # override
+    def initialise_table(self, tablename: str):
+        conn = self.connect()
+        schema = self.get_table_schema(tablename)
+        column_definitions = [
+            f'"{col_name}" {self.json_type_to_sql(props)}'
+            for col_name, props in schema.get("properties", {}).items()
+        ]
+        column_definitions += [
+            f"{ROW_HASH_COLUMN} BIGINT",
+            "_valid_from INTEGER",
+            "_valid_to INTEGER NULL",
+            "_deleted INTEGER",
+        ]
+        conn.execute(
+            f"CREATE TABLE {self.storage_table(tablename)} "
+            f"({', '.join(column_definitions)});"
+        )
+        self.create_current_view(tablename, conn)
+        conn.commit()
+        conn.close()
+
+    # override
+    def apply_schema_changes(self, tablename: str, conn, destructive: bool = True):
+        # The view is recreated to include any new columns (and as SQLite will not
+        #  rename a table while a view depends on it)
+        conn.execute(f'DROP VIEW IF EXISTS "{tablename}"')
+        changes = super().apply_schema_changes(tablename, conn, destructive)
+        self.create_current_view(tablename, conn)
+        return changes
+
+    # override
+    def create_indexes(self, tablename: str, conn):
+        super().create_indexes(tablename, conn)
+        storage = self.storage_table(tablename)
+        primary_key = self.get_primary_key(tablename)
+        if primary_key:
+            self.create_current_index(tablename, primary_key, conn)
+        for col_name in ["_valid_from", "_valid_to"]:
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "idx_{storage}_{col_name}" '
+                f"ON {storage} ({col_name})"
+            )
+
+    # override
+    def storage_table(self, tablename: str) -> str:
+        return f"{VERSIONS_PREFIX}{tablename}"
+
+    # override
+    def row_hashes_query(self, tablename: str, conn) -> str:
+        primary_key = self.get_primary_key(tablename)
+        return (
+            f'SELECT v."{primary_key}", v.{ROW_HASH_COLUMN} '
+            f"FROM {self.storage_table(tablename)} v "
+            f'JOIN _commit_keys c ON v."{primary_key}" = c.k '
+            "WHERE v._valid_to IS NULL AND v._deleted = 0"
+        )
+
+    # override
+    def clear_row_hashes(self, tablename: str, conn):
+        conn.execute(
+            f"UPDATE {self.storage_table(tablename)} SET {ROW_HASH_COLUMN} = NULL "
+            "WHERE _valid_to IS NULL"
+        )
+
+    def create_current_view(self, tablename: str, conn):
+        # The table as a view of the current (non-deleted) versions of its rows
+        columns = [
+            col_name
+            for col_name in self.stored_columns(tablename, conn)
+            if col_name != ROW_HASH_COLUMN
+        ]
+        conn.execute(f'DROP VIEW IF EXISTS "{tablename}"')
+        conn.execute(
+            f'CREATE VIEW "{tablename}" AS SELECT {self.column_list(columns)} '
+            f"FROM {self.storage_table(tablename)} "
+            "WHERE _valid_to IS NULL AND _deleted = 0"
+        )
+
+    def create_current_index(self, tablename: str, primary_key: str, conn):
+        # Index of the primary key, over which the current versions are looked up
+        storage = self.storage_table(tablename)
+        conn.execute(
+            f'CREATE INDEX IF NOT EXISTS "idx_{storage}_{primary_key}" '
+            f'ON {storage} ("{primary_key}")'
+        )
+
+    def stage_rows(self, df: pd.DataFrame, conn):
+        # Load the incoming rows into the temporary table '_incoming'
+        conn.execute(f"CREATE TEMP TABLE _incoming ({self.column_list(df.columns)})")
+        if len(df):
+            rows = df.astype(object).where(df.notna(), None).values.tolist()
+            placeholders = ", ".join("?" for _ in df.columns)
+            conn.executemany(f"INSERT INTO _incoming VALUES ({placeholders})", rows)
+
+    def stored_columns(self, tablename: str, conn) -> [str]:
+        # Stored columns (including row hashes), excluding the validity columns
+        return [
+            row[1]
+            for row in conn.execute(
+                f"PRAGMA table_info('{self.storage_table(tablename)}')"
+            ).fetchall()
+            if row[1] not in VALID_COLUMNS
+        ]
+
+    def column_list(self, columns: [str]) -> str:
+        return ", ".join(f'"{col_name}"' for col_name in columns)
+
+    def count_versions(self, storage: str, condition: str, conn) -> int:
+        return conn.execute(
+            f"SELECT COUNT(*) FROM {storage} WHERE {condition}"
+        ).fetchone()[0]
@@ -1,12 +1,40 @@
+import json
 import sqlite3
 import logging
+import pandas as pd
 
 from pathlib import Path
+from datetime import datetime
 
-from InsightBoard.database.db_sql import DatabaseSQL
-from InsightBoard.database.db_base import DatabaseBackend
+from InsightBoard.database.db_sql import DatabaseSQL, DatabaseSQLVersioned
+from InsightBoard.database.db_base import (
+    DatabaseBase,
+    DatabaseBackend,
+    BackupPolicy,
+    SchemaChange,
+    parse_array_string,
+)
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
 
 DATABASE_SQLITE_VERSION = "1.0.0"
+DATABASE_SQLITE_VERSIONED_VERSION = "1.0.0"
+
+# Performance profile applied to every connection; override any of these in the
+#  project configuration under [database.sqlite]
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # Write-ahead log: readers do not block behind writers
+    "synchronous": "NORMAL",  # Safe with WAL, and avoids an fsync per transaction
+    "mmap_size": 268435456,  # Memory-mapped I/O (bytes)
+    "cache_size": -65536,  # Page cache (negative values are in KiB)
+    "temp_store": "MEMORY",  # Temporary tables and indices held in memory
+}
+
+# DuckDB types for the items of (JSON-encoded) array fields in analytical queries
+DUCKDB_ITEM_TYPES = {"integer": "BIGINT", "number": "DOUBLE", "boolean": "BOOLEAN"}
 
 
 class DatabaseSQLite(DatabaseSQL):
@@ -16,6 +44,157 @@ class DatabaseSQLite(DatabaseSQL):
         self.db_version = DATABASE_SQLITE_VERSION
         self.db_filename = Path(self.data_folder) / "db.sqlite"
         self.db_backend = sqlite3
+        self.backend_options = dict(SQLITE_PRAGMAS)
+
+    # override (DatabaseBase)
+    def set_backend_options(self, options: dict):
+        for key, value in options.items():
+            if key not in SQLITE_PRAGMAS:
+                raise ValueError(f"Unsupported SQLite option: '{key}'")
+            if not (isinstance(value, int) or str(value).isalnum()):
+                raise ValueError(f"Invalid value for SQLite option '{key}': {value}")
+        super().set_backend_options(options)
+
+    # override (DatabaseSQL)
+    def connect(self):
+        conn = super().connect()
+        for key, value in self.backend_options.items():
+            conn.execute(f"PRAGMA {key}={value}")
+        return conn
+
+    # override (DatabaseSQL)
+    def backup(self, file_path, backup_policy: BackupPolicy = None):
+        # Use the online backup API, which includes pages still held in the WAL
+        backup_policy = backup_policy or self.backup_policy
+        if backup_policy == BackupPolicy.TIMESTAMPED_COPIES:
+            if not isinstance(file_path, Path):
+                file_path = Path(file_path)
+            backup_folder = Path(self.data_folder) / "backup"
+            backup_folder.mkdir(parents=True, exist_ok=True)
+            datetime_stamp = datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
+            file_stem = file_path.stem
+            src = sqlite3.connect(file_path)
+            dst = sqlite3.connect(
+                backup_folder / f"{file_stem}_{datetime_stamp}.{self.suffix}"
+            )
+            src.backup(dst)
+            dst.close()
+            src.close()
+
+    # override (DatabaseSQL)
+    def encode_array_columns(self, df: pd.DataFrame, tablename: str) -> pd.DataFrame:
+        # Arrays are stored as JSON text, queryable with the JSON1 functions
+        array_columns = [
+            c for c in self.get_array_columns(tablename) if c in df.columns
+        ]
+        if not array_columns:
+            return df
+        df = df.copy()
+        for col in array_columns:
+            df[col] = df[col].map(lambda x: json.dumps(x) if isinstance(x, list) else x)
+        return df
+
+    # override (DatabaseSQL)
+    def decode_array_columns(self, df: pd.DataFrame, tablename: str) -> pd.DataFrame:
+        array_columns = [
+            c for c in self.get_array_columns(tablename) if c in df.columns
+        ]
+        for col in array_columns:
+            df[col] = (
+                df[col]
+                .astype(object)
+                # JSON text, or display text (e.g. '[c, d]') stored before arrays
+                #  were written as JSON
+                .map(lambda x: parse_array_string(x) if isinstance(x, str) else None)
+            )
+        return df
+
+    # override (DatabaseSQL)
+    def sql_type_widens(self, stored_type: str, sql_type: str) -> bool:
+        return (stored_type, sql_type) == ("INTEGER", "REAL")
+
+    # override (DatabaseSQL)
+    def alter_column_types(self, tablename: str, type_changes: [tuple], conn):
+        # SQLite cannot alter a column's type. Widening INTEGER to REAL needs no change
+        #  under type affinity; anything else requires the table to be rebuilt
+        if not any(change == SchemaChange.CHANGE_TYPE for change, *_ in type_changes):
+            return
+        logging.info("Rebuilding table: %s", tablename)
+        new_types = {col_name: sql_type for _, col_name, sql_type in type_changes}
+        column_names, column_definitions = [], []
+        for _, col_name, sql_type, notnull, _, pk in conn.execute(
+            f"PRAGMA table_info('{tablename}')"
+        ).fetchall():
+            col_def = f'"{col_name}" {new_types.get(col_name, sql_type)}'
+            if pk:
+                col_def += " PRIMARY KEY"
+            if notnull:
+                col_def += " NOT NULL"
+            column_names.append(f'"{col_name}"')
+            column_definitions.append(col_def)
+        columns = ", ".join(column_names)
+        temp_table = f'"_rebuild_{tablename}"'
+        conn.execute(f"CREATE TABLE {temp_table} ({', '.join(column_definitions)})")
+        conn.execute(
+            f"INSERT INTO {temp_table} ({columns}) SELECT {columns} FROM {tablename}"
+        )
+        conn.execute(f"DROP TABLE {tablename}")
+        conn.execute(f"ALTER TABLE {temp_table} RENAME TO {tablename}")
+
+    # override (DatabaseSQL)
+    def create_search_index(self, tablename: str, index_name: str, conn):
+        # FTS5 index of the text of each row, identified by its primary key
+        conn.execute(
+            f"CREATE VIRTUAL TABLE {index_name} USING fts5(key UNINDEXED, body)"
+        )
+
+    # override (DatabaseSQL)
+    def index_rows(self, tablename: str, index_name: str, condition: str, conn):
+        primary_key = self.get_primary_key(tablename)
+        body = " || ' ' || ".join(
+            f"COALESCE(CAST(\"{row[1]}\" AS TEXT), '')"
+            for row in conn.execute(f"PRAGMA table_info('{tablename}')").fetchall()
+        )
+        conn.execute(
+            f"INSERT INTO {index_name} (key, body) "
+            f'SELECT "{primary_key}", {body} FROM "{tablename}"{condition}'
+        )
+
+    # override (DatabaseSQL)
+    def search_keys_query(self, tablename: str, terms: [str]) -> str:
+        # Every term must match (terms are word characters only)
+        index_name = f'"_search_{tablename}"'
+        match = " AND ".join(
+            f'"{term[:-1]}"*' if term.endswith("*") else f'"{term}"' for term in terms
+        )
+        return f"SELECT key FROM {index_name} WHERE {index_name} MATCH '{match}'"
+
+    # override (DatabaseBase)
+    def create_analytics_view(self, conn, table_name: str):
+        try:
+            conn.execute("LOAD sqlite")
+        except duckdb.Error:
+            # Scanner extension not installed (it is fetched on demand, so may be
+            #  unavailable offline); fall back to registering a copy of the table
+            logging.info(
+                "DuckDB sqlite extension unavailable, copying '%s'", table_name
+            )
+            return super().create_analytics_view(conn, table_name)
+        # Arrays are stored as JSON text; present them as native LISTs
+        properties = self.get_table_schema(table_name).get("properties", {})
+        replacements = []
+        for col in self.get_array_columns(table_name):
+            item_type = properties[col].get("items", {}).get("type", "string")
+            if isinstance(item_type, list):
+                item_type = next((t for t in item_type if t != "null"), "string")
+            sql_type = DUCKDB_ITEM_TYPES.get(item_type, "VARCHAR")
+            replacements.append(f'from_json("{col}", \'["{sql_type}"]\') AS "{col}"')
+        replace = f" REPLACE ({', '.join(replacements)})" if replacements else ""
+        db_filename = str(self.db_filename).replace("'", "''")
+        conn.execute(
+            f'CREATE VIEW "{table_name}" AS SELECT *{replace} '
+            f"FROM sqlite_scan('{db_filename}', '{table_name}')"
+        )
 
     # override
     def json_type_to_sql(self, props):
@@ -36,7 +215,7 @@ class DatabaseSQLite(DatabaseSQL):
             elif "boolean" in json_types:
                 return "TEXT"  # SQLite does not have a native boolean type
             elif "array" in json_types:
-                return "TEXT"  # SQLite does not have a native array type
+                return "TEXT"  # SQLite does not have a native array type (JSON1)
             else:
                 logging.warn(f"Unsupported JSON type: {json_types}, defaulting to TEXT")
                 return "TEXT"
@@ -46,3 +225,26 @@ class DatabaseSQLite(DatabaseSQL):
         if self.field_is_nullable(props):
             sql_type = f"{sql_type} NULL"
         return sql_type
+
+
+class DatabaseSQLiteVersioned(DatabaseSQLVersioned, DatabaseSQLite):
+    def __init__(self, data_folder: str = ""):
+        super().__init__(data_folder)
+        self.BACKEND = DatabaseBackend.SQLITE_VERSIONED
+        self.db_version = DATABASE_SQLITE_VERSIONED_VERSION
+        self.db_filename = Path(self.data_folder) / "db.ver.sqlite"
+
+    # override (DatabaseSQLite)
+    def create_analytics_view(self, conn, table_name: str):
+        # The scanner reads stored tables rather than views, so register the current
+        #  versions instead
+        DatabaseBase.create_analytics_view(self, conn, table_name)
+
+    # override (DatabaseSQLVersioned)
+    def create_current_index(self, tablename: str, primary_key: str, conn):
+        # Partial index: unique over, and only holding, the current versions
+        storage = self.storage_table(tablename)
+        conn.execute(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS "idx_{storage}_{primary_key}" '
+            f'ON {storage} ("{primary_key}") WHERE _valid_to IS NULL'
+        )
@@ -1,4 +1,5 @@
 import sys
+import threading
 from pathlib import Path
 
 import dash
@@ -14,6 +15,7 @@ from InsightBoard.chatbot import initialize_chatbot
 from InsightBoard.config import ConfigManager
 from InsightBoard.utils import get_custom_assets_folder
 from InsightBoard.utils import get_default_project
+from InsightBoard.utils import get_project
 from InsightBoard.utils import get_projects_list
 
 # If running from PyInstaller, get the path to the temporary directory
@@ -88,6 +90,10 @@ def store_selected_project(project):
     if project:
         config.set("project.default", project)
         config.save()
+        # Optionally load the project's parsers and reports in the background
+        projectObj = get_project(project)
+        if projectObj.get_preload_modules():
+            threading.Thread(target=projectObj.preload_modules, daemon=True).start()
     return project
 
 
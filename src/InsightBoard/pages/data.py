@@ -22,6 +22,13 @@ def layout():
             chatbot.layout() if chatbot.is_chatbot_enabled() else None,
             html.H3("Select a table to view"),
             dcc.Dropdown(id="table-dropdown", placeholder="Select a table"),
+            dcc.Input(
+                id="table-search",
+                type="search",
+                debounce=True,
+                placeholder="Search records (e.g. 'london fever', or 'lond*')",
+                style={"width": "100%", "margin": "10px 0"},
+            ),
             html.Div("", id="datatable-report-length"),
             dash_table.DataTable(
                 id="datatable-table",
@@ -97,7 +104,7 @@ def download_table(n_clicks, selected_table):
     now = datetime.now()
     datetime_str = now.strftime("%Y-%m-%d_%H-%M-%S")
     filename = f"{selected_table}_{datetime_str}.csv"
-    df = projectObj.database.read_table(selected_table)
+    df = projectObj.database.cached_read_table(selected_table)
     return dcc.send_data_frame(df.to_csv, filename, index=False)
 
 
@@ -128,18 +135,31 @@ def update_table_list(selected_project):
     Output("datatable-table", "data"),
     Output("datatable-report-length", "children"),
     Input("table-dropdown", "value"),
+    Input("table-search", "value"),
     State("project", "data"),
 )
-def load_selected_table(selected_table, project):
+def load_selected_table(selected_table, search, project):
     if not selected_table:
         return [], [], ""
 
-    # Load the table into a Pandas DataFrame
+    # Load the table (or the records matching the search) into a Pandas DataFrame
     try:
-        df = projectObj.database.read_table(selected_table)
+        if search and search.strip():
+            df = projectObj.database.search_table(selected_table, search)
+        else:
+            df = projectObj.database.cached_read_table(selected_table)
     except Exception as e:
         return [], [], f"Error loading table: {str(e)}"
 
+    # DataTable cells cannot hold lists, so format array fields for display
+    for col in projectObj.database.get_array_columns(selected_table):
+        if col in df.columns:
+            df[col] = df[col].map(
+                lambda x: (
+                    "[" + ", ".join(map(str, x)) + "]" if isinstance(x, list) else x
+                )
+            )
+
     columns = utils.ensure_schema_ordering(
         [{"name": col, "id": col} for col in df.columns],
         project,
@@ -153,5 +173,9 @@ def load_selected_table(selected_table, project):
     return (
         columns,
         df.to_dict("records"),
-        f"Number of records: {len(df)}",
+        (
+            f"Number of matching records: {len(df)}"
+            if search and search.strip()
+            else f"Number of records: {len(df)}"
+        ),
     )
@@ -148,14 +148,22 @@ def project_settings(config):
             "label": "SQL (SQLite)",
             "value": DatabaseBackend.SQLITE.name,
         },
+        {
+            "label": "SQL (SQLite, versioned)",
+            "value": DatabaseBackend.SQLITE_VERSIONED.name,
+        },
     ]
     if utils.check_module("duckdb"):
-        db_backend_list.append(
+        db_backend_list += [
             {
                 "label": "SQL (DuckDB)",
                 "value": DatabaseBackend.DUCKDB.name,
-            }
-        )
+            },
+            {
+                "label": "SQL (DuckDB, versioned)",
+                "value": DatabaseBackend.DUCKDB_VERSIONED.name,
+            },
+        ]
     db_backend = DatabaseBackend.PARQUET.name
     db_backup_policy_list = [
         {"label": "None", "value": BackupPolicy.NONE.name},
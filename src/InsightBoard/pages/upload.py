@@ -1,4 +1,5 @@
 import math
+import uuid
 import dash
 import logging
 import traceback
@@ -7,10 +8,31 @@ import dash_bootstrap_components as dbc
 
 from pathlib import Path
 from datetime import datetime
-from dash import dcc, html, dash_table, Input, Output, State, callback
+from dash import (
+    dcc,
+    html,
+    dash_table,
+    Input,
+    Output,
+    State,
+    callback,
+    clientside_callback,
+)
 
 import InsightBoard.utils as utils
-from InsightBoard.database import WritePolicy
+from InsightBoard.database import CommitError, WritePolicy
+from InsightBoard.session import UploadSessions
+from InsightBoard.uploads import ChunkedUploads
+from InsightBoard.validation.coercion import (  # noqa: F401
+    clean_frame,
+    clean_value,
+    remove_quotes,
+)
+from InsightBoard.validation.incremental import (
+    patch_rows,
+    rows_to_validate,
+    validation_state,
+)
 
 # DataTable supports a maximum of 512 conditional formatting rules,
 #  so stop adding rules after this limit is reached
@@ -32,6 +54,9 @@ def layout():
             # Store
             dcc.Store(id="project"),  # project selection
             dcc.Store(id="unique-table-id"),  # unique id (project-table)
+            dcc.Store(id="upload-file"),  # uploaded file (id of a chunked upload)
+            # Datasets and validation results are held server-side (see UploadSessions);
+            #  these stores reference the session, and change when its data changes
             dcc.Store(id="parsed-data-store"),  # parsed data (multi-table support)
             dcc.Store(id="edited-data-store"),  # edited data (multi-table support)
             dcc.Store(id="validation-errors"),  # validation errors (current table)
@@ -39,6 +64,8 @@ def layout():
             dcc.Store(id="only-show-validation-errors"),  # Setting: Only show errors
             dcc.Store(id="show-full-validation-log"),  # Setting: Show full log
             dcc.Store(id="update-existing-records"),  # Setting: Update records
+            dcc.Store(id="commit-ticket"),  # queued commit (ticket id)
+            dcc.Interval(id="commit-status-interval", interval=1000, disabled=True),
             # Page rendering
             html.H1("Upload data"),
             dcc.Location(id="url-refresh", refresh=True),
@@ -115,6 +142,11 @@ def layout():
                             },
                         ],
                         tooltip_data=[],
+                        # Filtering and paging are applied server-side (see
+                        #  update_table); the table holds only the current page
+                        page_action="custom",
+                        page_current=0,
+                        page_count=1,
                         page_size=25,
                         style_table={
                             "minWidth": "100%",  # Format fix for freezing first column
@@ -238,6 +270,90 @@ def layout():
     )
 
 
+# Reference to an upload session's data; a new version triggers dependent callbacks
+def session_token(session_id: str) -> dict:
+    return {"session": session_id, "version": uuid.uuid4().hex}
+
+
+# Value held for an upload session (see session_token)
+def session_value(token: dict | None, key: str, default=None):
+    if not token:
+        return default
+    return UploadSessions().get(token.get("session"), key, default)
+
+
+def put_session_value(token: dict, key: str, value):
+    UploadSessions().put(token["session"], key, value)
+
+
+# Rows of a dataset (held as a DataFrame of Python objects) as a list of records
+def dataset_records(df: pd.DataFrame) -> [dict]:
+    return df.to_dict("records")
+
+
+def records_dataset(records: [dict]) -> pd.DataFrame:
+    # Object dtype keeps values exactly as parsed (mixed types, lists, None)
+    return pd.DataFrame(records, dtype=object)
+
+
+# Upload the selected file to the server in chunks (see InsightBoard.uploads),
+#  so that the file's contents are never sent through a callback
+clientside_callback(
+    """
+    async function(contents, filename, project) {
+        if (!contents || !project) {
+            return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+        }
+        const CHUNK_SIZE = 4 * 1024 * 1024;
+        const MAX_RETRIES = 5;
+        const config = JSON.parse(document.getElementById("_dash-config").textContent);
+        const url = `${config.requests_pathname_prefix}_uploads/${encodeURIComponent(project)}`;
+        const blob = await (await fetch(contents)).blob();
+        const created = await fetch(url, {
+            method: "POST",
+            headers: {"Content-Type": "application/json"},
+            body: JSON.stringify({filename: filename, size: blob.size}),
+        });
+        if (!created.ok) {
+            throw new Error((await created.json()).error);
+        }
+        let upload = await created.json();
+        let retries = 0;
+        while (upload.offset < blob.size) {
+            try {
+                const response = await fetch(`${url}/${upload.upload_id}`, {
+                    method: "PATCH",
+                    headers: {
+                        "Content-Type": "application/offset+octet-stream",
+                        "Upload-Offset": String(upload.offset),
+                    },
+                    body: blob.slice(upload.offset, upload.offset + CHUNK_SIZE),
+                });
+                if (!response.ok) {
+                    throw new Error((await response.json()).error);
+                }
+                upload = await response.json();
+                retries = 0;
+            } catch (error) {
+                // Resume from the offset that the server has received
+                if (++retries > MAX_RETRIES) {
+                    throw error;
+                }
+                upload = await (await fetch(`${url}/${upload.upload_id}`)).json();
+            }
+        }
+        // Release the browser's copy of the file
+        return [{upload_id: upload.upload_id, filename: upload.filename}, null];
+    }
+    """,
+    Output("upload-file", "data"),
+    Output("upload-data", "contents"),
+    Input("upload-data", "contents"),
+    State("upload-data", "filename"),
+    State("project", "data"),
+)
+
+
 # Force reload of the page
 @callback(
     Output("url-refresh", "href"),  # Refresh the page
@@ -321,12 +437,35 @@ def update_page_size(page_size):
     return page_size
 
 
+# Rows of a dataset that are shown in the DataTable (before paging)
+def visible_rows(
+    df: pd.DataFrame,
+    errors: list,
+    only_show_validation_errors,
+    update_existing_records,
+    existing_keys=None,
+    primary_key=None,
+) -> pd.DataFrame:
+    mask = pd.Series(True, index=df.index)
+    # Filter showing only rows with errors
+    if only_show_validation_errors:
+        has_errors = [any(error) for error in errors]
+        if len(has_errors) == len(df):
+            mask &= pd.Series(has_errors, index=df.index)
+    if not update_existing_records and primary_key in df.columns:
+        # Remove rows where the primary key does not already exist in the database
+        mask &= ~df[primary_key].isin(list(existing_keys or []))
+    return df[mask]
+
+
 # When a table name is selected from the dropdown, update the DataTable display
 @callback(
     Output("editable-table", "columns"),  # Update DataTable
     Output("editable-table", "hidden_columns"),
     Output("editable-table", "data"),
     Output("editable-table", "active_cell"),
+    Output("editable-table", "page_count"),
+    Output("editable-table", "page_current"),
     Output("data-stats", "children"),
     Input("imported-tables-dropdown", "options"),  # Triggered by 'table' selection ...
     Input("imported-tables-dropdown", "value"),
@@ -337,6 +476,8 @@ def update_page_size(page_size):
     Input("remove-error-rows-button", "n_clicks"),
     Input("restore-deleted-rows-button", "n_clicks"),
     Input("editable-table", "active_cell"),
+    Input("editable-table", "page_current"),  # ... or page navigation
+    Input("editable-table", "page_size"),
     State("project", "data"),
     State("edited-data-store", "data"),  # Populate with table from edited-data store
     State("parsed-data-store", "data"),
@@ -352,17 +493,21 @@ def update_table(
     remove_error_rows_n_clicks,
     restore_deleted_rows_n_clicks,
     active_cell,
+    page_current,
+    page_size,
     project,
     edited_datasets,
     parsed_datasets,
     errors,
 ):
     # Callback is triggered before edited_datasets is populated on first run
-    datasets = edited_datasets
+    token, datasets = edited_datasets, session_value(edited_datasets, "edited")
     if not datasets:
-        datasets = parsed_datasets
+        token, datasets = parsed_datasets, session_value(parsed_datasets, "parsed")
+        datasets = [df.copy() for df in datasets] if datasets else None
     if not datasets:
         raise dash.exceptions.PreventUpdate
+    errors = session_value(errors, "errors", [])
 
     ctx = dash.callback_context
     trig_active_cell = ctx_trigger(ctx, "editable-table.active_cell")
@@ -378,58 +523,74 @@ def update_table(
     ):
         raise dash.exceptions.PreventUpdate
 
-    data = datasets[options.index(selected_table)]
-    data_stats = f"Total rows: {len(data)}"
+    df = datasets[options.index(selected_table)]
+    data_stats = f"Total rows: {len(df)}"
     projectObj = utils.get_project(project)
     primary_key = projectObj.database.get_primary_key(selected_table)
 
-    # Convert any lists to strings for display
-    data = clean_dataset(data, project, selected_table, lists_to_strings=True)
-    keys = next(iter(data)).keys()
-    columns = [{"name": col, "id": col, "editable": True} for col in keys]
+    columns = [{"name": col, "id": col, "editable": True} for col in df.columns]
     columns = utils.ensure_schema_ordering(columns, project, selected_table)
 
-    # Filter showing only rows with errors
-    if only_show_validation_errors:
-        data = [row for row, error in zip(data, errors) if any(error)]
+    # Filtering and paging are applied server-side; the table receives one page
+    existing_keys = None
     if not update_existing_records:
-        # Remove rows where the primary key does not already exist in the database
         existing_keys = projectObj.database.get_primary_keys(selected_table)
-        data = [row for row in data if row.get(primary_key, None) not in existing_keys]
+    visible = visible_rows(
+        df,
+        errors,
+        only_show_validation_errors,
+        update_existing_records,
+        existing_keys,
+        primary_key,
+    )
+    page_size = int(page_size or 25)
+    page_count = max(math.ceil(len(visible) / page_size), 1)
+    page_current = min(page_current or 0, page_count - 1)
+    page = visible.iloc[page_current * page_size : (page_current + 1) * page_size]
 
+    # Deletion marks are written to the session's edited data
+    marked = False
     # Respond to delete button clicks
     if active_cell and active_cell.get("column_id") == _DELETE_COLUMN:
         i = active_cell.get("row")
-        row = data[i]
         active_cell = False  # Permits the button to be clicked again straight away
-        row[_DELETE_COLUMN] = (
-            _DELETE_FALSE
-            if row.get(_DELETE_COLUMN, _DELETE_FALSE) == _DELETE_TRUE
-            else _DELETE_TRUE
-        )
+        if i is not None and i < len(page):
+            label = page.index[i]
+            df.at[label, _DELETE_COLUMN] = (
+                _DELETE_FALSE
+                if df.at[label, _DELETE_COLUMN] == _DELETE_TRUE
+                else _DELETE_TRUE
+            )
+            marked = True
 
     # Mark rows with empty IDs for deletion
-    if trig_remove_empty_ids:
-        for row in data:
-            if not row.get(primary_key, None):
-                row[_DELETE_COLUMN] = _DELETE_TRUE
+    if trig_remove_empty_ids and primary_key in df.columns:
+        empty_ids = visible[primary_key].map(lambda x: not x)
+        df.loc[empty_ids[empty_ids].index, _DELETE_COLUMN] = _DELETE_TRUE
+        marked = True
 
     # Mark rows with errors for deletion
-    if trig_remove_error_rows:
-        for row in data:
-            i = row["Row"] - 1
-            if any(errors[i]):
-                row[_DELETE_COLUMN] = _DELETE_TRUE
+    if trig_remove_error_rows and len(errors) == len(df):
+        error_rows = [
+            label for label in visible.index if any(errors[df.index.get_loc(label)])
+        ]
+        df.loc[error_rows, _DELETE_COLUMN] = _DELETE_TRUE
+        marked = True
 
     # Restore deleted rows
     if trig_restore_deleted_rows:
-        for row in data:
-            row[_DELETE_COLUMN] = _DELETE_FALSE
+        df.loc[visible.index, _DELETE_COLUMN] = _DELETE_FALSE
+        marked = True
+
+    if marked:
+        put_session_value(token, "edited", datasets)
+        visible = df.loc[visible.index]
+        page = df.loc[page.index]
 
     # Check how many visible rows are marked for deletion
-    deleted_rows = len(
-        [row for row in data if row.get(_DELETE_COLUMN, _DELETE_FALSE) == _DELETE_TRUE]
-    )
+    deleted_rows = 0
+    if _DELETE_COLUMN in visible.columns:
+        deleted_rows = int((visible[_DELETE_COLUMN] == _DELETE_TRUE).sum())
 
     # Move columns '_delete' and 'Row' to the front
     columns = [
@@ -439,167 +600,104 @@ def update_table(
     ]
 
     hidden_columns = []
-    data_stats += f", Showing: {len(data)}"
+    data_stats += f", Showing: {len(visible)}"
     if deleted_rows:
         data_stats += f", Deleted: {deleted_rows}"
 
-    return columns, hidden_columns, data, active_cell, data_stats
-
-
-# Utility function to remove quotes from strings
-def remove_quotes(x):
-    if isinstance(x, str) and x.startswith('"') and x.endswith('"'):
-        return x[1:-1]
-    if isinstance(x, str) and x.startswith("'") and x.endswith("'"):
-        return x[1:-1]
-    return x
-
-
-# Utility function to clean data values, coercing to target type if specified
-def clean_value(x, key_name=None, dtypes={}):
-    """Clean a value, coercing to target type if specified.
-
-    The DataTable accepts mainly strings, so this function attempts to
-    coerce the value to the target type specified in the schema. If the value
-    cannot be coerced, it is returned as a string.
-
-    Params:
-        x (str): The value to clean.
-        key_name (str): The key name of the value in the dataset.
-        dtypes (dict): A dictionary of key names and target types.
-               (list): A list of target types.
-               "any": Any type is allowed.
-    """
-
-    # Target type can be not specified if, e.g. enum or 'Row' column
-    if isinstance(dtypes, str) and dtypes == "any":
-        target_types = [
-            "string",
-            "number",
-            "integer",
-            "boolean",
-            "array",
-            "object",
-            "null",
-        ]
-    elif isinstance(dtypes, dict):
-        target_types = dtypes.get(key_name, {}).get("type", None)
-        if not isinstance(target_types, list):
-            target_types = [target_types]
-    elif isinstance(dtypes, list):
-        target_types = dtypes
-    else:
-        target_types = []
-
-    # String pre-processing
-    if isinstance(x, str):
-        x = x.strip()
-
-    if "array" in target_types and isinstance(x, str):
-        if x.startswith("[") and x.endswith("]"):
-            return list(
-                map(
-                    remove_quotes,
-                    map(lambda x: clean_value(x, None, "any"), x[1:-1].split(",")),
-                )
-            )
-        elif isinstance(x, str) and "," in x:
-            return list(
-                map(
-                    remove_quotes,
-                    map(lambda x: clean_value(x, None, "any"), x.split(",")),
-                )
-            )
-
-    if "number" in target_types:
-        if isinstance(x, int) or isinstance(x, float):
-            return x
-        elif isinstance(x, str):
-            try:
-                if "." in x:
-                    n = float(x)
-                    if math.isnan(n):
-                        return None
-                else:
-                    n = int(x)
-                return n
-            except Exception:
-                pass
-
-    if "integer" in target_types:
-        if isinstance(x, int):
-            return x
-        elif isinstance(x, str):
-            try:
-                return int(x)  # int cannot be nan
-            except Exception:
-                pass
-
-    if "boolean" in target_types:
-        if isinstance(x, bool):
-            return x
-        elif isinstance(x, str):
-            try:
-                if x.lower() in ["true", "false"]:
-                    return x.lower() == "true"
-            except Exception:
-                pass
-
-    if "object" in target_types:
-        # Object is a valid json schema type, but not supported by DataTable
-        ...
-
-    if "null" in target_types and not x:
-        return None
-
-    # Return the original value if no coercion can be applied
-    return x
+    # Convert any lists to strings for display (stored data retains lists)
+    data = [display_row(row) for row in dataset_records(page)]
+    return (
+        columns,
+        hidden_columns,
+        data,
+        active_cell,
+        page_count,
+        page_current,
+        data_stats,
+    )
 
 
 # Utility function to clean a dataset
 def clean_dataset(dataset, project, selected_table, lists_to_strings=True):
     projectObj = utils.get_project(project)
     schema = projectObj.database.get_table_schema(selected_table)
-    for row in dataset:
-        for k, v in row.items():
-            row[k] = clean_value(v, k, schema["properties"])
-            if lists_to_strings and isinstance(row[k], list):
-                row[k] = "[" + ", ".join([x for x in row[k] if x]) + "]"
+    if not dataset:
+        return dataset
+    # Values are cleaned a column at a time (see clean_frame), then written back
+    df = clean_frame(pd.DataFrame(dataset, dtype=object), schema["properties"])
+    columns = {k: df[k].to_numpy() for k in df.columns}
+    for i, row in enumerate(dataset):
+        for k in row:
+            row[k] = columns[k][i]
+            if lists_to_strings:
+                row[k] = display_value(row[k])
     return dataset
 
 
+# Utility function to format a (cleaned) value for display in the DataTable
+def display_value(x):
+    if isinstance(x, list):
+        return "[" + ", ".join([str(v) for v in x if v]) + "]"
+    return x
+
+
+# Utility function to format a (cleaned) row for display in the DataTable
+def display_row(row):
+    return {k: display_value(v) for k, v in row.items()}
+
+
 # When edits are made in the DataTable, update the edited-data-store
 @callback(
     Output("edited-data-store", "data"),  # Update the edited data store
     Input("parsed-data-store", "data"),  # Triggered by new 'parsed data' ...
-    Input("editable-table", "data"),  # ... or DataTable edits
+    Input("editable-table", "data"),  # ... or DataTable edits (current page)
     State("project", "data"),
     State("imported-tables-dropdown", "options"),
     State("imported-tables-dropdown", "value"),
     State("edited-data-store", "data"),
 )
 def update_edited_data(
-    parsed_data, edited_table_data, project, tables, selected_table, datasets
+    parsed_data, edited_table_data, project, tables, selected_table, edited_data
 ):
-    new_edited_data_store = parsed_data
-    if not new_edited_data_store:
+    if not parsed_data:
+        raise dash.exceptions.PreventUpdate
+    token = session_token(parsed_data["session"])
+
+    # New parsed data replaces the edited data
+    if ctx_trigger(dash.callback_context, "parsed-data-store.data"):
+        datasets = session_value(parsed_data, "parsed")
+        if not datasets:
+            raise dash.exceptions.PreventUpdate
+        put_session_value(token, "edited", [df.copy() for df in datasets])
+        return token
+
+    datasets = session_value(edited_data, "edited")
+    if not datasets or not edited_table_data:
         raise dash.exceptions.PreventUpdate
 
-    # Merge full data with edited data based on Row number
-    full_edited_data = new_edited_data_store[tables.index(selected_table)]
+    # Patch the edited rows of the page into the full data, based on Row number
+    df = datasets[tables.index(selected_table)]
+    edited_rows = []
     for row in edited_table_data:
         row_idx = row.get("Row", None)
-        if row_idx:
-            full_edited_data[row_idx - 1] = row
+        if not row_idx or row_idx > len(df):
+            continue
+        if row != display_row(df.iloc[row_idx - 1].to_dict()):
+            edited_rows.append(row)
+    if not edited_rows:
+        raise dash.exceptions.PreventUpdate
 
-    # Clean data
-    clean_table_data = clean_dataset(
-        full_edited_data, project, selected_table, lists_to_strings=True
-    )
+    # Clean edited rows only (unchanged rows are already clean, with native lists)
+    clean_dataset(edited_rows, project, selected_table, lists_to_strings=False)
+    for row in edited_rows:
+        for key, value in row.items():
+            if key not in df.columns:
+                df[key] = pd.Series(None, index=df.index, dtype=object)
+            df.at[df.index[row["Row"] - 1], key] = value
 
-    # Replace dataset in the 'edited' data-store
-    new_edited_data_store[tables.index(selected_table)] = clean_table_data
-    return new_edited_data_store
+    # Replace dataset in the 'edited' session data
+    put_session_value(token, "edited", datasets)
+    return token
 
 
 # Utility function to format validation errors for display
@@ -649,25 +747,27 @@ def errors_to_dict(errors):
     Input("imported-tables-dropdown", "value"),
     State("project", "data"),
 )
-def validate_errors(
-    parsed_dbs_dict,
-    parsed_dbs,
-    selected_table,
-    project,
-):
-    if not parsed_dbs_dict:
-        return [], []
+def validate_errors(parsed_data, parsed_dbs, selected_table, project):
+    datasets = session_value(parsed_data, "parsed")
+    if not datasets:
+        return None, None
 
     selected_table_index = parsed_dbs.index(selected_table)
     table_name = parsed_dbs[selected_table_index]
-    df_dict = parsed_dbs_dict[selected_table_index]
-    df_dict = clean_dataset(df_dict, project, selected_table, lists_to_strings=False)
-    df = pd.DataFrame.from_records(df_dict)
+    df = datasets[selected_table_index]
+
+    # Validation results are held in the session, and referenced by new tokens
+    token = session_token(parsed_data["session"])
+    previous_errors = session_value(token, "errors")
+    previous_warns = session_value(token, "warnings")
+    validated_rows = session_value(token, "validated_rows")
 
     # Ensure that base schema file exists
     schema_file = Path(projectObj.get_schemas_folder()) / f"{table_name}.schema.json"
     if not schema_file.exists():
-        return [], []
+        for key, value in [("errors", []), ("warnings", []), ("validated_rows", None)]:
+            put_session_value(token, key, value)
+        return token, token
 
     # Check whether a relaxed schema file exists
     schema_file_relaxed = (
@@ -683,20 +783,44 @@ def validate_errors(
 
     # Validate the data against the schema
     df = df.where(pd.notnull(df), None)
-    df.drop(columns=["Row", _DELETE_COLUMN], inplace=True, errors="ignore")
-    errors = errors_to_dict(utils.validate_against_jsonschema(df, schema_file_relaxed))
+    df = df.drop(columns=["Row", _DELETE_COLUMN], errors="ignore")
+    workers = projectObj.get_validation_workers()
+
+    # Only re-validate the rows that have changed since the last validation
+    state = validation_state(
+        df,
+        [
+            table_name,
+            list(df.columns),
+            *(
+                schema.stat().st_mtime if schema else None
+                for schema in [schema_file_relaxed, schema_file_strict]
+            ),
+        ],
+    )
+    rows = rows_to_validate(state, validated_rows)
+    if rows is not None and len(previous_errors or []) == len(df):
+        df = df.iloc[rows]
+    else:
+        rows = None
+
+    def validate(schema_file, previous):
+        errors = errors_to_dict(
+            utils.validate_against_jsonschema(df, schema_file, workers=workers)
+        )
+        return errors if rows is None else patch_rows(previous, rows, errors)
+
+    errors = validate(schema_file_relaxed, previous_errors)
 
     # If a strict schema exists, validate against that too
     warns = []
     if schema_file_strict:
-        schema_file_strict = (
-            Path(projectObj.get_schemas_folder()) / f"{table_name}.schema.json"
-        )
-        warns = errors_to_dict(
-            utils.validate_against_jsonschema(df, schema_file_strict)
-        )
+        warns = validate(schema_file_strict, previous_warns)
 
-    return errors, warns
+    put_session_value(token, "errors", errors)
+    put_session_value(token, "warnings", warns)
+    put_session_value(token, "validated_rows", state)
+    return token, token
 
 
 # Display the validation error log
@@ -708,9 +832,7 @@ def validate_errors(
     Input("imported-tables-dropdown", "value"),
     Input("only-show-validation-errors", "value"),
     Input("show-full-validation-log", "value"),
-    Input("editable-table", "page_current"),
-    Input("editable-table", "page_size"),
-    Input("editable-table", "data"),
+    Input("editable-table", "data"),  # Current page
     State("parsed-data-store", "data"),
     State("project", "data"),
 )
@@ -721,12 +843,12 @@ def validate_log(
     current_table,
     only_show_validation_errors,
     show_full_validation_log,
-    page_current,
-    page_size,
     editable_data,
     parsed_dbs_dict,
     project,
 ):
+    errors = session_value(errors, "errors")
+    warns = session_value(warns, "warnings")
     if not errors and not warns:
         return html.P("No validation errors.")
 
@@ -736,19 +858,15 @@ def validate_log(
     ]
     rows_with_errors = len([x for x in errors if x])
     comment = []
-    start_idx = 0
-    end_idx = -1
     if not show_full_validation_log:
-        page_current = page_current or 0
-        start_idx = page_current * page_size
-        end_idx = (page_current + 1) * page_size
-        if only_show_validation_errors:
-            # Determine indices from visible data
-            visible_data = editable_data[start_idx:end_idx]
-            start_idx = visible_data[0]["Row"] - 1
-            end_idx = visible_data[-1]["Row"]
-        errors = errors[start_idx:end_idx]
-        parsed_errors = parsed_errors[start_idx:end_idx]
+        # Rows of the current page (the table holds only the page)
+        rows = [
+            row["Row"] - 1
+            for row in editable_data or []
+            if 0 < row.get("Row", 0) <= len(errors)
+        ]
+        errors = [errors[i] for i in rows]
+        parsed_errors = [parsed_errors[i] for i in rows]
         comment.extend(
             [
                 html.Br(),
@@ -814,7 +932,7 @@ def ctx_trigger(ctx, event):
     Input("parse-button", "n_clicks"),  # Triggered by 'Parse' button click ...
     Input("update-button", "n_clicks"),  # ... or 'Update' button click
     State("project", "data"),
-    State("upload-data", "contents"),
+    State("upload-file", "data"),  # Id of the (chunked) upload, not its contents
     State("upload-data", "filename"),
     State("parser-dropdown", "value"),
     State("edited-data-store", "data"),
@@ -825,7 +943,7 @@ def parse_file(
     parse_n_clicks,
     update_n_clicks,
     project,
-    contents,
+    upload,
     filename,
     selected_parser,
     edited_data_store,
@@ -848,9 +966,12 @@ def parse_file(
     # Parse the data (read from files)
     if trig_parse_btn:
         msg, parsed_data_store, *rtn = parse_data(
-            project, contents, filename, selected_parser
+            project, upload, filename, selected_parser
         )
         if parsed_data_store:
+            # Release the previous upload's session
+            if edited_data_store:
+                UploadSessions().delete(edited_data_store["session"])
             # Update the table dropdown
             return (
                 msg,
@@ -870,9 +991,14 @@ def parse_file(
             )
     # Update the data (make the current 'edited' buffer the new 'parsed' buffer)
     if trig_update_btn:
+        datasets = session_value(edited_data_store, "edited")
+        if not datasets:
+            raise dash.exceptions.PreventUpdate
+        token = session_token(edited_data_store["session"])
+        put_session_value(token, "parsed", [df.copy() for df in datasets])
         return (
             "Validation run.",
-            edited_data_store,  # move edited data into parsed data store
+            token,  # move edited data into parsed data
             tables_list,  # pass-through
             selected_table,  # pass-through
             f"{project}-{selected_table}",
@@ -882,8 +1008,8 @@ def parse_file(
 
 
 # Utility function to read and parse a data file
-def parse_data(project, contents, filename, selected_parser):
-    if not contents or not selected_parser:
+def parse_data(project, upload, filename, selected_parser):
+    if not upload or not selected_parser:
         return (
             "Please select a parser, and file to parse.",
             None,
@@ -895,20 +1021,28 @@ def parse_data(project, contents, filename, selected_parser):
     # Process the uploaded file
     try:
         projectObj = utils.get_project(project)
-        parsed_df_list = projectObj.load_and_parse(filename, contents, selected_parser)
+        # The file was uploaded in chunks to the project's uploads folder, and is
+        #  removed once read (the parsed data is held in the session)
+        uploads = ChunkedUploads(projectObj.get_uploads_folder())
+        try:
+            parsed_df_list = projectObj.load_and_parse_file(
+                uploads.path(upload["upload_id"]), selected_parser, filename
+            )
+        finally:
+            uploads.delete(upload["upload_id"])
 
         # Extract the table names and data from the parsed data
         # NB: Parsers originally used 'database' instead of 'table' as table name
         parsed_dbs = [d.get("table", d.get("database")) for d in parsed_df_list]
         parsed_dfs = [d.get("data") for d in parsed_df_list]
 
-        # Dash cannot store DataFrames directly, so convert them to dictionaries
+        # Convert to records for cleaning
         parsed_dbs_dict = [df.to_dict("records") for df in parsed_dfs]
 
-        # Clean data for datatables
+        # Clean data (arrays are kept as lists, and only formatted for display)
         for i, table in enumerate(parsed_dbs_dict):
             parsed_dbs_dict[i] = clean_dataset(
-                table, project, parsed_dbs[i], lists_to_strings=True
+                table, project, parsed_dbs[i], lists_to_strings=False
             )
         table_name = next(iter(parsed_dbs))
 
@@ -918,9 +1052,15 @@ def parse_data(project, contents, filename, selected_parser):
                 row["Row"] = i + 1
                 row[_DELETE_COLUMN] = _DELETE_FALSE
 
+        # Hold the datasets server-side; the browser receives only a session token
+        token = session_token(UploadSessions().new_session())
+        datasets = [records_dataset(table) for table in parsed_dbs_dict]
+        put_session_value(token, "parsed", datasets)
+        put_session_value(token, "edited", [df.copy() for df in datasets])
+
         return (
             f"File '{filename}' uploaded successfully.",
-            parsed_dbs_dict,
+            token,
             parsed_dbs,
             table_name,
             f"{project}-{table_name}",
@@ -944,20 +1084,11 @@ def parse_data(project, contents, filename, selected_parser):
 def highlight_and_tooltip_changes(
     original_data,
     data,
-    page_current,
-    page_size,
     validation_errors,
     only_show_validation_errors,
 ):
-    """Compare the original and edited data, highlight changes, and show tooltips."""
-    if not page_size:
-        return [], []
-    page_current = page_current or 0
-
-    paginate = not only_show_validation_errors
-    start_idx = page_current * page_size if paginate else 0
-    end_idx = (page_current + 1) * page_size if paginate else len(data)
-
+    """Compare the original and edited data (the current page of the table),
+    highlight changes, and show tooltips."""
     # Default higlights
     style_data_conditional = [
         {  # Highlight the selected cell
@@ -972,7 +1103,7 @@ def highlight_and_tooltip_changes(
             "color": "#A0A0A0",
         },
     ]
-    tooltip_data = [{} for _ in range(start_idx)]
+    tooltip_data = []
     keys = next(iter(data)).keys()
     data_cols = [k for k in keys if k not in ["Row", _DELETE_COLUMN]]
 
@@ -982,7 +1113,7 @@ def highlight_and_tooltip_changes(
     # Iterate over each row in the modified data
     try:
         # Ensure rows with errors are highlighted before placing cell-level highlights
-        for i, row in enumerate(data[start_idx:end_idx]):
+        for i, row in enumerate(data):
             idx = row["Row"] - 1
             errors = validation_errors[idx]
             # Check for deleted rows
@@ -1016,7 +1147,7 @@ def highlight_and_tooltip_changes(
                 }
             )
 
-        for i, row in enumerate(data[start_idx:end_idx]):
+        for i, row in enumerate(data):
             row_tooltip = {}  # Store tooltips for the row
             idx = row["Row"] - 1
             errors = validation_errors[idx]
@@ -1040,7 +1171,7 @@ def highlight_and_tooltip_changes(
             else:
                 # Then, if the cell values differ, highlight and add a tooltip
                 for column in data_cols:
-                    original_value = original_data[idx].get(column, None)
+                    original_value = display_value(original_data[idx].get(column, None))
                     modified_value = row.get(column, None)
                     if str(modified_value) != str(original_value):
                         if len(style_data_conditional) <= MAX_CONDITIONAL_FORMATTING:
@@ -1074,8 +1205,6 @@ def highlight_and_tooltip_changes(
     Output("editable-table", "style_data_conditional"),  # Update the table style ...
     Output("editable-table", "tooltip_data"),  # ... and tooltips
     Input("editable-table", "data"),  # Triggered by any change in the table data ...
-    Input("editable-table", "page_current"),
-    Input("editable-table", "page_size"),
     Input("validation-errors", "data"),  # ... or validation errors
     Input("only-show-validation-errors", "value"),
     State("parsed-data-store", "data"),
@@ -1084,26 +1213,29 @@ def highlight_and_tooltip_changes(
 )
 def update_table_style_and_validate(
     data,
-    page_current,
-    page_size,
     validation_errors,
     only_show_validation_errors,
     original_data,
     tables,
     selected_table,
 ):
-    if not data:
+    original_data = session_value(original_data, "parsed")
+    validation_errors = session_value(validation_errors, "errors")
+    if not data or not original_data or validation_errors is None:
         return [], []
 
-    # Convert original data from dict to DataFrame
+    # Original (parsed) rows of the current page, by row index
     original_df = original_data[tables.index(selected_table)]
+    original_rows = {
+        row["Row"] - 1: original_df.iloc[row["Row"] - 1].to_dict()
+        for row in data
+        if 0 < row.get("Row", 0) <= len(original_df)
+    }
 
     # Highlight changes and create tooltips showing original data
     style_data_conditional, tooltip_data = highlight_and_tooltip_changes(
-        original_df,
+        original_rows,
         data,
-        page_current,
-        page_size,
         validation_errors,
         only_show_validation_errors,
     )
@@ -1115,13 +1247,43 @@ def update_table_style_and_validate(
 @callback(
     Output("download-csv", "data"),  # Download the CSV file
     Input("download-button", "n_clicks"),  # Triggered by 'Download as CSV' button
-    State("editable-table", "data"),
+    State("project", "data"),
+    State("edited-data-store", "data"),
+    State("validation-errors", "data"),
+    State("only-show-validation-errors", "value"),
+    State("update-existing-records", "value"),
+    State("imported-tables-dropdown", "options"),
     State("imported-tables-dropdown", "value"),
     prevent_initial_call=True,  # Only trigger when the button is clicked
 )
-def download_csv(n_clicks, data, table_name):
-    if n_clicks > 0 and data:
-        df = pd.DataFrame(data)
+def download_csv(
+    n_clicks,
+    project,
+    edited_datasets,
+    errors,
+    only_show_validation_errors,
+    update_existing_records,
+    tables,
+    table_name,
+):
+    datasets = session_value(edited_datasets, "edited")
+    if n_clicks > 0 and datasets:
+        # Download every row shown in the table (not only the current page)
+        df = datasets[tables.index(table_name)]
+        existing_keys, primary_key = None, None
+        if not update_existing_records:
+            database = utils.get_project(project).database
+            primary_key = database.get_primary_key(table_name)
+            existing_keys = database.get_primary_keys(table_name)
+        df = visible_rows(
+            df,
+            session_value(errors, "errors", []),
+            only_show_validation_errors,
+            update_existing_records,
+            existing_keys,
+            primary_key,
+        )
+        df = pd.DataFrame([display_row(row) for row in dataset_records(df)])
         df = df[df[_DELETE_COLUMN] == _DELETE_FALSE]
         df.drop(columns=["Row", _DELETE_COLUMN], inplace=True)
         now = datetime.now()
@@ -1146,23 +1308,32 @@ def display_confirm_dialog(n_clicks, table_names):
     return False, ""
 
 
-# Commit changes to the database
+# Queue changes for commit to the database
 @callback(
     Output("commit-output", "children"),  # Update the commit output message ...
+    Output("commit-ticket", "data"),  # ... and poll the queued commit's status
+    Output("commit-status-interval", "disabled"),
     Input("confirm-commit-dialog", "submit_n_clicks"),  # Triggered by 'Confirm' dialog
     State("project", "data"),
     State("imported-tables-dropdown", "options"),
     State("edited-data-store", "data"),
     State("update-existing-records", "value"),
+    State("upload-data", "filename"),
+    State("parser-dropdown", "value"),
 )
 def commit_to_database(
-    submit_n_clicks, project, table_names, datasets, update_existing_records
+    submit_n_clicks,
+    project,
+    table_names,
+    datasets,
+    update_existing_records,
+    filename=None,
+    selected_parser=None,
 ):
+    datasets = session_value(datasets, "edited")
     if submit_n_clicks and project and table_names and datasets:
+        datasets = [dataset_records(df) for df in datasets]
         try:
-            projectObj.database.set_write_policy(
-                WritePolicy.UPSERT if update_existing_records else WritePolicy.APPEND
-            )
             # Remove _delete rows and ['Row', '_delete'] columns before committing
             for i, table in enumerate(datasets):
                 datasets[i] = [
@@ -1172,11 +1343,70 @@ def commit_to_database(
                     {k: v for k, v in row.items() if k not in ["Row", _DELETE_COLUMN]}
                     for row in datasets[i]
                 ]
-            projectObj.database.commit_tables_dict(table_names, datasets)
-            return dbc.Alert("Data committed to database.", color="success")
+            # The commit is written by the queue's writer, not this request thread
+            ticket = utils.get_project(project).commit_queue.submit(
+                table_names,
+                datasets,
+                WritePolicy.UPSERT if update_existing_records else WritePolicy.APPEND,
+                commit_info={"parser": selected_parser, "source": filename},
+            )
+            return commit_status(ticket), ticket.ticket_id, ticket.future.done()
         except Exception as e:
             logging.error(f"Error committing data to database: {str(e)}")
             logging.error(traceback.format_exc())
-            return dbc.Alert(f"Error committing data to file: {str(e)}", color="danger")
+            return (
+                dbc.Alert(f"Error committing data to file: {str(e)}", color="danger"),
+                None,
+                True,
+            )
+
+    return "No data committed yet.", None, True
+
 
-    return "No data committed yet."
+# Poll the status of a queued commit
+@callback(
+    Output("commit-output", "children", allow_duplicate=True),
+    Output("commit-status-interval", "disabled", allow_duplicate=True),
+    Input("commit-status-interval", "n_intervals"),
+    State("commit-ticket", "data"),
+    State("project", "data"),
+    prevent_initial_call=True,
+)
+def update_commit_status(n_intervals, ticket_id, project):
+    if not (ticket_id and project):
+        return dash.no_update, True
+    ticket = utils.get_project(project).commit_queue.get(ticket_id)
+    if ticket is None:
+        return dash.no_update, True
+    return commit_status(ticket), ticket.future.done()
+
+
+def commit_status(ticket) -> dbc.Alert:
+    if ticket.status == "queued":
+        return dbc.Alert("Commit queued, waiting for earlier commits...", color="info")
+    if ticket.status == "committing":
+        return dbc.Alert("Committing data to database...", color="info")
+    if ticket.status == "failed":
+        e = ticket.future.exception()
+        if not isinstance(e, CommitError):
+            return dbc.Alert(f"Error committing data to file: {str(e)}", color="danger")
+        # Other tables of the commit may have been written
+        summary = [
+            html.Li(f"{table_name}: {str(error)}")
+            for table_name, error in e.failed.items()
+        ] + [
+            html.Li(f"{table_name}: committed")
+            for table_name in e.committed
+            if table_name not in e.failed
+        ]
+        return dbc.Alert(
+            ["Error committing data to file:", html.Ul(summary)], color="danger"
+        )
+    summary = [
+        html.Li(
+            f"{table_name}: {count['inserted']} inserted, "
+            f"{count['updated']} updated, {count['unchanged']} unchanged"
+        )
+        for table_name, count in zip(ticket.table_names, ticket.result())
+    ]
+    return dbc.Alert(["Data committed to database.", html.Ul(summary)], color="success")
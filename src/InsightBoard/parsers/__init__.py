@@ -1,8 +1,10 @@
+import io
 import shutil
 import subprocess
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 
+import numpy as np
 import pandas as pd
 
 try:
@@ -58,6 +60,73 @@ def parse_adtl(df: pd.DataFrame, spec_file, table_names) -> list[dict]:
 
     parser = adtl_parser.Parser(spec_file)
 
+    if hasattr(parser, "parse_rows") and hasattr(parser, "fieldnames"):
+        # Pass rows to ADTL, and collect its tables, in memory
+        dfs = adtl_tables(parser, df, table_names)
+    else:
+        # Older versions of ADTL only read from (and write to) CSV files
+        dfs = adtl_tables_from_files(parser, df, table_names)
+
+    return [
+        {
+            "table": table_name,
+            "data": df,
+        }
+        for table_name, df in zip(table_names, dfs)
+    ]
+
+
+def adtl_tables(parser, df: pd.DataFrame, table_names) -> list[pd.DataFrame]:
+    """Parse a DataFrame with ADTL in memory, returning the parsed tables
+
+    ADTL reads rows of text, as it would from a CSV file. Parsed values keep the
+    types given by ADTL (rather than the types read back from a CSV file).
+    """
+    rows = adtl_rows(df)
+    if empty_fields := getattr(parser, "empty_fields", None):
+        rows = [
+            {k: ("" if v == empty_fields else v) for k, v in row.items()}
+            for row in rows
+        ]
+    parser.parse_rows(rows, "DataFrame", len(rows))
+    dfs = []
+    for table_name in table_names:
+        table = pd.DataFrame(
+            list(parser.read_table(table_name)), columns=parser.fieldnames[table_name]
+        )
+        # Missing values are NaN, as when read from a CSV file
+        dfs.append(table.where(table.notna(), np.nan))
+    return dfs
+
+
+def adtl_rows(df: pd.DataFrame) -> list[dict]:
+    # Rows of text, with the values that pandas writes to a CSV file
+    names = [str(name) for name in df.columns]
+    columns = [csv_text(column).tolist() for _, column in df.items()]
+    return [dict(zip(names, values)) for values in zip(*columns)]
+
+
+def csv_text(column: pd.Series) -> pd.Series:
+    """Values of a column as text, as pandas writes them to a CSV file (missing
+    values are empty)
+
+    NumPy object, integer, boolean and float64 columns are formatted with str(), as
+    in pandas' CSV writer; other types (e.g. dates) are formatted by the writer.
+    """
+    dtype = column.dtype
+    if isinstance(dtype, np.dtype) and (dtype.kind in "Obiu" or dtype == np.float64):
+        return column.astype(str).where(column.notna(), "")
+    text = column.to_frame().to_csv(index=False, header=False)
+    return pd.read_csv(
+        io.StringIO(text),
+        header=None,
+        dtype=str,
+        keep_default_na=False,
+        skip_blank_lines=False,
+    )[0].set_axis(column.index)
+
+
+def adtl_tables_from_files(parser, df: pd.DataFrame, table_names) -> list:
     # Write the dataframe to a temporary file and load it into ADTL
     with NamedTemporaryFile(suffix=".csv", delete=False) as source_temp_file:
         df.to_csv(source_temp_file.name)
@@ -76,11 +145,4 @@ def parse_adtl(df: pd.DataFrame, spec_file, table_names) -> list[dict]:
         dfs.append(df)
         # Remove temporary file
         Path(parsed_temp_file.name).unlink()
-
-    return [
-        {
-            "table": table_name,
-            "data": df,
-        }
-        for table_name, df in zip(table_names, dfs)
-    ]
+    return dfs
@@ -12,6 +12,8 @@ import pandas as pd
 import tomli
 import tomli_w
 
+from InsightBoard import readers
+
 try:
     import adtl.autoparser as autoparser
 except ImportError:
@@ -99,17 +101,14 @@ class AutoParser:
         language: Literal["fr", "en"],
     ) -> pd.DataFrame:
         _, content_string = contents.split(",")
-        decoded = base64.b64decode(content_string)
-        ext = filename.split(".")[-1].lower()
-        if ext == "csv":
-            raw_df = pd.read_csv(io.StringIO(decoded.decode("utf-8")))
-        elif ext == "xlsx":
-            raw_df = pd.read_excel(io.BytesIO(decoded))
-        else:
+        if not readers.is_supported(filename):
             raise ValueError(
-                f"Unsupported file type: {ext}. Please provide data as either an Excel"
-                " file, or a csv",
+                f"Unsupported file type: {readers.file_extension(filename)}. Please "
+                "provide data as a csv (optionally gzipped), Excel, Parquet, Arrow "
+                "or JSON lines file",
             )
+        decoded = base64.b64decode(content_string)
+        raw_df = readers.read_file(io.BytesIO(decoded), filename)
 
         # currently config doesn't make any difference
         self.data_dict = autoparser.create_dict(raw_df, config=self.config)
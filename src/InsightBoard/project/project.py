@@ -1,16 +1,22 @@
 import base64
 import io
 import json
+import logging
 import tomllib
 from pathlib import Path
 
-import pandas as pd
 import tomli_w
+from InsightBoard import readers
 from InsightBoard import utils
 from InsightBoard.config import ConfigManager
 from InsightBoard.database import BackupPolicy
 from InsightBoard.database import Database
 from InsightBoard.database import DatabaseBackend
+from InsightBoard.database import DtypeBackend
+from InsightBoard.database import HistoryEncoding
+from InsightBoard.database import get_commit_queue
+from InsightBoard.database.db_base import DEFAULT_COMMIT_WORKERS
+from InsightBoard.validation import DEFAULT_VALIDATION_WORKERS
 
 
 def get_projects_folder():
@@ -80,6 +86,7 @@ class Project:
                 "backend": DatabaseBackend.PARQUET.name,
                 "data_folder": "data",
                 "backup_policy": BackupPolicy.NONE.name,
+                "dtype_backend": DtypeBackend.NUMPY.name,
             },
         }
         self.config = self.load_config()
@@ -89,6 +96,13 @@ class Project:
             data_folder=self.get_data_folder(),
         )
         self.database.set_backup_policy(self.get_db_backup_policy())
+        self.database.set_dtype_backend(self.get_db_dtype_backend())
+        self.database.set_history_encoding(self.get_db_history_encoding())
+        self.database.set_backend_options(self.get_db_backend_options())
+        self.database.set_commit_workers(self.get_db_commit_workers())
+        self.database.set_search_index(self.get_db_search_index())
+        # Commits from the UI are queued, and written by a single writer per database
+        self.commit_queue = get_commit_queue(self.database)
 
     def load_config(self):
         config_path = Path(self.project_folder) / "config.toml"
@@ -117,12 +131,50 @@ class Project:
     def get_db_backup_policy(self):
         return BackupPolicy[self.config["database"]["backup_policy"]]
 
+    def set_db_dtype_backend(self, dtype_backend: DtypeBackend):
+        if not isinstance(dtype_backend, DtypeBackend):
+            raise ValueError("Dtype backend must be a DtypeBackend enum.")
+        # Set the dtype backend in the database
+        self.database.set_dtype_backend(dtype_backend)
+        # Update configuration
+        self.config["database"]["dtype_backend"] = dtype_backend.name
+        self.save_config()
+
+    def get_db_dtype_backend(self):
+        return DtypeBackend[
+            self.config["database"].get("dtype_backend", DtypeBackend.NUMPY.name)
+        ]
+
+    def get_db_history_encoding(self):
+        return HistoryEncoding[
+            self.config["database"].get("history_encoding", HistoryEncoding.FULL.name)
+        ]
+
+    def get_db_backend_options(self, backend: DatabaseBackend = None):
+        # Backend-specific options, e.g. [database.sqlite] for the SQLite backend
+        backend = backend or self.get_db_backend()
+        return self.config["database"].get(backend.value, {})
+
+    def get_db_commit_workers(self):
+        # Number of tables committed concurrently (by backends that support it)
+        return self.config["database"].get("commit_workers", DEFAULT_COMMIT_WORKERS)
+
+    def get_db_search_index(self):
+        # Whether to maintain a full-text index of each table for the Data page
+        return self.config["database"].get("search_index", False)
+
     def set_db_backend(self, backend: DatabaseBackend):
         if not isinstance(backend, DatabaseBackend):
             raise ValueError("Database backend must be a DatabaseBackend enum.")
         # Create a new database backend
         self.database = Database(backend=backend, data_folder=self.get_data_folder())
         self.database.set_backup_policy(self.get_db_backup_policy())
+        self.database.set_dtype_backend(self.get_db_dtype_backend())
+        self.database.set_history_encoding(self.get_db_history_encoding())
+        self.database.set_backend_options(self.get_db_backend_options(backend))
+        self.database.set_commit_workers(self.get_db_commit_workers())
+        self.database.set_search_index(self.get_db_search_index())
+        self.commit_queue = get_commit_queue(self.database)
         # Update configuration
         self.config["database"]["backend"] = backend.name
         self.save_config()
@@ -130,6 +182,32 @@ class Project:
     def get_db_backend(self):
         return DatabaseBackend[self.config["database"]["backend"]]
 
+    def get_validation_workers(self):
+        # Number of processes validating large uploads
+        return self.config["project"].get(
+            "validation_workers", DEFAULT_VALIDATION_WORKERS
+        )
+
+    def get_preload_modules(self):
+        # Whether to load the project's parsers and reports when it is selected
+        return self.config["project"].get("preload_modules", False)
+
+    def preload_modules(self):
+        # Load (and cache) every parser and report, so that the first upload or
+        #  report does not wait for its module to be imported
+        modules = [
+            (parser["label"], parser["filename"])
+            for parser in self.get_project_parsers()
+        ] + [
+            (report["value"], Path(self.get_reports_folder()) / f"{report['value']}.py")
+            for report in self.get_reports_list()
+        ]
+        for module_name, module_path in modules:
+            try:
+                utils.load_module(module_name, module_path)
+            except Exception as e:
+                logging.warning("Failed to preload module %s: %s", module_path, e)
+
     def get_reports_folder(self):
         return f"{self.project_folder}/reports"
 
@@ -139,6 +217,9 @@ class Project:
     def get_parsers_folder(self):
         return f"{self.project_folder}/parsers"
 
+    def get_uploads_folder(self):
+        return f"{self.project_folder}/uploads"
+
     def get_schemas_folder(self):
         return f"{self.project_folder}/schemas"
 
@@ -207,19 +288,31 @@ class Project:
                 f"Available datasets: {[d['label'] for d in project_datasets]}"
             )
         datasets = [d for d in project_datasets if d["label"] in datasets]
-        return [self.database.read_table(d["label"]) for d in datasets]
+        return [self.database.cached_read_table(d["label"]) for d in datasets]
 
     def load_and_parse(self, filename, contents, selected_parser):
+        # 'contents' is a base64-encoded data URL (as provided by dcc.Upload)
         content_type, content_string = contents.split(",")
-        decoded = base64.b64decode(content_string)
-        ext = filename.split(".")[-1].lower()
-        if ext == "csv":
-            raw_df = pd.read_csv(io.StringIO(decoded.decode("utf-8")))
-        elif ext == "xlsx":
-            raw_df = pd.read_excel(io.BytesIO(decoded))
-        else:
+        if not readers.is_supported(filename):
+            return "Unsupported file type.", None, [], "", ""
+        source = io.BytesIO(base64.b64decode(content_string))
+        return self.parse(self.read_data(source, filename), selected_parser)
+
+    def load_and_parse_file(self, path, selected_parser, filename=None):
+        # Parse a file on disk (e.g. a chunked upload); the file type is determined
+        #  by 'filename' (default: the name of the file)
+        filename = filename or Path(path).name
+        if not readers.is_supported(filename):
             return "Unsupported file type.", None, [], "", ""
+        return self.parse(self.read_data(path, filename), selected_parser)
+
+    def read_data(self, source, filename):
+        # Read with the reader for the file type (see InsightBoard.readers)
+        return readers.read_file(
+            source, filename, **self.database.dtype_backend_kwargs()
+        )
 
+    def parse(self, raw_df, selected_parser):
         # Parse the data using the selected parser
         parsers_folder = self.get_parsers_folder()
         parser_module = utils.load_module(
@@ -0,0 +1,226 @@
+import io
+import logging
+import importlib.util
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.json as pj
+import pyarrow.parquet as pq
+import pyarrow.feather as feather
+
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Values that pandas' read_csv reads as missing, and as booleans (Arrow's defaults
+#  differ, e.g. reading '1' and '0' as booleans)
+NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+TRUE_VALUES = ["True", "TRUE", "true"]
+FALSE_VALUES = ["False", "FALSE", "false"]
+
+# The calamine engine (Rust) reads Excel files much faster than openpyxl
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else None
+
+# File extension -> reader(source, dtype_backend=None) -> pd.DataFrame
+READERS = {}
+
+
+class UnsupportedFileType(ValueError):
+    pass
+
+
+def register_reader(*extensions: str):
+    """Register a reader for files with the given extensions (e.g. 'csv.gz')
+
+    Readers are called with a source (a path, or a binary file-like object) and a
+    'dtype_backend' keyword ('pyarrow', or None for NumPy-backed columns).
+    """
+
+    def register(reader):
+        for ext in extensions:
+            READERS[ext.lower()] = reader
+        return reader
+
+    return register
+
+
+def file_extension(filename: str) -> str:
+    # Extension of a filename, including that of a compressed file (e.g. 'csv.gz')
+    suffixes = [s.lower().lstrip(".") for s in Path(filename).suffixes]
+    if len(suffixes) > 1 and suffixes[-1] == "gz":
+        return ".".join(suffixes[-2:])
+    return suffixes[-1] if suffixes else ""
+
+
+def is_supported(filename: str) -> bool:
+    return file_extension(filename) in READERS
+
+
+def read_file(source, filename: str, dtype_backend: str | None = None) -> pd.DataFrame:
+    """Read a data file into a DataFrame, with the reader for its file type
+
+    'source' is a path or a binary file-like object; 'filename' determines the
+    file type (uploads, for example, are stored under a different name).
+    """
+    ext = file_extension(filename)
+    if ext not in READERS:
+        raise UnsupportedFileType(f"Unsupported file type: {ext}.")
+    return READERS[ext](source, dtype_backend=dtype_backend)
+
+
+def arrow_to_pandas(table: pa.Table, dtype_backend: str | None = None) -> pd.DataFrame:
+    if dtype_backend == "pyarrow":
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    df = table.to_pandas()
+    # Missing values are NaN (not None) and empty columns are float, as in pandas
+    for field in table.schema:
+        if pa.types.is_null(field.type):
+            df[field.name] = np.nan
+        elif df[field.name].dtype == object and table[field.name].null_count:
+            df[field.name] = df[field.name].where(df[field.name].notna(), np.nan)
+    return df
+
+
+def is_gzip(source) -> bool:
+    # Whether a file (path or file-like object) is gzip-compressed
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            return f.read(2) == b"\x1f\x8b"
+    magic = source.read(2)
+    source.seek(0)
+    return magic == b"\x1f\x8b"
+
+
+def exceeds_int64(values: pa.ChunkedArray) -> bool:
+    largest = pc.max(pc.abs(values)).as_py()
+    return largest is not None and largest >= 2**63
+
+
+@register_reader("csv", "csv.gz")
+def read_csv(source, dtype_backend: str | None = None) -> pd.DataFrame:
+    """Read a CSV file (optionally gzip-compressed) with Arrow's multi-threaded
+    parser, reading values as pandas would
+
+    Columns are read as integers, decimals, booleans or strings; dates are kept as
+    strings. Files that Arrow cannot read this way (e.g. where a column's type
+    changes part way through the file, with duplicate column names, or with
+    integers too large for int64) are read by pandas instead.
+    """
+    gzipped = is_gzip(source)
+    try:
+        table = pv.read_csv(
+            pa.input_stream(
+                str(source) if isinstance(source, Path) else source,
+                compression="gzip" if gzipped else None,
+            ),
+            convert_options=pv.ConvertOptions(
+                null_values=NA_VALUES,
+                true_values=TRUE_VALUES,
+                false_values=FALSE_VALUES,
+                strings_can_be_null=True,
+                timestamp_parsers=[],
+            ),
+        )
+        names = table.column_names
+        if len(set(names)) != len(names) or "" in names:
+            raise ValueError("Column names are not unique")
+        # Arrow reads ISO dates (YYYY-MM-DD) as dates, which are cast back to text
+        for i, field in enumerate(table.schema):
+            if pa.types.is_date32(field.type):
+                table = table.set_column(i, field.name, table[i].cast(pa.string()))
+            elif pa.types.is_temporal(field.type):
+                raise ValueError(f"Column '{field.name}' has type {field.type}")
+            # Integers too large for int64 are read by Arrow as doubles (losing
+            #  digits), while pandas keeps them exact (as uint64 or text)
+            elif pa.types.is_floating(field.type) and exceeds_int64(table[i]):
+                raise ValueError(f"Column '{field.name}' has integers beyond int64")
+    except (pa.ArrowInvalid, ValueError) as e:
+        logging.info("Reading CSV with pandas (%s)", e)
+        if not isinstance(source, (str, Path)):
+            source.seek(0)
+        kwargs = {"dtype_backend": dtype_backend} if dtype_backend else {}
+        return pd.read_csv(source, compression="gzip" if gzipped else None, **kwargs)
+    return arrow_to_pandas(table, dtype_backend)
+
+
+@register_reader("xlsx")
+def read_excel(source, dtype_backend: str | None = None) -> pd.DataFrame:
+    # First sheet of an Excel workbook
+    return read_excel_sheets(source, [0], dtype_backend)[0]
+
+
+def read_excel_sheets(
+    source, sheet_names: list | None = None, dtype_backend: str | None = None
+) -> dict:
+    """Read sheets of an Excel workbook (default: every sheet), one per thread
+
+    Returns a dictionary of DataFrames, keyed by the given sheet names (or by the
+    workbook's sheet names).
+    """
+    data = source if isinstance(source, (str, Path)) else source.read()
+    if sheet_names is None:
+        with pd.ExcelFile(
+            data if isinstance(data, (str, Path)) else io.BytesIO(data),
+            engine=EXCEL_ENGINE,
+        ) as workbook:
+            sheet_names = workbook.sheet_names
+    kwargs = {"dtype_backend": dtype_backend} if dtype_backend else {}
+
+    def read_sheet(sheet_name):
+        return pd.read_excel(
+            data if isinstance(data, (str, Path)) else io.BytesIO(data),
+            sheet_name=sheet_name,
+            engine=EXCEL_ENGINE,
+            **kwargs,
+        )
+
+    if len(sheet_names) == 1:
+        return {sheet_names[0]: read_sheet(sheet_names[0])}
+    with ThreadPoolExecutor(max_workers=min(len(sheet_names), 4)) as executor:
+        return dict(zip(sheet_names, executor.map(read_sheet, sheet_names)))
+
+
+@register_reader("parquet")
+def read_parquet(source, dtype_backend: str | None = None) -> pd.DataFrame:
+    return arrow_to_pandas(pq.read_table(source), dtype_backend)
+
+
+@register_reader("arrow", "feather", "ipc")
+def read_ipc(source, dtype_backend: str | None = None) -> pd.DataFrame:
+    # Arrow IPC (Feather v2) files
+    return arrow_to_pandas(feather.read_table(source), dtype_backend)
+
+
+@register_reader("jsonl", "ndjson")
+def read_json_lines(source, dtype_backend: str | None = None) -> pd.DataFrame:
+    # One JSON object per line
+    try:
+        table = pj.read_json(source)
+    except pa.ArrowInvalid as e:
+        logging.info("Reading JSON lines with pandas (%s)", e)
+        if not isinstance(source, (str, Path)):
+            source.seek(0)
+        kwargs = {"dtype_backend": dtype_backend} if dtype_backend else {}
+        return pd.read_json(source, lines=True, **kwargs)
+    return arrow_to_pandas(table, dtype_backend)
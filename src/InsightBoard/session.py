@@ -0,0 +1,152 @@
+import uuid
+import atexit
+import shutil
+import pickle
+import logging
+import tempfile
+import threading
+import pandas as pd
+import pyarrow as pa
+
+from pathlib import Path
+from collections import OrderedDict
+
+from InsightBoard.config import ConfigManager
+
+
+def value_nbytes(value) -> int:
+    # Approximate in-memory size of a session value
+    if isinstance(value, pa.Table):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=False).sum())
+    if isinstance(value, list) and value and isinstance(value[0], pd.DataFrame):
+        return sum(value_nbytes(v) for v in value)
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def default_spill_folder() -> Path:
+    # Temporary folder for evicted session values, removed when the app exits
+    spill_folder = tempfile.mkdtemp(prefix="insightboard-sessions-")
+    atexit.register(shutil.rmtree, spill_folder, ignore_errors=True)
+    return Path(spill_folder)
+
+
+class UploadSessions:
+    """Server-side state of Upload page sessions (datasets, edits, validation errors)
+
+    The browser holds only a session id, and callbacks read and write the session's
+    values here, rather than sending whole datasets to and from the browser on
+    every interaction. Values are held in memory and bounded in size, with the
+    least-recently used evicted first; evicted values are spilled to disk (with
+    pickle, since uploaded data may mix types within a column), by default to a
+    temporary folder.
+    Configure with the [upload_sessions] section of the InsightBoard configuration:
+    'max_memory_mb' and 'spill_folder'.
+    """
+
+    _instance = None
+
+    # Make UploadSessions a singleton instance (shared by all projects and pages)
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(UploadSessions, cls).__new__(cls, *args, **kwargs)
+            cls._instance._initialised = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialised:
+            return
+        self._initialised = True
+        self.lock = threading.RLock()
+        self.entries = OrderedDict()  # (session id, key) -> (value, size)
+        self.memory_bytes = 0
+        config = ConfigManager()
+        self.configure(
+            max_memory_mb=config.get("upload_sessions.max_memory_mb", 1024),
+            spill_folder=(
+                config.get("upload_sessions.spill_folder", None)
+                or default_spill_folder()
+            ),
+        )
+
+    def configure(self, max_memory_mb=1024, spill_folder=None):
+        with self.lock:
+            self.max_memory_bytes = int(max_memory_mb * 2**20)
+            self.spill_folder = Path(spill_folder) if spill_folder else None
+            if self.spill_folder:
+                self.spill_folder.mkdir(parents=True, exist_ok=True)
+            self.evict()
+
+    def new_session(self) -> str:
+        return uuid.uuid4().hex
+
+    def get(self, session_id: str, key: str, default=None):
+        if not session_id:
+            return default
+        with self.lock:
+            entry = self.entries.get((session_id, key))
+            if entry is not None:
+                self.entries.move_to_end((session_id, key))
+                return entry[0]
+            # Restore a spilled value
+            spill_file = self.spill_path(session_id, key)
+            if spill_file and spill_file.exists():
+                try:
+                    with open(spill_file, "rb") as f:
+                        value = pickle.load(f)
+                except (OSError, pickle.UnpicklingError, EOFError) as e:
+                    logging.warning(
+                        "Discarding unreadable session file %s: %s", spill_file, e
+                    )
+                    spill_file.unlink(missing_ok=True)
+                    return default
+                spill_file.unlink(missing_ok=True)
+                self.put(session_id, key, value)
+                return value
+        return default
+
+    def put(self, session_id: str, key: str, value):
+        size = value_nbytes(value)
+        with self.lock:
+            entry = self.entries.pop((session_id, key), None)
+            if entry is not None:
+                self.memory_bytes -= entry[1]
+            spill_file = self.spill_path(session_id, key)
+            if spill_file:
+                spill_file.unlink(missing_ok=True)
+            self.entries[(session_id, key)] = (value, size)
+            self.memory_bytes += size
+            self.evict()
+
+    def delete(self, session_id: str):
+        with self.lock:
+            for entry_key in [k for k in self.entries if k[0] == session_id]:
+                self.memory_bytes -= self.entries.pop(entry_key)[1]
+            if self.spill_folder:
+                for spill_file in self.spill_folder.glob(f"{session_id}-*.pickle"):
+                    spill_file.unlink(missing_ok=True)
+
+    def evict(self):
+        # Evict least-recently used values to disk (if enabled) until within bounds;
+        #  the most recent value is always kept
+        with self.lock:
+            while len(self.entries) > 1 and self.memory_bytes > self.max_memory_bytes:
+                (session_id, key), (value, size) = self.entries.popitem(last=False)
+                self.memory_bytes -= size
+                self.spill(session_id, key, value)
+
+    def spill_path(self, session_id: str, key: str) -> Path | None:
+        if not self.spill_folder:
+            return None
+        return self.spill_folder / f"{session_id}-{key}.pickle"
+
+    def spill(self, session_id: str, key: str, value):
+        spill_file = self.spill_path(session_id, key)
+        if not spill_file:
+            logging.warning("Upload session value discarded: %s (%s)", key, session_id)
+            return
+        temp_file = spill_file.with_suffix(".tmp")
+        with open(temp_file, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        temp_file.replace(spill_file)
@@ -0,0 +1,174 @@
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+
+from pathlib import Path
+from flask import jsonify, request
+
+from InsightBoard.utils import get_project, get_projects_list
+
+# Bytes read from a request body at a time, when streaming a chunk to disk
+STREAM_BLOCK_SIZE = 2**20
+# Uploads not modified for this long are removed when new uploads are created
+MAX_UPLOAD_AGE_SECONDS = 24 * 60 * 60
+UPLOAD_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+# Appends to each upload are serialised (upload path -> lock), so that two
+#  requests for the same offset cannot both pass the offset check
+_append_locks = {}
+_append_locks_lock = threading.Lock()
+
+
+def append_lock(path: Path) -> threading.Lock:
+    with _append_locks_lock:
+        return _append_locks.setdefault(path.resolve(), threading.Lock())
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class ChunkedUploads:
+    """Resumable uploads of files to a folder, a chunk at a time
+
+    Each upload is written to '<id>.upload' (with its filename and size in
+    '<id>.json'), appending chunks in order; the length of the file is the offset
+    from which an interrupted upload resumes. Parsers then read the completed file
+    from disk, so that uploads are never held in memory.
+    """
+
+    def __init__(self, folder: str | Path):
+        self.folder = Path(folder)
+
+    def create(self, filename: str, size: int) -> str:
+        if not isinstance(size, int) or size < 0:
+            raise UploadError("Upload size must be a non-negative integer.")
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.purge()
+        upload_id = uuid.uuid4().hex
+        self.data_path(upload_id).touch()
+        with open(self.info_path(upload_id), "w") as f:
+            json.dump({"filename": Path(filename).name, "size": size}, f)
+        return upload_id
+
+    def status(self, upload_id: str) -> dict:
+        info = self.info(upload_id)
+        offset = self.data_path(upload_id).stat().st_size
+        return {
+            "upload_id": upload_id,
+            "filename": info["filename"],
+            "size": info["size"],
+            "offset": offset,
+            "complete": offset == info["size"],
+        }
+
+    def append(self, upload_id: str, offset: int, stream) -> int:
+        """Append a chunk (read from a stream) at the given offset, returning the new
+        offset; the offset must be the current length of the upload"""
+        with append_lock(self.data_path(upload_id)):
+            status = self.status(upload_id)
+            if offset != status["offset"]:
+                raise UploadError(
+                    f"Upload offset is {status['offset']}, not {offset}.", status=409
+                )
+            with open(self.data_path(upload_id), "ab") as f:
+                while block := stream.read(STREAM_BLOCK_SIZE):
+                    if f.tell() + len(block) > status["size"]:
+                        f.truncate(offset)  # Discard the partial chunk
+                        raise UploadError(
+                            "Upload exceeds its declared size.", status=413
+                        )
+                    f.write(block)
+                return f.tell()
+
+    def path(self, upload_id: str) -> Path:
+        # Path of a completed upload
+        if not self.status(upload_id)["complete"]:
+            raise UploadError("Upload is not complete.", status=409)
+        return self.data_path(upload_id)
+
+    def delete(self, upload_id: str):
+        self.check_id(upload_id)
+        self.data_path(upload_id).unlink(missing_ok=True)
+        self.info_path(upload_id).unlink(missing_ok=True)
+        with _append_locks_lock:
+            _append_locks.pop(self.data_path(upload_id).resolve(), None)
+
+    def purge(self, max_age: float = MAX_UPLOAD_AGE_SECONDS):
+        # Remove uploads that have not been modified recently
+        now = time.time()
+        for info_path in self.folder.glob("*.json"):
+            upload_id = info_path.stem
+            if not UPLOAD_ID_PATTERN.fullmatch(upload_id):
+                continue
+            data_path = self.data_path(upload_id)
+            modified = (data_path if data_path.exists() else info_path).stat().st_mtime
+            if now - modified > max_age:
+                logging.info("Removing expired upload %s", upload_id)
+                self.delete(upload_id)
+
+    def info(self, upload_id: str) -> dict:
+        self.check_id(upload_id)
+        try:
+            with open(self.info_path(upload_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadError("Upload not found.", status=404)
+
+    def check_id(self, upload_id: str):
+        # Upload ids are generated (never paths), see create
+        if not UPLOAD_ID_PATTERN.fullmatch(upload_id or ""):
+            raise UploadError("Invalid upload id.")
+
+    def data_path(self, upload_id: str) -> Path:
+        return self.folder / f"{upload_id}.upload"
+
+    def info_path(self, upload_id: str) -> Path:
+        return self.folder / f"{upload_id}.json"
+
+
+def project_uploads(project: str) -> ChunkedUploads:
+    if project not in get_projects_list():
+        raise UploadError(f"Project '{project}' not found.", status=404)
+    return ChunkedUploads(get_project(project).get_uploads_folder())
+
+
+def register_upload_routes(server, prefix: str = "/"):
+    """Add the chunked upload endpoints to the (Flask) server
+
+    POST <prefix>_uploads/<project> with JSON {filename, size} starts an upload;
+    PATCH <prefix>_uploads/<project>/<id> with an 'Upload-Offset' header appends
+    the request body; GET <prefix>_uploads/<project>/<id> returns the upload's
+    status (including the offset from which to resume).
+    """
+    route = f"{prefix}_uploads/<project>"
+
+    @server.errorhandler(UploadError)
+    def upload_error(e):
+        return jsonify({"error": str(e)}), e.status
+
+    @server.route(route, methods=["POST"])
+    def create_upload(project):
+        body = request.get_json(silent=True) or {}
+        uploads = project_uploads(project)
+        upload_id = uploads.create(body.get("filename", ""), body.get("size"))
+        return jsonify(uploads.status(upload_id)), 201
+
+    @server.route(f"{route}/<upload_id>", methods=["GET"])
+    def upload_status(project, upload_id):
+        return jsonify(project_uploads(project).status(upload_id))
+
+    @server.route(f"{route}/<upload_id>", methods=["PATCH"])
+    def append_upload(project, upload_id):
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+        except ValueError:
+            raise UploadError("Missing or invalid Upload-Offset header.")
+        uploads = project_uploads(project)
+        uploads.append(upload_id, offset, request.stream)
+        return jsonify(uploads.status(upload_id))
@@ -1,6 +1,7 @@
 import importlib
 import json
 import logging
+import threading
 from pathlib import Path
 
 import pandas as pd
@@ -9,6 +10,7 @@ from InsightBoard.project import Project
 from InsightBoard.project.project import get_custom_assets_folder
 from InsightBoard.project.project import get_default_project
 from InsightBoard.project.project import get_projects_list
+from InsightBoard.validation import ValidationExecutor
 from jsonschema import Draft7Validator
 
 
@@ -16,17 +18,33 @@ def get_project(name):
     return Project(name)
 
 
-def load_module(module_name: str, module_path: str | Path):
-    # Dynamically load the selected report
-    if isinstance(module_path, Path):
-        module_path = str(module_path)
-    spec = importlib.util.spec_from_file_location(module_name, module_path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
+# Loaded modules (parsers and reports): resolved path -> (mtime, size, module)
+_modules = {}
+_modules_lock = threading.RLock()
 
 
-def validate_against_jsonschema(df: pd.DataFrame, schema):
+def load_module(module_name: str, module_path: str | Path):
+    """Dynamically load a module (e.g. a parser or report) from a file
+
+    Modules are executed once and cached by path; a module is reloaded only when
+    its file changes (i.e. its modification time or size differs).
+    """
+    path = Path(module_path).resolve()
+    stat = path.stat()
+    with _modules_lock:
+        mtime, size, module = _modules.get(path, (None, None, None))
+        if (mtime, size) == (stat.st_mtime_ns, stat.st_size):
+            return module
+        spec = importlib.util.spec_from_file_location(module_name, str(path))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[path] = (stat.st_mtime_ns, stat.st_size, module)
+        return module
+
+
+def validate_against_jsonschema(
+    df: pd.DataFrame, schema, check_formats=False, workers: int = 1
+):
     if isinstance(schema, str) or isinstance(schema, Path):
         with open(schema, "r") as f:
             schema = json.load(f)
@@ -35,17 +53,11 @@ def validate_against_jsonschema(df: pd.DataFrame, schema):
             f"Schema must be a dictionary or a path to a json file. Got {type(schema)}"
         )
 
-    # schema validation
-    error_list = []
-    for idx, row in df.iterrows():
-        row_dict = row.to_dict()
-        # .to_dict() treats NA as NaN; need to replace with None for validation
-        for k, v in row_dict.items():
-            if isinstance(v, float) and pd.isna(v):
-                row_dict[k] = None
-        errors = validate_row_jsonschema(idx, row_dict, schema)
-        error_list.append(errors)
-    return error_list
+    # schema validation, a column at a time (errors are listed for each row); large
+    #  frames are split into chunks of rows, validated across worker processes
+    return ValidationExecutor(
+        schema, workers=workers, check_formats=check_formats
+    ).validate(df)
 
 
 def validate_row_jsonschema(row_number, row, schema):
@@ -0,0 +1,5 @@
+from InsightBoard.validation.compiled import CompiledSchema, SchemaError  # noqa: F401
+from InsightBoard.validation.executor import (  # noqa: F401
+    ValidationExecutor,
+    DEFAULT_VALIDATION_WORKERS,
+)
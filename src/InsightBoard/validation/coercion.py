@@ -0,0 +1,307 @@
+import re
+import math
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+ANY_TYPES = ["string", "number", "integer", "boolean", "array", "object", "null"]
+
+# Strings that int() / float() parse in the usual way; other strings that contain
+#  a digit (e.g. '1_000', '1e5', non-ASCII digits) are coerced one at a time
+INT_PATTERN = r"[+-]?[0-9]{1,18}"
+FLOAT_PATTERN = r"[+-]?(?:[0-9]+\.[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?"
+DIGIT = re.compile(r"\d")
+
+
+# Utility function to remove quotes from strings
+def remove_quotes(x):
+    if isinstance(x, str) and x.startswith('"') and x.endswith('"'):
+        return x[1:-1]
+    if isinstance(x, str) and x.startswith("'") and x.endswith("'"):
+        return x[1:-1]
+    return x
+
+
+def target_types(key_name=None, dtypes={}) -> list:
+    # Target types of a value, from its schema (see clean_value)
+    if isinstance(dtypes, str) and dtypes == "any":
+        return ANY_TYPES
+    if isinstance(dtypes, dict):
+        types = dtypes.get(key_name, {}).get("type", None)
+        return types if isinstance(types, list) else [types]
+    if isinstance(dtypes, list):
+        return dtypes
+    return []
+
+
+# Utility function to clean data values, coercing to target type if specified
+def clean_value(x, key_name=None, dtypes={}):
+    """Clean a value, coercing to target type if specified.
+
+    The DataTable accepts mainly strings, so this function attempts to
+    coerce the value to the target type specified in the schema. If the value
+    cannot be coerced, it is returned as a string.
+
+    Params:
+        x (str): The value to clean.
+        key_name (str): The key name of the value in the dataset.
+        dtypes (dict): A dictionary of key names and target types.
+               (list): A list of target types.
+               "any": Any type is allowed.
+    """
+
+    # Target type can be not specified if, e.g. enum or 'Row' column
+    target_types_ = target_types(key_name, dtypes)
+
+    # String pre-processing
+    if isinstance(x, str):
+        x = x.strip()
+
+    if "array" in target_types_ and isinstance(x, str):
+        if x.startswith("[") and x.endswith("]"):
+            return list(
+                map(
+                    remove_quotes,
+                    map(lambda x: clean_value(x, None, "any"), x[1:-1].split(",")),
+                )
+            )
+        elif isinstance(x, str) and "," in x:
+            return list(
+                map(
+                    remove_quotes,
+                    map(lambda x: clean_value(x, None, "any"), x.split(",")),
+                )
+            )
+
+    if "number" in target_types_:
+        if isinstance(x, int) or isinstance(x, float):
+            return x
+        elif isinstance(x, str):
+            try:
+                if "." in x:
+                    n = float(x)
+                    if math.isnan(n):
+                        return None
+                else:
+                    n = int(x)
+                return n
+            except Exception:
+                pass
+
+    if "integer" in target_types_:
+        if isinstance(x, int):
+            return x
+        elif isinstance(x, str):
+            try:
+                return int(x)  # int cannot be nan
+            except Exception:
+                pass
+
+    if "boolean" in target_types_:
+        if isinstance(x, bool):
+            return x
+        elif isinstance(x, str):
+            try:
+                if x.lower() in ["true", "false"]:
+                    return x.lower() == "true"
+            except Exception:
+                pass
+
+    if "object" in target_types_:
+        # Object is a valid json schema type, but not supported by DataTable
+        ...
+
+    if "null" in target_types_ and not x:
+        return None
+
+    # Return the original value if no coercion can be applied
+    return x
+
+
+def compile_coercion(properties: dict, columns) -> dict:
+    """Coercion plan of each column: its target types (as used by clean_value),
+    read from the schema properties once rather than for every value"""
+    return {name: target_types(name, properties) for name in columns}
+
+
+def clean_frame(df: pd.DataFrame, properties: dict) -> pd.DataFrame:
+    """Clean every value of a DataFrame, a column at a time, with the same results
+    as clean_value (applied to each value with the schema properties)"""
+    plan = compile_coercion(properties, df.columns)
+    return pd.DataFrame(
+        {name: coerce_column(df[name], types) for name, types in plan.items()},
+        index=df.index,
+        columns=df.columns,
+    )
+
+
+class Strings:
+    """Vectorized tests of an array of strings, with Arrow compute kernels (or
+    Python's string methods, for strings that Arrow cannot hold)"""
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+        try:
+            self.array = pa.array(values, type=pa.string())
+        except (pa.ArrowException, UnicodeError):  # e.g. lone surrogates
+            self.array = None
+
+    def mask(self, kernel, test) -> np.ndarray:
+        if self.array is None:
+            return np.fromiter(map(test, self.values), bool, len(self.values))
+        return kernel(self.array).to_numpy(zero_copy_only=False)
+
+    def startswith(self, prefix: str) -> np.ndarray:
+        return self.mask(
+            lambda a: pc.starts_with(a, prefix), lambda x: x.startswith(prefix)
+        )
+
+    def endswith(self, suffix: str) -> np.ndarray:
+        return self.mask(
+            lambda a: pc.ends_with(a, suffix), lambda x: x.endswith(suffix)
+        )
+
+    def contains(self, substring: str) -> np.ndarray:
+        return self.mask(
+            lambda a: pc.match_substring(a, substring), lambda x: substring in x
+        )
+
+    def fullmatch(self, pattern: str) -> np.ndarray:
+        regex = re.compile(pattern)
+        return self.mask(
+            lambda a: pc.match_substring_regex(a, f"^(?:{pattern})$"),
+            lambda x: regex.fullmatch(x) is not None,
+        )
+
+    def has_digit(self) -> np.ndarray:
+        # Any Unicode decimal digit (as matched by Python's '\d')
+        return self.mask(
+            lambda a: pc.match_substring_regex(a, r"\p{Nd}"),
+            lambda x: DIGIT.search(x) is not None,
+        )
+
+    def lower_equals(self, text: str) -> np.ndarray:
+        # 'text' is ASCII, which no other character lowers to
+        return self.mask(
+            lambda a: pc.equal(pc.ascii_lower(a), text), lambda x: x.lower() == text
+        )
+
+
+def instance_mask(value_types: pd.Series, classes) -> np.ndarray:
+    # isinstance() of each value, from the (few) distinct types of the values
+    matches = {t: issubclass(t, classes) for t in value_types.unique()}
+    return value_types.map(matches).to_numpy(dtype=bool)
+
+
+def object_array(values: list) -> np.ndarray:
+    # Object array of the values (lists are kept as elements, not broadcast)
+    return pd.Series(values, dtype=object).to_numpy()
+
+
+def coerce_column(values: pd.Series, types: list) -> pd.Series:
+    """Coerce a column of values to the target types, as clean_value would each one
+
+    Strings are tested and converted a column at a time: arrays are split,
+    numbers are parsed in bulk and booleans are matched. Values are handled one at
+    a time only where clean_value's result depends on Python's own parsing (e.g.
+    '1_000' or non-ASCII digits) or on a value's truthiness.
+    """
+    index = values.index
+    out = values.to_numpy(dtype=object, copy=True)
+    value_types = pd.Series(out, dtype=object).map(type)
+    is_str = instance_mask(value_types, str)
+    out[is_str] = object_array([x.strip() for x in out[is_str]])
+    pending = np.ones(len(out), dtype=bool)  # not yet coerced (or returned)
+
+    def pending_strings() -> np.ndarray:
+        return np.flatnonzero(pending & is_str)
+
+    if "array" in types and len(pos := pending_strings()):
+        strings = Strings(out[pos])
+        bracketed = strings.startswith("[") & strings.endswith("]")
+        arrays = bracketed | strings.contains(",")
+        if arrays.any():
+            text = [
+                x[1:-1] if b else x for x, b in zip(out[pos[arrays]], bracketed[arrays])
+            ]
+            out[pos[arrays]] = split_arrays(text)
+            pending[pos[arrays]] = False
+
+    if "number" in types:
+        pending &= ~instance_mask(value_types, (int, float))
+        if len(pos := pending_strings()):
+            floats = Strings(out[pos]).contains(".")
+            parse_numbers(out, pending, pos[floats], FLOAT_PATTERN, float_value)
+            parse_numbers(out, pending, pos[~floats], INT_PATTERN, int_value)
+
+    if "integer" in types:
+        pending &= ~instance_mask(value_types, int)
+        if len(pos := pending_strings()):
+            parse_numbers(out, pending, pos, INT_PATTERN, int_value)
+
+    if "boolean" in types:
+        pending &= ~instance_mask(value_types, bool)
+        if len(pos := pending_strings()):
+            strings = Strings(out[pos])
+            for text, value in [("true", True), ("false", False)]:
+                matches = pos[strings.lower_equals(text)]
+                out[matches] = value
+                pending[matches] = False
+
+    if "null" in types and pending.any():
+        # Empty strings, and other 'falsy' values, are null
+        pos = pending_strings()
+        out[pos[out[pos] == ""]] = None
+        others = np.flatnonzero(pending & ~is_str)
+        falsy = np.fromiter((not x for x in out[others]), bool, len(others))
+        out[others[falsy]] = None
+
+    return pd.Series(out, index=index, dtype=object)
+
+
+def split_arrays(text: list) -> np.ndarray:
+    # Split strings into lists, cleaning each item as a value of 'any' type
+    parts = [x.split(",") for x in text]
+    items = coerce_column(
+        pd.Series([item for part in parts for item in part], dtype=object), ANY_TYPES
+    ).to_numpy()
+    # Remove quotes from (cleaned) string items
+    pos = np.flatnonzero(instance_mask(pd.Series(items).map(type), str))
+    strings = Strings(items[pos])
+    quoted = pos[
+        (strings.startswith('"') & strings.endswith('"'))
+        | (strings.startswith("'") & strings.endswith("'"))
+    ]
+    items[quoted] = object_array([x[1:-1] for x in items[quoted]])
+    bounds = np.cumsum([len(part) for part in parts])[:-1]
+    return object_array([array.tolist() for array in np.split(items, bounds)])
+
+
+def float_value(x: str):
+    n = float(x)
+    return None if math.isnan(n) else n
+
+
+def int_value(x: str):
+    return int(x)
+
+
+def parse_numbers(out: np.ndarray, pending: np.ndarray, pos, pattern: str, parse):
+    """Parse strings (at the given positions) as numbers, in place: strings that
+    match the pattern are parsed in bulk, and any others that contain a digit are
+    parsed one at a time (strings without a digit parse as neither)"""
+    if not len(pos):
+        return
+    strings = Strings(out[pos])
+    matched = strings.fullmatch(pattern)
+    if matched.any():
+        dtype = np.int64 if parse is int_value else float
+        out[pos[matched]] = out[pos[matched]].astype(dtype).astype(object)
+        pending[pos[matched]] = False
+    for i in pos[~matched & strings.has_digit()]:
+        try:
+            out[i] = parse(out[i])
+        except Exception:
+            continue
+        pending[i] = False
@@ -0,0 +1,347 @@
+import re
+import numpy as np
+import pandas as pd
+
+from jsonschema import Draft7Validator, FormatChecker
+
+# Keywords that jsonschema validates (others, e.g. 'PrimaryKey', are annotations)
+VALIDATION_KEYWORDS = set(Draft7Validator.VALIDATORS)
+# Keywords of each property that are compiled to column checks
+PROPERTY_KEYWORDS = {
+    "type",
+    "enum",
+    "minimum",
+    "maximum",
+    "exclusiveMinimum",
+    "exclusiveMaximum",
+    "pattern",
+    "format",
+    "items",
+}
+FORMATS = {"date", "date-time"}
+
+# Kinds of value that satisfy each JSON type
+JSON_TYPE_KINDS = {
+    "null": {"null"},
+    "boolean": {"boolean"},
+    "integer": {"integer"},
+    "number": {"integer", "number"},
+    "string": {"string"},
+    "array": {"array"},
+    "object": {"object"},
+}
+PYTHON_TYPE_KINDS = {
+    type(None): "null",
+    type(pd.NA): "null",
+    bool: "boolean",
+    np.bool_: "boolean",
+    int: "integer",
+    np.int64: "integer",
+    np.int32: "integer",
+    str: "string",
+    list: "array",
+    dict: "object",
+}
+
+DATE_PATTERN = r"[0-9]{4}-[0-9]{2}-[0-9]{2}"
+DATE_TIME_PATTERN = (
+    r"[0-9]{4}-[0-9]{2}-[0-9]{2}[Tt][0-9]{2}:[0-9]{2}:[0-9]{2}(?:\.[0-9]+)?"
+    r"(?:[Zz]|[+-][0-9]{2}:[0-9]{2})"
+)
+
+
+class SchemaError:
+    """A validation error, with the attributes of jsonschema's ValidationError that
+    are reported to the user ('path', 'message' and 'validator')"""
+
+    __slots__ = ("path", "message", "validator")
+
+    def __init__(self, path: list, message: str, validator: str):
+        self.path = tuple(path)
+        self.message = message
+        self.validator = validator
+
+    def __repr__(self):
+        return f"<SchemaError: {self.message!r}>"
+
+
+def native(value):
+    # Python value of a cell, as jsonschema would see it in a row dictionary
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def instances(values: pd.Series, kinds: pd.Series, rows: np.ndarray) -> list:
+    # Values at the given positions, as jsonschema would see them in row dictionaries
+    return [
+        None if kind == "null" else native(value)
+        for value, kind in zip(
+            values.to_numpy(dtype=object)[rows], kinds.to_numpy()[rows]
+        )
+    ]
+
+
+def value_kinds(values: pd.Series) -> pd.Series:
+    """JSON kind of each value: null, boolean, integer, number, string, array, object
+    (or 'other' for values that are none of these)"""
+    dtype = values.dtype
+    if pd.api.types.is_bool_dtype(dtype) and not values.hasnans:
+        return pd.Series("boolean", index=values.index)
+    if pd.api.types.is_integer_dtype(dtype) and not values.hasnans:
+        return pd.Series("integer", index=values.index)
+    if pd.api.types.is_float_dtype(dtype) and isinstance(dtype, np.dtype):
+        return float_kinds(values)
+    values = values.astype(object)
+    types = values.map(type)
+    kinds = types.map(PYTHON_TYPE_KINDS).fillna("other")
+    floats = types.isin([float, np.float64, np.float32])
+    if floats.any():
+        kinds[floats] = float_kinds(values[floats].astype(float))
+    return kinds
+
+
+def float_kinds(values: pd.Series) -> pd.Series:
+    # Floats with integer values are integers, as in jsonschema
+    return pd.Series(
+        np.where(values.isna(), "null", np.where(values % 1 == 0, "integer", "number")),
+        index=values.index,
+    )
+
+
+def json_types(schema_type) -> [str]:
+    return schema_type if isinstance(schema_type, list) else [schema_type]
+
+
+class CompiledSchema:
+    """JSON schema compiled to column-wise checks over a DataFrame
+
+    Each row of the DataFrame is validated as an object, as by jsonschema's
+    Draft7Validator, with the same error paths and messages. The type, enum,
+    minimum / maximum, pattern and (if check_formats) date / date-time format of
+    each property, and required and additional properties, are checked a column at
+    a time. Anything else (e.g. '$ref', 'allOf', 'dependencies') is validated by
+    jsonschema, one row at a time; errors from those keywords follow the others.
+    """
+
+    def __init__(self, schema: dict, check_formats: bool = False):
+        self.schema = schema
+        self.check_formats = check_formats
+        self.properties = {}  # property name -> compiled keywords
+        self.keywords = []  # compiled top-level keywords, in schema order
+        fallback = {
+            key: value
+            for key, value in schema.items()
+            if key not in VALIDATION_KEYWORDS
+        }
+        for keyword, value in schema.items():
+            if keyword not in VALIDATION_KEYWORDS:
+                continue
+            if keyword == "properties":
+                self.keywords.append(keyword)
+                for name, props in value.items():
+                    if self.can_compile_property(props):
+                        self.properties[name] = props
+                    else:
+                        fallback.setdefault("properties", {})[name] = props
+            elif self.can_compile_keyword(keyword, value):
+                self.keywords.append(keyword)
+            else:
+                fallback[keyword] = value
+        self.fallback = None
+        if VALIDATION_KEYWORDS & set(fallback):
+            self.fallback = Draft7Validator(
+                fallback, format_checker=FormatChecker() if check_formats else None
+            )
+
+    def can_compile_keyword(self, keyword: str, value) -> bool:
+        if keyword == "type":
+            return value == "object"
+        if keyword == "required":
+            return True
+        if keyword == "additionalProperties":
+            return isinstance(value, bool) and "patternProperties" not in self.schema
+        return False
+
+    def can_compile_property(self, props) -> bool:
+        if not isinstance(props, dict):
+            return False
+        for keyword, value in props.items():
+            if keyword not in VALIDATION_KEYWORDS:
+                continue
+            if keyword not in PROPERTY_KEYWORDS:
+                return False
+            if keyword == "type" and not set(json_types(value)) <= set(JSON_TYPE_KINDS):
+                return False
+            if keyword == "enum" and not all(
+                v is None
+                or (isinstance(v, (str, int, float)) and not isinstance(v, bool))
+                for v in value
+            ):
+                return False
+            if keyword == "format" and self.check_formats and value not in FORMATS:
+                return False
+            if keyword == "items" and not (
+                isinstance(value, dict)
+                and VALIDATION_KEYWORDS & set(value) <= {"type"}
+                and set(json_types(value.get("type", []))) <= set(JSON_TYPE_KINDS)
+            ):
+                return False
+        return True
+
+    def validate(self, df: pd.DataFrame) -> [[SchemaError]]:
+        """Validation errors of each row, in row order"""
+        errors = [[] for _ in range(len(df))]
+        for keyword in self.keywords:
+            if keyword == "properties":
+                for name, props in self.properties.items():
+                    if name in df.columns:
+                        self.check_property(df[name], name, props, errors)
+            elif keyword == "required":
+                for name in self.schema["required"]:
+                    if name not in df.columns:
+                        error = [], f"{name!r} is a required property", "required"
+                        self.add_row_errors(errors, error)
+            elif keyword == "additionalProperties" and not self.schema[keyword]:
+                extras = [
+                    name
+                    for name in df.columns
+                    if name not in self.schema.get("properties", {})
+                ]
+                if extras:
+                    verb = "was" if len(extras) == 1 else "were"
+                    names = ", ".join(repr(name) for name in extras)
+                    message = (
+                        f"Additional properties are not allowed ({names} {verb} "
+                        "unexpected)"
+                    )
+                    self.add_row_errors(errors, ([], message, keyword))
+        if self.fallback is not None:
+            for idx, row in enumerate(self.records(df)):
+                errors[idx].extend(self.fallback.iter_errors(row))
+        return errors
+
+    def add_row_errors(self, errors: list, error: tuple):
+        # An error that applies equally to every row
+        for row_errors in errors:
+            row_errors.append(SchemaError(*error))
+
+    def records(self, df: pd.DataFrame) -> [dict]:
+        # Rows as dictionaries, with missing values as None
+        return df.astype(object).where(df.notna(), None).to_dict("records")
+
+    def check_property(self, values: pd.Series, name: str, props: dict, errors: list):
+        kinds = value_kinds(values)
+        for keyword, value in props.items():
+            if keyword == "type":
+                types = json_types(value)
+                allowed = set().union(*(JSON_TYPE_KINDS[t] for t in types))
+                failed = ~kinds.isin(allowed)
+                names = ", ".join(repr(t) for t in types)
+                message = f"{{!r}} is not of type {names}"
+            elif keyword == "enum":
+                failed = ~self.enum_matches(values, kinds, value)
+                message = f"{{!r}} is not one of {value!r}"
+            elif keyword in [
+                "minimum",
+                "maximum",
+                "exclusiveMinimum",
+                "exclusiveMaximum",
+            ]:
+                failed, message = self.check_limit(values, kinds, keyword, value)
+            elif keyword == "pattern":
+                strings = kinds == "string"
+                search = re.compile(value).search
+                failed = (
+                    strings
+                    & values.where(strings).map(search, na_action="ignore").isna()
+                )
+                message = f"{{!r}} does not match {value!r}"
+            elif keyword == "format" and self.check_formats:
+                strings = kinds == "string"
+                failed = strings & ~self.format_matches(values.where(strings), value)
+                message = f"{{!r}} is not a {value!r}"
+            elif keyword == "items" and "type" in value:
+                self.check_items(values, kinds, name, json_types(value["type"]), errors)
+                continue
+            else:
+                continue
+            rows = np.flatnonzero(failed.to_numpy())
+            for idx, instance in zip(rows, instances(values, kinds, rows)):
+                errors[idx].append(
+                    SchemaError([name], message.format(instance), keyword)
+                )
+
+    def enum_matches(self, values: pd.Series, kinds: pd.Series, enum: list):
+        matches = np.zeros(len(values), dtype=bool)
+        scalars = kinds.isin(["string", "integer", "number"]).to_numpy()
+        if scalars.any():
+            options = [v for v in enum if v is not None]
+            matches[scalars] = values[scalars].isin(options).to_numpy()
+        if None in enum:
+            matches |= (kinds == "null").to_numpy()
+        return pd.Series(matches, index=values.index)
+
+    def check_limit(self, values: pd.Series, kinds: pd.Series, keyword: str, limit):
+        numbers = kinds.isin(["integer", "number"])
+        x = pd.to_numeric(values.where(numbers), errors="coerce")
+        match keyword:
+            case "minimum":
+                failed = x < limit
+                message = f"{{!r}} is less than the minimum of {limit!r}"
+            case "maximum":
+                failed = x > limit
+                message = f"{{!r}} is greater than the maximum of {limit!r}"
+            case "exclusiveMinimum":
+                failed = x <= limit
+                message = f"{{!r}} is less than or equal to the minimum of {limit!r}"
+            case "exclusiveMaximum":
+                failed = x >= limit
+                message = f"{{!r}} is greater than or equal to the maximum of {limit!r}"
+        return numbers & failed, message
+
+    def format_matches(self, values: pd.Series, json_format: str) -> pd.Series:
+        # Strings in the given format (other values match)
+        strings = values.dropna().astype(str)
+        if json_format == "date":
+            pattern, parsed = (
+                DATE_PATTERN,
+                pd.to_datetime(strings, format="%Y-%m-%d", errors="coerce"),
+            )
+        elif json_format == "date-time":
+            pattern, parsed = (
+                DATE_TIME_PATTERN,
+                pd.to_datetime(strings, format="ISO8601", errors="coerce", utc=True),
+            )
+        else:
+            return pd.Series(True, index=values.index)
+        matches = pd.Series(True, index=values.index)
+        matches[strings.index] = strings.str.fullmatch(pattern) & parsed.notna()
+        return matches
+
+    def check_items(
+        self, values: pd.Series, kinds: pd.Series, name: str, types: [str], errors
+    ):
+        # Type of each item of array values
+        is_array = (kinds == "array").to_numpy()
+        if not is_array.any():
+            return  # e.g. a column that is blank in every row (float NaN)
+        arrays = values[is_array].astype(object).reset_index(drop=True)
+        arrays = arrays[arrays.map(len) > 0]
+        if arrays.empty:
+            return
+        rows = np.flatnonzero(is_array)[arrays.index]
+        items = arrays.explode()
+        positions = items.groupby(level=0).cumcount().to_numpy()
+        item_rows = pd.Series(rows, index=arrays.index)[items.index].to_numpy()
+        items = items.reset_index(drop=True)
+        item_kinds = value_kinds(items)
+        allowed = set().union(*(JSON_TYPE_KINDS[t] for t in types))
+        failed = np.flatnonzero(~item_kinds.isin(allowed).to_numpy())
+        names = ", ".join(repr(t) for t in types)
+        for idx, instance in zip(failed, instances(items, item_kinds, failed)):
+            errors[item_rows[idx]].append(
+                SchemaError(
+                    [name, int(positions[idx])],
+                    f"{instance!r} is not of type {names}",
+                    "type",
+                )
+            )
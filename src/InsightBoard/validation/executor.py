@@ -0,0 +1,147 @@
+import os
+import json
+import atexit
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from InsightBoard.validation.compiled import CompiledSchema, SchemaError
+
+DEFAULT_VALIDATION_WORKERS = min(4, os.cpu_count() or 1)
+# Rows per chunk; smaller uploads are validated in-process
+DEFAULT_CHUNK_SIZE = 25_000
+
+# Workers are started with a fresh interpreter (not forked), since the server
+#  process runs threads (commit queues, Flask) that a fork would copy mid-state
+MP_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Schema compiled in each worker process, by the pool initializer
+_worker_schema = None
+
+# Process pools, kept for the life of the server (schema, check_formats, workers
+#  -> pool), so that workers are started and the schema compiled only once
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _init_worker(schema: dict, check_formats: bool):
+    global _worker_schema
+    _worker_schema = CompiledSchema(schema, check_formats)
+
+
+def _validate_chunk(chunk: tuple) -> [[SchemaError]]:
+    errors = _worker_schema.validate(unpack_chunk(chunk))
+    # jsonschema's errors (from keywords that are not compiled) carry the schema
+    #  and instance with them, so return only what is reported
+    return [
+        [
+            e
+            if isinstance(e, SchemaError)
+            else SchemaError(list(e.path), e.message, e.validator)
+            for e in row
+        ]
+        for row in errors
+    ]
+
+
+def arrow_safe(values: pd.Series) -> bool:
+    # Columns that round-trip through Arrow unchanged: NumPy-typed columns, and
+    #  object columns of strings (or missing values)
+    if values.dtype != object:
+        return isinstance(values.dtype, np.dtype)
+    return values.dropna().map(type).eq(str).all()
+
+
+def pack_chunk(df: pd.DataFrame) -> tuple:
+    """Rows to send to a worker: an Arrow IPC stream of the columns that Arrow
+    represents exactly, and a DataFrame (pickled) of any other columns"""
+    columns = list(df.columns)
+    arrow_columns = [col for col in columns if arrow_safe(df[col])]
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(df[arrow_columns], preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    other = df.drop(columns=arrow_columns).reset_index(drop=True)
+    return columns, sink.getvalue().to_pybytes(), other
+
+
+def unpack_chunk(chunk: tuple) -> pd.DataFrame:
+    columns, buffer, other = chunk
+    df = pa.ipc.open_stream(buffer).read_all().to_pandas()
+    return pd.concat([df, other], axis=1)[columns]
+
+
+def get_pool(schema: dict, check_formats: bool, workers: int) -> ProcessPoolExecutor:
+    key = (json.dumps(schema, sort_keys=True), check_formats, workers)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(MP_START_METHOD),
+                initializer=_init_worker,
+                initargs=(schema, check_formats),
+            )
+        return pool
+
+
+def discard_pool(pool: ProcessPoolExecutor):
+    with _pools_lock:
+        for key in [key for key, p in _pools.items() if p is pool]:
+            del _pools[key]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(cancel_futures=True)
+
+
+class ValidationExecutor:
+    """Validate large DataFrames in chunks of rows, across a pool of processes
+
+    Pools are shared by executors with the same schema and settings, and the
+    schema is compiled once in each worker. Chunks are sent as Arrow IPC
+    streams (see pack_chunk), and the errors of each row are returned in row order.
+    """
+
+    def __init__(
+        self,
+        schema: dict,
+        workers: int = DEFAULT_VALIDATION_WORKERS,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        check_formats: bool = False,
+    ):
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("Validation workers must be a positive integer.")
+        self.schema = schema
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.check_formats = check_formats
+
+    def validate(self, df: pd.DataFrame) -> [[SchemaError]]:
+        if self.workers == 1 or len(df) <= self.chunk_size:
+            return CompiledSchema(self.schema, self.check_formats).validate(df)
+        chunks = [
+            pack_chunk(df.iloc[start : start + self.chunk_size])
+            for start in range(0, len(df), self.chunk_size)
+        ]
+        pool = get_pool(self.schema, self.check_formats, self.workers)
+        try:
+            results = pool.map(_validate_chunk, chunks)
+            return [row for errors in results for row in errors]
+        except BrokenProcessPool:
+            # A worker died; start a new pool for the next validation
+            discard_pool(pool)
+            raise
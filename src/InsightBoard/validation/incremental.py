@@ -0,0 +1,46 @@
+import pandas as pd
+
+
+def row_hashes(df: pd.DataFrame) -> [str]:
+    # Content hash of each row (as hex strings, which survive a round trip through
+    #  the browser); values are hashed by their repr, so that '1' and 1 differ
+    hashes = pd.util.hash_pandas_object(df.map(repr), index=False)
+    return [format(h, "016x") for h in hashes]
+
+
+def validation_state(df: pd.DataFrame, key: list) -> dict:
+    """Record of the rows that have been validated
+
+    'key' identifies what the rows were validated against (e.g. the table, its
+    columns and the modification times of its schemas); rows can only be carried
+    over from a previous validation with the same key.
+    """
+    return {"key": key, "hashes": row_hashes(df)}
+
+
+def rows_to_validate(state: dict, previous: dict | None) -> list[int] | None:
+    """Positions of the rows that have changed since the previous validation
+
+    Returns None if every row must be validated: there was no previous validation
+    with the same key, or rows have been added or removed. Schemas validate each
+    row independently, so no other rows are affected by an edit.
+    """
+    if (
+        not previous
+        or previous["key"] != state["key"]
+        or len(previous["hashes"]) != len(state["hashes"])
+    ):
+        return None
+    return [
+        idx
+        for idx, (old, new) in enumerate(zip(previous["hashes"], state["hashes"]))
+        if old != new
+    ]
+
+
+def patch_rows(errors: list, rows: [int], row_errors: list) -> list:
+    # Replace the errors of the re-validated rows
+    errors = list(errors)
+    for idx, row_error in zip(rows, row_errors):
+        errors[idx] = row_error
+    return errors
@@ -1,10 +1,18 @@
 from unittest.mock import patch
+from InsightBoard.session import UploadSessions
 from InsightBoard.pages.upload import (
     update_filename,
     update_page_size,
     update_table,
     remove_quotes,
     clean_value,
+    display_value,
+    display_row,
+    records_dataset,
+    _DELETE_FALSE,
+    _DELETE_TRUE,
+    session_token,
+    put_session_value,
     # update_edited_data,
     # error_report_message,
     # text_to_html,
@@ -20,6 +28,7 @@ from InsightBoard.pages.upload import (
     # download_csv,
     # display_confirm_dialog,
     # commit_to_database,
+    update_commit_status,
 )
 
 
@@ -83,7 +92,11 @@ def test_update_table():
     project = "project"
     options = ["table1", "table2"]
     unique_table_id = "project-table1"
-    edited_datasets = [table1, table2]
+    # Datasets are held server-side, and referenced by a session token
+    edited_datasets = session_token(UploadSessions().new_session())
+    datasets = [records_dataset(table1), records_dataset(table2)]
+    put_session_value(edited_datasets, "edited", datasets)
+    put_session_value(edited_datasets, "parsed", datasets)
     parsed_datasets = edited_datasets
     only_show_validation_errors = False
     update_existing_records = True
@@ -91,7 +104,9 @@ def test_update_table():
     remove_error_rows_n_clicks = None
     restore_deleted_rows_n_clicks = None
     active_cell = None
-    errors = []
+    page_current = 0
+    page_size = 25
+    errors = None
 
     # Mock clean_dataset
     def _clean_dataset(data, *args, **kwargs):
@@ -109,7 +124,15 @@ def test_update_table():
         mock_ctx.triggered = []
         mock_ctx_trigger.return_value = False
         mock_get_project.database.get_primary_key.return_value = "col1"
-        columns, hidden_columns, data, new_active_cell, data_stats = update_table(
+        (
+            columns,
+            hidden_columns,
+            data,
+            new_active_cell,
+            page_count,
+            new_page_current,
+            data_stats,
+        ) = update_table(
             options,
             selected_table,
             unique_table_id,
@@ -119,6 +142,8 @@ def test_update_table():
             remove_error_rows_n_clicks,
             restore_deleted_rows_n_clicks,
             active_cell,
+            page_current,
+            page_size,
             project,
             edited_datasets,
             parsed_datasets,
@@ -144,7 +169,15 @@ def test_update_table():
         mock_ctx.triggered = []
         mock_ctx_trigger.return_value = False
         mock_get_project.database.get_primary_key.return_value = "col1"
-        columns, hidden_columns, data, new_active_cell, data_stats = update_table(
+        (
+            columns,
+            hidden_columns,
+            data,
+            new_active_cell,
+            page_count,
+            new_page_current,
+            data_stats,
+        ) = update_table(
             options,
             selected_table,
             unique_table_id,
@@ -154,6 +187,8 @@ def test_update_table():
             remove_error_rows_n_clicks,
             restore_deleted_rows_n_clicks,
             active_cell,
+            page_current,
+            page_size,
             project,
             edited_datasets,
             parsed_datasets,
@@ -168,6 +203,57 @@ def test_update_table():
     assert data == table2
 
 
+def test_update_table__server_side_paging():
+    table = [{"col1": str(i), "Row": i + 1, "_delete": _DELETE_FALSE} for i in range(5)]
+    token = session_token(UploadSessions().new_session())
+    put_session_value(token, "edited", [records_dataset(table)])
+    errors = session_token(token["session"])
+    put_session_value(errors, "errors", [[], ["e"], [], ["e"], ["e"]])
+
+    def _update_table(only_show_validation_errors, page_current, active_cell=None):
+        with (
+            patch("InsightBoard.pages.upload.dash.callback_context") as mock_ctx,
+            patch("InsightBoard.pages.upload.ctx_trigger") as mock_ctx_trigger,
+            patch("InsightBoard.utils.get_project"),
+            patch("InsightBoard.utils.ensure_schema_ordering") as mock_ordering,
+        ):
+            mock_ctx.triggered = []
+            mock_ctx_trigger.return_value = False
+            mock_ordering.side_effect = lambda columns, *args: columns
+            return update_table(
+                ["table1"],
+                "table1",
+                "project-table1",
+                only_show_validation_errors,
+                True,
+                None,
+                None,
+                None,
+                active_cell,
+                page_current,
+                2,
+                "project",
+                token,
+                None,
+                errors,
+            )
+
+    # Only the current page is returned
+    _, _, data, _, page_count, page_current, data_stats = _update_table(False, 1)
+    assert [row["Row"] for row in data] == [3, 4]
+    assert (page_count, page_current) == (3, 1)
+    assert data_stats == "Total rows: 5, Showing: 5"
+    # Rows with errors are filtered server-side (and the page is kept in range)
+    _, _, data, _, page_count, page_current, data_stats = _update_table(True, 4)
+    assert [row["Row"] for row in data] == [5]
+    assert (page_count, page_current) == (2, 1)
+    # Delete buttons refer to rows of the current page
+    active_cell = {"row": 0, "column_id": "_delete"}
+    _, _, data, _, _, _, data_stats = _update_table(True, 0, active_cell)
+    assert data[0] == {"col1": "1", "Row": 2, "_delete": _DELETE_TRUE}
+    assert data_stats == "Total rows: 5, Showing: 3, Deleted: 1"
+
+
 def test_remove_quotes():
     assert remove_quotes("'1'") == "1"
     assert remove_quotes('"1"') == "1"
@@ -203,6 +289,20 @@ def test_clean_value():
     assert clean_value(False, *bool_or_null_type) is False
 
 
+def test_display_value():
+    assert display_value(["a", "b", "c"]) == "[a, b, c]"
+    assert display_value([1, None, 2]) == "[1, 2]"
+    assert display_value([]) == "[]"
+    assert display_value("a, b") == "a, b"
+    assert display_value(None) is None
+
+
+def test_display_row():
+    row = {"Row": 1, "k": ["a", "b"], "n": 1.5}
+    assert display_row(row) == {"Row": 1, "k": "[a, b]", "n": 1.5}
+    assert row["k"] == ["a", "b"]  # stored row retains lists
+
+
 def test_update_edited_data():
     # update_edited_data(
     #     parsed_data, edited_table_data, tables, selected_table, datasets
@@ -313,3 +413,16 @@ def test_display_confirm_dialog():
 def test_commit_to_database():
     # commit_to_database(submit_n_clicks, project, table_names, datasets):
     ...
+
+
+def test_update_commit_status():
+    # The ticket is looked up in the queue of the session's own project
+    with patch("InsightBoard.utils.get_project") as mock_get_project:
+        queue = mock_get_project.return_value.commit_queue
+        queue.get.return_value.status = "committing"
+        queue.get.return_value.future.done.return_value = False
+        _, disabled = update_commit_status(1, "ticket", "project1")
+        mock_get_project.assert_called_once_with("project1")
+        queue.get.assert_called_once_with("ticket")
+        assert disabled is False
+        assert update_commit_status(1, "ticket", None)[1] is True
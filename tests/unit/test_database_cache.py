@@ -0,0 +1,110 @@
+"""Unit tests for the query result cache."""
+
+import pytest
+import pandas as pd
+import pyarrow as pa
+
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from InsightBoard.database import Database, DatabaseBackend
+from InsightBoard.database.cache import (
+    QueryCache,
+    TableGenerations,
+    normalize_sql,
+    referenced_tables,
+)
+
+schema = {
+    "properties": {
+        "col1": {"type": "integer", "PrimaryKey": True},
+        "col2": {"type": ["string", "null"]},
+    },
+}
+
+
+@pytest.fixture
+def cache():
+    cache = QueryCache()
+    cache.configure(max_memory_mb=256)
+    cache.clear()
+    yield cache
+    cache.configure(max_memory_mb=256)
+    cache.clear()
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT  *\n FROM t ;") == "SELECT * FROM t"
+    assert normalize_sql("SELECT 'a  b' FROM \"my  table\"") == (
+        "SELECT 'a  b' FROM \"my  table\""
+    )
+
+
+def test_referenced_tables():
+    tables = ["cases", "cases_archive", "contacts"]
+    assert referenced_tables("SELECT * FROM cases", tables) == ["cases"]
+    assert referenced_tables(
+        'SELECT * FROM "cases_archive" JOIN contacts USING (id)', tables
+    ) == ["cases_archive", "contacts"]
+
+
+def test_TableGenerations():
+    with TemporaryDirectory() as temp_dir:
+        generations = TableGenerations(temp_dir)
+        assert generations.get(["table1"]) == {"table1": 0}
+        assert generations.bump("table1") == 1
+        assert generations.bump("table1") == 2
+        assert TableGenerations(temp_dir).get(["table1", "table2"]) == {
+            "table1": 2,
+            "table2": 0,
+        }
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        DatabaseBackend.PARQUET,
+        DatabaseBackend.SQLITE,
+    ],
+)
+def test_cached_sql_query__invalidated_on_commit(cache, backend):
+    with (
+        TemporaryDirectory() as temp_dir,
+        patch(
+            "InsightBoard.database.database.DatabaseBase.get_table_schema"
+        ) as mock_schema,
+    ):
+        mock_schema.return_value = schema
+        db = Database(backend, temp_dir)
+        db.commit_table("table1", pd.DataFrame({"col1": [1, 2], "col2": ["a", "b"]}))
+        query = "SELECT COUNT(*) AS n FROM table1"
+        with patch.object(db, "sql_query", wraps=db.sql_query) as mock_query:
+            assert db.cached_sql_query(query, "table1")["n"].iloc[0] == 2
+            assert db.cached_sql_query(query + " ;", "table1")["n"].iloc[0] == 2
+            assert mock_query.call_count == 1
+            # A commit bumps the table generation, so the query is re-run
+            db.commit_table("table1", pd.DataFrame({"col1": [3], "col2": ["c"]}))
+            assert db.cached_sql_query(query, "table1")["n"].iloc[0] == 3
+            assert mock_query.call_count == 2
+            # Queries are run as written (a comment ends at the end of its line)
+            commented = "SELECT col1 -- key\nFROM table1 WHERE col1 = 3"
+            assert db.cached_sql_query(commented, "table1")["col1"].tolist() == [3]
+        with patch.object(db, "read_table", wraps=db.read_table) as mock_read:
+            df1 = db.cached_read_table("table1")
+            df1["col2"] = None  # Results are copies, safe to modify
+            df2 = db.cached_read_table("table1")
+            assert mock_read.call_count == 1
+        assert sorted(df2["col2"].tolist()) == ["a", "b", "c"]
+
+
+def test_QueryCache__lru_eviction_and_spill(cache):
+    table = pa.table({"x": list(range(1000))})  # 8000 bytes
+    with TemporaryDirectory() as spill_folder:
+        cache.configure(max_memory_mb=20000 / 2**20, spill_folder=spill_folder)
+        for key in ["a", "b", "c"]:
+            cache.put(key, table, "data", ["table1"])
+        assert list(cache.entries) == ["b", "c"]  # 'a' evicted to disk
+        assert cache.get("a").equals(table)  # served from the spill
+        cache.invalidate("data", "table1")
+        assert not cache.entries
+        cache.configure(max_memory_mb=256)  # Disable spill before folder is removed
@@ -0,0 +1,110 @@
+"""Unit tests for the commit queue."""
+
+import time
+import threading
+import pytest
+import pandas as pd
+
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from InsightBoard.database import (
+    CommitError,
+    CommitQueue,
+    Database,
+    get_commit_queue,
+    DatabaseBackend,
+    WritePolicy,
+)
+
+schema = {
+    "properties": {
+        "col1": {"type": "integer", "PrimaryKey": True},
+        "col2": {"type": ["string", "null"]},
+    },
+}
+
+
+@pytest.fixture
+def db():
+    with TemporaryDirectory() as temp_dir:
+        with patch(
+            "InsightBoard.database.database.DatabaseBase.get_table_schema"
+        ) as mock_schema:
+            mock_schema.return_value = schema
+            yield Database(DatabaseBackend.PARQUET_VERSIONED, temp_dir)
+
+
+def test_commit_queue__submit(db):
+    queue = CommitQueue(db)
+    ticket = queue.submit(
+        ["table1"],
+        [[{"col1": 1, "col2": "a"}, {"col1": 2, "col2": "b"}]],
+        WritePolicy.UPSERT,
+    )
+    assert ticket.result(timeout=10) == [{"inserted": 2, "updated": 0, "unchanged": 0}]
+    assert ticket.status == "committed"
+    assert queue.get(ticket.ticket_id) is ticket
+    assert db.read_table("table1")["col2"].tolist() == ["a", "b"]
+
+
+def test_commit_queue__coalesce(db):
+    queue = CommitQueue(db)
+    # Hold the writer in its first commit, so that later submissions queue up
+    release = threading.Event()
+    commit_tables = db.commit_tables
+
+    def blocking_commit_tables(*args, **kwargs):
+        release.wait(timeout=10)
+        return commit_tables(*args, **kwargs)
+
+    with patch.object(db, "commit_tables", side_effect=blocking_commit_tables) as mock:
+        first = queue.submit("table1", pd.DataFrame({"col1": [1], "col2": ["a"]}))
+        while first.status == "queued":
+            time.sleep(0.01)
+        second = queue.submit("table1", pd.DataFrame({"col1": [2], "col2": ["b"]}))
+        third = queue.submit("table1", pd.DataFrame({"col1": [2], "col2": ["c"]}))
+        assert third.status == "queued"
+        release.set()
+        for ticket in [first, second, third]:
+            ticket.result(timeout=10)
+    # The queued submissions are written together, in a single commit, and each
+    #  ticket reports its own rows
+    assert mock.call_count == 2
+    assert second.result() == [{"inserted": 1, "updated": 0, "unchanged": 0}]
+    assert third.result() == [{"inserted": 0, "updated": 1, "unchanged": 0}]
+    df = db.read_table("table1").sort_values("col1")
+    assert df["col2"].tolist() == ["a", "c"]
+
+
+def test_commit_queue__failure(db):
+    queue = CommitQueue(db)
+    ticket = queue.submit(
+        ["table1", "table2"],
+        [pd.DataFrame({"col1": [1]}), pd.DataFrame({"col2": ["a"]})],  # No key
+    )
+    with pytest.raises(CommitError) as exc_info:
+        ticket.result(timeout=10)
+    assert ticket.status == "failed"
+    assert list(exc_info.value.committed) == ["table1"]
+    assert list(exc_info.value.failed) == ["table2"]
+
+
+def test_get_commit_queue(db):
+    # Each database (data folder and backend) has one queue, and so one writer
+    queue = get_commit_queue(db)
+    other = Database(db.BACKEND, db.data_folder)
+    assert get_commit_queue(other) is queue
+    assert queue.database is other
+    assert (
+        get_commit_queue(Database(DatabaseBackend.SQLITE, db.data_folder)) is not queue
+    )
+    # Ticket ids are unique across queues
+    with TemporaryDirectory() as temp_dir:
+        other_queue = get_commit_queue(Database(db.BACKEND, temp_dir))
+        first = queue.submit("table1", pd.DataFrame({"col1": [1], "col2": ["a"]}))
+        second = other_queue.submit("table1", pd.DataFrame({"col1": [1]}))
+        assert first.ticket_id != second.ticket_id
+        assert queue.get(second.ticket_id) is None
+        first.result(timeout=10)
+        second.result(timeout=10)
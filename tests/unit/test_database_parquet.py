@@ -11,7 +11,16 @@ from datetime import datetime
 from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
-from InsightBoard.database import Database, DatabaseBackend, WritePolicy, BackupPolicy
+from InsightBoard.database import (
+    Database,
+    DatabaseBackend,
+    WritePolicy,
+    BackupPolicy,
+    DtypeBackend,
+    HistoryEncoding,
+    SchemaChange,
+    CommitError,
+)
 
 
 @pytest.fixture
@@ -83,7 +92,10 @@ def test_DatabaseParquet_set_backup_policy__invalid(request, backend):
 
 
 def drop_metadata(df):
-    return df.drop(columns=["_version", "_deleted", "_metadata"], errors="ignore")
+    return df.drop(
+        columns=["_version", "_deleted", "_commit_id", "_metadata", "_row_hash"],
+        errors="ignore",
+    )
 
 
 @pytest.mark.parametrize(
@@ -271,6 +283,81 @@ def test_commit_tables__list(request, backend):
     assert db2.equals(datasets[1])
 
 
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_parquet",
+        "db_parquet_versioned",
+    ],
+)
+def test_commit_tables__parallel(request, backend):
+    db = request.getfixturevalue(backend)
+    db.set_commit_workers(4)
+    table_names = [f"table{i}" for i in range(6)] + ["table0"]
+    datasets = [pd.DataFrame({"col1": [i, i + 10], "col2": [i, i]}) for i in range(7)]
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = {
+            "properties": {
+                "col1": {"type": "integer", "PrimaryKey": True},
+                "col2": {"type": "integer"},
+            },
+        }
+        counts = db.commit_tables(table_names, datasets)
+        assert [count["inserted"] for count in counts] == [2] * 7
+        assert sorted(db.get_tables_list()) == sorted(set(table_names))
+        # Commits to the same table are made in order
+        df = db.read_table("table0").sort_values("col1")
+    assert df["col1"].tolist() == [0, 6, 10, 16]
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_parquet",
+        "db_parquet_versioned",
+    ],
+)
+def test_commit_tables__partial_failure(request, backend):
+    db = request.getfixturevalue(backend)
+    table_names = ["table1", "table2", "table3"]
+    datasets = [
+        pd.DataFrame({"col1": [1, 2], "col2": [3, 4]}),
+        pd.DataFrame({"col2": [5, 6]}),  # Missing primary key
+        pd.DataFrame({"col1": [7, 8], "col2": [9, 10]}),
+    ]
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = {
+            "properties": {
+                "col1": {"type": "integer", "PrimaryKey": True},
+                "col2": {"type": "integer"},
+            },
+        }
+        with pytest.raises(CommitError) as e:
+            db.commit_tables(table_names, datasets)
+        # Other tables are still committed
+        assert sorted(e.value.committed) == ["table1", "table3"]
+        assert list(e.value.failed) == ["table2"]
+        assert isinstance(e.value.failed["table2"], ValueError)
+        assert sorted(db.get_tables_list()) == ["table1", "table3"]
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_parquet",
+        "db_parquet_versioned",
+    ],
+)
+def test_set_commit_workers__invalid(request, backend):
+    db = request.getfixturevalue(backend)
+    with pytest.raises(ValueError):
+        db.set_commit_workers(0)
+
+
 @pytest.mark.parametrize(
     "backend",
     [
@@ -745,7 +832,8 @@ def test_write_table_parquet__primary_key_upsert(db_parquet):
         df = pd.DataFrame({"col1": [1, 3, 4, 5], "col2": [7, 8, 9, 10]})
         db.write_table_parquet(table_name, df, write_policy, backup_policy)
     # Read and check parquet file (sort columns for comparison)
-    db1 = pd.read_parquet(db.data_folder + "/table1." + db.suffix).sort_values("col1")
+    db1 = drop_metadata(pd.read_parquet(db.data_folder + "/table1." + db.suffix))
+    db1 = db1.sort_values("col1")
     df_composite = pd.DataFrame(
         {"col1": [1, 2, 3, 4, 5], "col2": [7, 5, 8, 9, 10]}
     ).sort_values("col1")
@@ -803,12 +891,17 @@ def test_write_table_parquet_versioned__primary_key_upsert(db_parquet_versioned)
             "col2": [4, 5, 6, 8, 9, 10],
             "_version": [1, 1, 1, 2, 1, 1],
             "_deleted": [False] * 6,
-            "_metadata": ['{"timestamp": "2021-02-01T01:02:03"}'] * 3
-            + ['{"timestamp": "2022-03-02T04:05:06"}'] * 3,
+            "_commit_id": [1] * 3 + [2] * 3,
         }
     ).sort_values("col1")
     # upsert policy (rows 2 and 3 update)
     assert (db1.values == df_composite.values).all()
+    # Each commit is recorded once in the commit log
+    log = db.commit_log.read()
+    assert log["commit_id"].tolist() == [1, 2]
+    assert log["timestamp"].tolist() == ["2021-02-01T01:02:03", "2022-03-02T04:05:06"]
+    assert log["rows_inserted"].tolist() == [3, 2]
+    assert log["rows_updated"].tolist() == [0, 1]
     # Check that the database returns only the most recent version of each row
     with patch(
         "InsightBoard.database.database.DatabaseParquet.get_primary_key"
@@ -858,7 +951,8 @@ def test_write_table_parquet__primary_key_append(db_parquet):
         df = pd.DataFrame({"col1": [1, 3, 4, 5], "col2": [7, 8, 9, 10]})
         db.write_table_parquet(table_name, df, write_policy, backup_policy)
     # Read and check parquet file (sort columns for comparison)
-    db1 = pd.read_parquet(db.data_folder + "/table1." + db.suffix).sort_values("col1")
+    db1 = drop_metadata(pd.read_parquet(db.data_folder + "/table1." + db.suffix))
+    db1 = db1.sort_values("col1")
     df_composite = pd.DataFrame(
         {
             "col1": [1, 2, 3, 4, 5],
@@ -869,6 +963,139 @@ def test_write_table_parquet__primary_key_append(db_parquet):
     assert (db1.values == df_composite.values).all()
 
 
+def test_write_table_parquet__unchanged_rows(db_parquet):
+    db = db_parquet
+    schema = {
+        "properties": {
+            "col1": {"type": "integer", "PrimaryKey": True},
+            "col2": {"type": ["string", "null"]},
+            "col3": {"type": ["array", "null"], "items": {"type": "string"}},
+        },
+    }
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame({"col1": [1, 2], "col2": ["a", "b"], "col3": [["x"], None]})
+        # Tables written before row hashes were stored are hashed on the next write
+        db.write_table_parquet("table1", df)
+        file_path = Path(db.data_folder) / f"table1.{db.suffix}"
+        pd.read_parquet(file_path).drop(columns=["_row_hash"]).to_parquet(file_path)
+        assert db.commit_table("table1", df) == {
+            "inserted": 0,
+            "updated": 2,
+            "unchanged": 0,
+        }
+        df = pd.DataFrame(
+            {"col1": [1, 2, 3], "col2": ["a", "c", "d"], "col3": [["x"], None, None]}
+        )
+        assert db.commit_table("table1", df) == {
+            "inserted": 1,
+            "updated": 1,
+            "unchanged": 1,
+        }
+        # Nothing is written (or backed up) when every row is unchanged
+        with patch.object(db, "backup") as mock_backup:
+            mtime = file_path.stat().st_mtime_ns
+            assert db.commit_table("table1", df)["unchanged"] == 3
+            assert file_path.stat().st_mtime_ns == mtime
+            mock_backup.assert_not_called()
+        db.set_write_policy(WritePolicy.APPEND)
+        assert db.commit_table("table1", df.assign(col2="e"))["unchanged"] == 3
+        df2 = db.read_table("table1").sort_values("col1")
+    assert df2.columns.tolist() == ["col1", "col2", "col3"]
+    assert df2["col2"].tolist() == ["a", "c", "d"]
+
+
+def test_write_table_parquet__partitioned(db_parquet):
+    db = db_parquet
+    schema = {
+        "properties": {
+            "col1": {"type": "integer", "PrimaryKey": True},
+            "col2": {
+                "type": ["string", "null"],
+                "format": "date",
+                "Partition": "month",
+            },
+            "col3": {"type": ["array", "null"], "items": {"type": "string"}},
+        },
+    }
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame(
+            {
+                "col1": [1, 2, 3, 4],
+                "col2": ["2024-01-05", "2024-02-11", "2024-03-01", None],
+                "col3": [["x"], None, ["y"], None],
+            }
+        )
+        db.commit_table("table1", df)
+        folder = Path(db.data_folder) / f"table1.{db.suffix}"
+        assert sorted(p.name for p in folder.glob("_partition=*")) == [
+            "_partition=2024-01",
+            "_partition=2024-02",
+            "_partition=2024-03",
+            "_partition=__HIVE_DEFAULT_PARTITION__",
+        ]
+        assert db.get_tables_list() == ["table1"]
+        # Only the affected partitions are written (record 2 moves to March)
+        january = folder / "_partition=2024-01" / "part-0.parquet"
+        mtime = january.stat().st_mtime_ns
+        df = pd.DataFrame({"col1": [2, 5], "col2": ["2024-03-11", "2024-03-12"]})
+        assert db.commit_table("table1", df) == {
+            "inserted": 1,
+            "updated": 1,
+            "unchanged": 0,
+        }
+        assert january.stat().st_mtime_ns == mtime
+        assert not (folder / "_partition=2024-02").exists()
+        df2 = db.read_table("table1").sort_values("col1")
+        assert df2["col2"].tolist()[:3] == ["2024-01-05", "2024-03-11", "2024-03-01"]
+        assert df2["col3"].tolist() == [["x"], None, ["y"], None, None]
+        df2 = db.sql_query("SELECT COUNT(*) AS n FROM table1", "table1")
+        assert df2["n"].iloc[0] == 5
+        # Filters on the partition field skip other partitions without reading them
+        january.write_text("not a parquet file")
+        df2 = db.read_table("table1", filters=[("col2", ">=", "2024-03-05")])
+    assert sorted(df2["col1"].tolist()) == [2, 5]
+
+
+def test_write_table_parquet__repartition(db_parquet):
+    db = db_parquet
+    schema = {
+        "properties": {
+            "col1": {"type": "integer", "PrimaryKey": True},
+            "col2": {"type": ["string", "null"]},
+        },
+    }
+    partitioned_schema = {
+        "properties": {
+            **schema["properties"],
+            "col2": {"type": ["string", "null"], "Partition": True},
+        },
+    }
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        db.commit_table("table1", pd.DataFrame({"col1": [1, 2], "col2": ["a/b", "c"]}))
+        # Tables are partitioned on the next commit once the schema requests it
+        mock_schema.return_value = partitioned_schema
+        db.commit_table("table1", pd.DataFrame({"col1": [3], "col2": ["c"]}))
+        folder = Path(db.data_folder) / f"table1.{db.suffix}"
+        assert (folder / "_partition=a%2Fb" / "part-0.parquet").exists()
+        df2 = db.read_table("table1", filters=[("col2", "==", "c")])
+        assert sorted(df2["col1"].tolist()) == [2, 3]
+        # ...and returned to a single file if the partition is removed
+        mock_schema.return_value = schema
+        db.commit_table("table1", pd.DataFrame({"col1": [4], "col2": [None]}))
+        assert folder.is_file()
+        df2 = db.read_table("table1").sort_values("col1")
+    assert df2["col2"].tolist() == ["a/b", "c", "c", None]
+
+
 def test_write_table_parquet_versioned__primary_key_append(db_parquet_versioned):
     db = db_parquet_versioned
     # Write table with primary key
@@ -914,9 +1141,418 @@ def test_write_table_parquet_versioned__primary_key_append(db_parquet_versioned)
             "col2": [4, 5, 6, 9, 10],
             "_version": [1] * 5,
             "_deleted": [False] * 5,
-            "_metadata": ['{"timestamp": "2021-02-01T01:02:03"}'] * 3
-            + ['{"timestamp": "2022-03-02T04:05:06"}'] * 2,
+            "_commit_id": [1] * 3 + [2] * 2,
         }
     ).sort_values("col1")
     # append policy (rows 2 and 3 do not update)
     assert (db1.values == df_composite.values).all()
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_parquet",
+        "db_parquet_versioned",
+    ],
+)
+def test_write_table_parquet__array_columns(request, backend):
+    db = request.getfixturevalue(backend)
+    table_name = "table1"
+    schema = {
+        "properties": {
+            "col1": {"type": "integer", "PrimaryKey": True},
+            "col2": {"type": ["array", "null"], "items": {"type": "string"}},
+        },
+    }
+    df = pd.DataFrame({"col1": [1, 2, 3], "col2": [["a", "b"], ["c"], None]})
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        db.write_table_parquet(table_name, df)
+        # Legacy string representations are stored as lists
+        df = pd.DataFrame({"col1": [3, 4], "col2": ["[d, e]", '["f"]']})
+        db.write_table_parquet(table_name, df)
+        table = pyarrow.parquet.read_table(f"{db.data_folder}/table1.{db.suffix}")
+        assert table.schema.field("col2").type == pyarrow.list_(pyarrow.string())
+        df2 = db.read_table(table_name).sort_values("col1")
+    assert df2["col2"].tolist() == [["a", "b"], ["c"], ["d", "e"], ["f"]]
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_parquet",
+        "db_parquet_versioned",
+    ],
+)
+def test_read_table__pyarrow_dtype_backend(request, backend):
+    db = request.getfixturevalue(backend)
+    table_name = "table1"
+    schema = {
+        "properties": {
+            "col1": {"type": "integer", "PrimaryKey": True},
+            "col2": {"type": "string"},
+        },
+    }
+    df = pd.DataFrame({"col1": [1, 2, 3], "col2": ["a", "b", "c"]})
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        db.write_table_parquet(table_name, df)
+        db.set_dtype_backend(DtypeBackend.PYARROW)
+        df2 = db.read_table(table_name)
+        col2 = db.read_table_column(table_name, "col2")
+    assert all(isinstance(dtype, pd.ArrowDtype) for dtype in df2.dtypes)
+    assert isinstance(col2.dtype, pd.ArrowDtype)
+    assert df2["col2"].tolist() == ["a", "b", "c"]
+
+
+def test_set_dtype_backend__invalid(db_parquet):
+    with pytest.raises(ValueError):
+        db_parquet.set_dtype_backend("pyarrow")
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_parquet",
+        "db_parquet_versioned",
+    ],
+)
+def test_sql_query__multiple_tables(request, backend):
+    db = request.getfixturevalue(backend)
+    schema = {
+        "properties": {
+            "id": {"type": "integer", "PrimaryKey": True},
+            "value": {"type": ["string", "null"]},
+        },
+    }
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        db.commit_table("cases", pd.DataFrame({"id": [1, 2], "value": ["a", "b"]}))
+        db.commit_table("labs", pd.DataFrame({"id": [1, 2], "value": ["x", "y"]}))
+        db.commit_table("labs", pd.DataFrame({"id": [2], "value": ["z"]}))  # upsert
+        df = db.sql_query(
+            "SELECT c.id, c.value AS case_value, l.value AS lab_value "
+            "FROM cases c JOIN labs l ON c.id = l.id ORDER BY c.id",
+            "cases",
+        )
+    assert df["case_value"].tolist() == ["a", "b"]
+    assert df["lab_value"].tolist() == ["x", "z"]
+
+
+def test_sql_query__without_duckdb(db_parquet):
+    schema = {
+        "properties": {
+            "id": {"type": "integer", "PrimaryKey": True},
+            "tags": {"type": ["array", "null"], "items": {"type": "string"}},
+        },
+    }
+    with (
+        patch(
+            "InsightBoard.database.database.DatabaseBase.get_table_schema"
+        ) as mock_schema,
+        patch("InsightBoard.database.db_parquet.duckdb", None),
+    ):
+        mock_schema.return_value = schema
+        db_parquet.commit_table("cases", pd.DataFrame({"id": [1], "tags": [["a"]]}))
+        db_parquet.commit_table("labs", pd.DataFrame({"id": [1], "tags": [["x"]]}))
+        # Single-table queries run in SQLite, with arrays as JSON text
+        df = db_parquet.sql_query("SELECT id, tags FROM cases", "cases")
+        assert df.to_dict("records") == [{"id": 1, "tags": '["a"]'}]
+        with pytest.raises(ImportError, match="labs"):
+            db_parquet.sql_query(
+                "SELECT * FROM cases c JOIN labs l ON c.id = l.id", "cases"
+            )
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_parquet",
+        "db_parquet_versioned",
+    ],
+)
+def test_evolve_table(request, backend):
+    db = request.getfixturevalue(backend)
+    table_name = "table1"
+    schema = {
+        "properties": {
+            "col1": {"type": "integer", "PrimaryKey": True},
+            "col2": {"type": "string"},
+            "col3": {"type": "integer"},
+        },
+    }
+    df = pd.DataFrame({"col1": [1, 2], "col2": ["1", "2"], "col3": [3, 4]})
+    file_path = Path(db.data_folder) / f"{table_name}.{db.suffix}"
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        db.commit_table(table_name, df)
+        assert db.diff_table_schema(table_name) == []
+        # Add a field and widen a type: applied on read, without a rewrite
+        mtime = file_path.stat().st_mtime_ns
+        mock_schema.return_value = {
+            "properties": {
+                **schema["properties"],
+                "col3": {"type": "number"},
+                "col4": {"type": ["number", "null"]},
+            },
+        }
+        assert db.diff_table_schema(table_name) == [
+            (SchemaChange.WIDEN_TYPE, "col3", pyarrow.int64(), pyarrow.float64()),
+            (SchemaChange.ADD_COLUMN, "col4", None, pyarrow.float64()),
+        ]
+        df2 = db.read_table(table_name)
+        assert df2["col3"].dtype == "float64"
+        assert df2["col4"].isna().all()
+        assert db.read_table_column(table_name, "col4").isna().all()
+        assert db.evolve_table(table_name)
+        assert file_path.stat().st_mtime_ns == mtime
+        # Changing a type requires the table to be rewritten
+        mock_schema.return_value["properties"]["col2"] = {"type": "integer"}
+        assert db.evolve_table(table_name)[0][0] == SchemaChange.CHANGE_TYPE
+        assert file_path.stat().st_mtime_ns != mtime
+        assert db.read_table(table_name)["col2"].tolist() == [1, 2]
+        # Conversion failures are reported
+        mock_schema.return_value["properties"]["col3"] = {"type": "array"}
+        with pytest.raises(ValueError):
+            db.evolve_table(table_name)
+
+
+def test_write_table_parquet_versioned__commit_info(db_parquet_versioned):
+    db = db_parquet_versioned
+    schema = {
+        "properties": {
+            "col1": {"type": "integer", "PrimaryKey": True},
+            "col2": {"type": "integer"},
+        },
+    }
+    df = pd.DataFrame({"col1": [1, 2], "col2": [3, 4]})
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        db.commit_tables(
+            ["table1"], [df], commit_info={"parser": "adtl", "source": "cases.csv"}
+        )
+        # Failed commits are not recorded
+        with pytest.raises(ValueError):
+            db.commit_table("table1", pd.DataFrame({"col2": [5]}))
+    commit = db.commit_log.get(1)
+    assert commit["table_name"] == "table1"
+    assert commit["parser"] == "adtl"
+    assert commit["source"] == "cases.csv"
+    assert commit["rows_inserted"] == 2
+    assert db.commit_log.read()["commit_id"].tolist() == [1]
+
+
+def test_migrate_row_metadata(db_parquet_versioned):
+    db = db_parquet_versioned
+    schema = {
+        "properties": {
+            "col1": {"type": "integer", "PrimaryKey": True},
+            "col2": {"type": "integer"},
+        },
+    }
+    # Table written by an earlier version, with JSON metadata in every row
+    legacy_df = pd.DataFrame(
+        {
+            "col1": [1, 2, 1],
+            "col2": [3, 4, 5],
+            "_version": [1, 1, 2],
+            "_deleted": [False] * 3,
+            "_metadata": ['{"timestamp": "2022-03-02T04:05:06"}']
+            + ['{"timestamp": "2021-02-01T01:02:03"}']
+            + ['{"timestamp": "2022-03-02T04:05:06"}'],
+        }
+    )
+    file_path = Path(db.data_folder) / f"table1.{db.suffix}"
+    legacy_df.to_parquet(file_path, index=False)
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        assert db.read_table("table1").sort_values("col1")["col2"].tolist() == [5, 4]
+        db.commit_table("table1", pd.DataFrame({"col1": [3], "col2": [6]}))
+        df = pd.read_parquet(file_path)
+        assert "_metadata" not in df.columns
+        assert df["_commit_id"].tolist() == [2, 1, 2, 3]
+        assert db.read_table("table1").sort_values("col1")["col2"].tolist() == [5, 4, 6]
+    log = db.commit_log.read()
+    assert log["timestamp"].tolist()[:2] == [
+        "2021-02-01T01:02:03",
+        "2022-03-02T04:05:06",
+    ]
+    assert log["rows_inserted"].tolist() == [1, 1, 1]
+    assert log["rows_updated"].tolist() == [0, 1, 0]
+
+
+def test_rollback(db_parquet_versioned):
+    db = db_parquet_versioned
+    schema = {
+        "properties": {
+            "col1": {"type": "integer", "PrimaryKey": True},
+            "col2": {"type": "string"},
+        },
+    }
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        db.commit_table("table1", pd.DataFrame({"col1": [1, 2], "col2": ["a", "b"]}))
+        db.commit_table("table1", pd.DataFrame({"col1": [2, 3], "col2": ["c", "d"]}))
+        db.commit_table("table1", pd.DataFrame({"col1": [1], "col2": ["e"]}))
+        # Undo the second commit: restore record 2 and remove record 3
+        rollback_id = db.rollback(2)
+        df = db.read_table("table1").sort_values("col1")
+        assert df["col1"].tolist() == [1, 2]
+        assert df["col2"].tolist() == ["e", "b"]
+        commit = db.commit_log.get(rollback_id)
+        assert (commit["rows_updated"], commit["rows_deleted"]) == (1, 1)
+        # Only the rows touched by the rolled back commit are written
+        versions = pd.read_parquet(f"{db.data_folder}/table1.{db.suffix}")
+        assert (versions["_commit_id"] == rollback_id).sum() == 2
+        # Rollbacks can themselves be undone
+        db.rollback(rollback_id)
+        df = db.read_table("table1").sort_values("col1")
+        assert df["col2"].tolist() == ["e", "c", "d"]
+        with pytest.raises(ValueError):
+            db.rollback(99)
+
+
+def test_write_table_parquet__delta_history(db_parquet_versioned):
+    db = db_parquet_versioned
+    db.set_history_encoding(HistoryEncoding.DELTA)
+    schema = {
+        "properties": {
+            "col1": {"type": "integer", "PrimaryKey": True},
+            "col2": {"type": ["string", "null"]},
+            "col3": {"type": ["integer", "null"]},
+            "col4": {"type": ["array", "null"], "items": {"type": "string"}},
+        },
+    }
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame(
+            {
+                "col1": [1, 2],
+                "col2": ["a", "b"],
+                "col3": [10, 20],
+                "col4": [["x"], ["y"]],
+            }
+        )
+        db.commit_table("table1", df)
+        # Change one field of each record (record 2 has a field cleared to null)
+        df = pd.DataFrame(
+            {
+                "col1": [1, 2],
+                "col2": ["c", None],
+                "col3": [10, 20],
+                "col4": [["x"], ["y"]],
+            }
+        )
+        assert db.commit_table("table1", df)["updated"] == 2
+        df = pd.DataFrame(
+            {
+                "col1": [1, 2],
+                "col2": ["c", None],
+                "col3": [11, 20],
+                "col4": [["x"], ["y"]],
+            }
+        )
+        counts = db.commit_table("table1", df)
+        assert (counts["updated"], counts["unchanged"]) == (1, 1)
+        # Only the changed fields are stored in later versions
+        versions = pd.read_parquet(f"{db.data_folder}/table1.{db.suffix}")
+        updates = versions[versions["_delta"] == True]  # noqa: E712
+        assert updates["col2"].tolist() == ["c", None, None]
+        assert updates["col3"].isna().tolist() == [True, True, False]
+        assert updates["col4"].isna().all()
+        assert [
+            list(nulled) if nulled is not None else None
+            for nulled in updates["_nulled"]
+        ] == [None, ["col2"], None]
+        # The latest state of each record is reconstructed on read
+        df = db.read_table("table1").sort_values("col1")
+        assert df["col2"].tolist() == ["c", None]
+        assert df["col3"].tolist() == [11, 20]
+        assert df["col4"].tolist() == [["x"], ["y"]]
+        assert db.read_table_column("table1", "col3").sort_values().tolist() == [11, 20]
+        # Rollback restores the previous (reconstructed) version
+        db.rollback(3)
+        df = db.read_table("table1").sort_values("col1")
+        assert df["col3"].tolist() == [10, 20]
+        assert df["col2"].tolist() == ["c", None]
+
+
+def test_rollback__not_supported(db_parquet):
+    with pytest.raises(ValueError):
+        db_parquet.rollback(1)
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_parquet",
+        "db_parquet_versioned",
+    ],
+)
+def test_search_table(request, backend):
+    db = request.getfixturevalue(backend)
+    schema = {
+        "properties": {
+            "col1": {"type": "integer", "PrimaryKey": True},
+            "col2": {"type": "string"},
+        },
+    }
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame(
+            {"col1": [1, 2, 3], "col2": ["Red apple", "green apple", "red pear"]}
+        )
+        db.commit_table("table1", df)
+        # Without an index the table is scanned
+        assert db.search_table("table1", "red")["col1"].tolist() == [1, 3]
+        assert not db.search_index_path("table1").exists()
+        # The index is built on first use, then updated on commit
+        db.set_search_index(True)
+        assert db.search_table("table1", "apple")["col1"].tolist() == [1, 2]
+        assert db.search_table("table1", "RED pe*")["col1"].tolist() == [3]
+        db.commit_table("table1", pd.DataFrame({"col1": [2], "col2": ["banana"]}))
+        assert db.search_table("table1", "apple")["col1"].tolist() == [1]
+        assert db.search_table("table1", "banana")["col1"].tolist() == [2]
+        assert db.search_table("table1", "cherry").empty
+        assert db.get_tables_list() == ["table1"]
+
+
+@pytest.mark.parametrize("search_index", [False, True])
+def test_search_table__pyarrow_dtype_backend(db_parquet, search_index):
+    schema = {
+        "properties": {
+            "col1": {"type": "integer", "PrimaryKey": True},
+            "age": {"type": ["integer", "null"]},
+            "col2": {"type": ["string", "null"]},
+        },
+    }
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        db_parquet.set_dtype_backend(DtypeBackend.PYARROW)
+        db_parquet.set_search_index(search_index)
+        df = pd.DataFrame(
+            {"col1": [1, 2], "age": [30, None], "col2": ["Red apple", None]}
+        )
+        db_parquet.commit_table("table1", df)
+        assert db_parquet.search_table("table1", "apple")["col1"].tolist() == [1]
+        assert db_parquet.search_table("table1", "30")["col1"].tolist() == [1]
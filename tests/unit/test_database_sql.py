@@ -0,0 +1,464 @@
+"""Unit tests for the SQLite and DuckDB database backends."""
+
+import pytest
+import pandas as pd
+
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from InsightBoard.database import (
+    Database,
+    DatabaseBackend,
+    DtypeBackend,
+    SchemaChange,
+    WritePolicy,
+)
+
+
+@pytest.fixture
+def db_sqlite():
+    with TemporaryDirectory() as temp_dir:
+        yield Database(DatabaseBackend.SQLITE, temp_dir)
+
+
+@pytest.fixture
+def db_duckdb():
+    with TemporaryDirectory() as temp_dir:
+        yield Database(DatabaseBackend.DUCKDB, temp_dir)
+
+
+@pytest.fixture
+def db_sqlite_versioned():
+    with TemporaryDirectory() as temp_dir:
+        yield Database(DatabaseBackend.SQLITE_VERSIONED, temp_dir)
+
+
+@pytest.fixture
+def db_duckdb_versioned():
+    with TemporaryDirectory() as temp_dir:
+        yield Database(DatabaseBackend.DUCKDB_VERSIONED, temp_dir)
+
+
+schema = {
+    "properties": {
+        "col1": {"type": "integer", "PrimaryKey": True},
+        "col2": {"type": ["string", "null"]},
+        "col3": {"type": ["array", "null"], "items": {"type": "string"}},
+    },
+}
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_sqlite",
+        "db_duckdb",
+        "db_sqlite_versioned",
+        "db_duckdb_versioned",
+    ],
+)
+def test_commit_table__upsert(request, backend):
+    db = request.getfixturevalue(backend)
+    db.set_write_policy(WritePolicy.UPSERT)
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame(
+            {"col1": [1, 2], "col2": ["a", "b"], "col3": [["x", "y"], None]}
+        )
+        db.commit_table("table1", df)
+        df = pd.DataFrame({"col1": [2, 3], "col2": ["c", "d"], "col3": [["z"], []]})
+        db.commit_table("table1", df)
+        df2 = db.read_table("table1").sort_values("col1")
+    assert df2["col1"].tolist() == [1, 2, 3]
+    assert df2["col2"].tolist() == ["a", "c", "d"]
+    assert df2["col3"].tolist() == [["x", "y"], ["z"], []]
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_sqlite",
+        "db_duckdb",
+        "db_sqlite_versioned",
+        "db_duckdb_versioned",
+    ],
+)
+def test_commit_table__append(request, backend):
+    db = request.getfixturevalue(backend)
+    db.set_write_policy(WritePolicy.APPEND)
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame({"col1": [1, 2], "col2": ["a", "b"], "col3": [["x"], None]})
+        db.commit_table("table1", df)
+        df = pd.DataFrame({"col1": [2, 3], "col2": ["c", "d"], "col3": [None, None]})
+        db.commit_table("table1", df)
+        df2 = db.read_table("table1").sort_values("col1")
+    assert df2["col1"].tolist() == [1, 2, 3]
+    assert df2["col2"].tolist() == ["a", "b", "d"]
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_sqlite",
+        "db_duckdb",
+        "db_sqlite_versioned",
+        "db_duckdb_versioned",
+    ],
+)
+def test_commit_table__unchanged_rows(request, backend):
+    db = request.getfixturevalue(backend)
+    db.set_write_policy(WritePolicy.UPSERT)
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame({"col1": [1, 2], "col2": ["a", "b"], "col3": [["x"], None]})
+        assert db.commit_table("table1", df) == {
+            "inserted": 2,
+            "updated": 0,
+            "unchanged": 0,
+        }
+        df = pd.DataFrame(
+            {"col1": [1, 2, 3], "col2": ["a", "c", "d"], "col3": [["x"], None, None]}
+        )
+        with patch.object(db, "backup") as mock_backup:
+            assert db.commit_table("table1", df) == {
+                "inserted": 1,
+                "updated": 1,
+                "unchanged": 1,
+            }
+            # Nothing is written (or backed up) when every row is unchanged
+            assert db.commit_table("table1", df)["unchanged"] == 3
+            assert mock_backup.call_count == 1
+        assert db.commit_log.get(3)["rows_unchanged"] == 3
+        assert db.get_tables_list() == ["table1"]
+        # Rolled back rows are written again
+        db.rollback(2)
+        assert db.commit_table("table1", df) == {
+            "inserted": 1,
+            "updated": 1,
+            "unchanged": 1,
+        }
+        df2 = db.read_table("table1").sort_values("col1")
+    assert df2["col2"].tolist() == ["a", "c", "d"]
+
+
+@pytest.mark.parametrize(
+    "backend, query",
+    [
+        (
+            "db_sqlite",
+            "SELECT COUNT(*) AS n FROM table1, json_each(table1.col3) "
+            "WHERE json_each.value = 'x'",
+        ),
+        (
+            "db_duckdb",
+            "SELECT COUNT(*) AS n FROM table1 WHERE list_contains(col3, 'x')",
+        ),
+    ],
+)
+def test_sql_query__array_membership(request, backend, query):
+    db = request.getfixturevalue(backend)
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame(
+            {
+                "col1": [1, 2, 3],
+                "col2": ["a", "b", "c"],
+                "col3": [["x", "y"], ["y"], "[x, z]"],
+            }
+        )
+        db.commit_table("table1", df)
+        df2 = db.sql_query(query, "table1")
+    assert df2["n"].iloc[0] == 2
+
+
+def test_read_table__legacy_array_text(db_sqlite):
+    # Arrays were stored as display text (e.g. '[c, d]') before they were JSON
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame({"col1": [1, 2], "col2": ["a", "b"], "col3": [["x"], None]})
+        db_sqlite.commit_table("table1", df)
+        conn = db_sqlite.connect()
+        conn.execute("UPDATE table1 SET col3 = '[c, d]' WHERE col1 = 2")
+        conn.commit()
+        conn.close()
+        df2 = db_sqlite.read_table("table1").sort_values("col1")
+    assert df2["col3"].tolist() == [["x"], ["c", "d"]]
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_sqlite",
+        "db_duckdb",
+        "db_sqlite_versioned",
+        "db_duckdb_versioned",
+    ],
+)
+def test_read_table__pyarrow_dtype_backend(request, backend):
+    db = request.getfixturevalue(backend)
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame({"col1": [1, 2], "col2": ["a", None], "col3": [["x"], None]})
+        db.commit_table("table1", df)
+        db.set_dtype_backend(DtypeBackend.PYARROW)
+        df2 = db.read_table("table1").sort_values("col1")
+        df3 = db.sql_query("SELECT col2 FROM table1", "table1")
+    assert isinstance(df2["col1"].dtype, pd.ArrowDtype)
+    assert isinstance(df2["col2"].dtype, pd.ArrowDtype)
+    assert isinstance(df3["col2"].dtype, pd.ArrowDtype)
+    assert df2["col3"].tolist()[0] == ["x"]
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_sqlite",
+        "db_duckdb",
+    ],
+)
+def test_commit_table__secondary_indexes(request, backend):
+    db = request.getfixturevalue(backend)
+    indexed_schema = {
+        "properties": {
+            **schema["properties"],
+            "col2": {"type": ["string", "null"], "Index": True},
+            "col3": {"type": ["array", "null"], "Index": True},
+        },
+    }
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = indexed_schema
+        df = pd.DataFrame({"col1": [1, 2], "col2": ["a", "b"], "col3": [["x"], None]})
+        db.commit_table("table1", df)
+        db.commit_table("table1", df)  # Index creation is idempotent
+        assert db.get_tables_list() == ["table1"]
+    conn = db.connect()
+    if backend == "db_sqlite":
+        query = (
+            "SELECT name FROM sqlite_master "
+            "WHERE type='index' AND sql NOT NULL AND tbl_name='table1'"
+        )
+    else:
+        query = "SELECT index_name FROM duckdb_indexes() WHERE table_name='table1'"
+    indexes = [row[0] for row in conn.execute(query).fetchall()]
+    conn.close()
+    assert indexes == ["idx_table1_col2"]
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_sqlite",
+        "db_duckdb",
+        "db_sqlite_versioned",
+        "db_duckdb_versioned",
+    ],
+)
+def test_analytics_query__multiple_tables(request, backend):
+    db = request.getfixturevalue(backend)
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame({"col1": [1, 2], "col2": ["a", "b"], "col3": [["x"], None]})
+        db.commit_table("table1", df)
+        df = pd.DataFrame({"col1": [2, 3], "col2": ["c", "d"], "col3": [["y"], None]})
+        db.commit_table("table2", df)
+        df2 = db.analytics_query(
+            "SELECT t1.col2 AS a, t2.col2 AS b, t1.col3 AS c FROM table1 t1 "
+            "JOIN table2 t2 ON t1.col1 = t2.col1 "
+            "UNION ALL SELECT col2, NULL, col3 FROM table1 "
+            "WHERE list_contains(col3, 'x') ORDER BY a DESC"
+        )
+    assert df2["a"].tolist() == ["b", "a"]
+    assert df2["b"].tolist() == ["c", None]
+    assert df2["c"].tolist() == [None, ["x"]]
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_sqlite",
+        "db_duckdb",
+        "db_sqlite_versioned",
+        "db_duckdb_versioned",
+    ],
+)
+def test_evolve_table(request, backend):
+    db = request.getfixturevalue(backend)
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame({"col1": [1, 2], "col2": ["1", "2"], "col3": [None, None]})
+        db.commit_table("table1", df)
+        assert db.diff_table_schema("table1") == []
+        # New fields are added on the next commit
+        evolved_schema = {
+            "properties": {
+                **schema["properties"],
+                "col4": {"type": ["number", "null"]},
+            },
+        }
+        mock_schema.return_value = evolved_schema
+        assert [change[:2] for change in db.diff_table_schema("table1")] == [
+            (SchemaChange.ADD_COLUMN, "col4")
+        ]
+        db.commit_table("table1", pd.DataFrame({"col1": [3], "col4": [1.5]}))
+        assert db.diff_table_schema("table1") == []
+        df2 = db.read_table("table1").sort_values("col1")
+        assert df2["col4"].tolist()[2] == 1.5
+        assert df2["col4"].isna().tolist()[:2] == [True, True]
+        # Type changes are applied on request
+        evolved_schema["properties"]["col2"] = {"type": ["integer", "null"]}
+        assert db.evolve_table("table1")[0][:2] == (SchemaChange.CHANGE_TYPE, "col2")
+        assert db.diff_table_schema("table1") == []
+        df2 = db.read_table("table1").sort_values("col1")
+    assert df2["col2"].tolist()[:2] == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_sqlite",
+        "db_duckdb",
+        "db_sqlite_versioned",
+        "db_duckdb_versioned",
+    ],
+)
+def test_rollback(request, backend):
+    db = request.getfixturevalue(backend)
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame({"col1": [1, 2], "col2": ["a", "b"], "col3": [["x"], None]})
+        db.commit_table("table1", df)
+        df = pd.DataFrame({"col1": [2, 3], "col2": ["c", "d"], "col3": [["y"], None]})
+        db.commit_table("table1", df)
+        db.commit_table("table1", pd.DataFrame({"col1": [1], "col2": ["e"]}))
+        assert db.get_tables_list() == ["table1"]
+        commit = db.commit_log.get(2)
+        assert (commit["rows_inserted"], commit["rows_updated"]) == (1, 1)
+        # Undo the second commit: restore row 2 and remove row 3
+        rollback_id = db.rollback(2)
+        df2 = db.read_table("table1").sort_values("col1")
+        assert df2["col1"].tolist() == [1, 2]
+        assert df2["col2"].tolist() == ["e", "b"]
+        assert df2["col3"].tolist() == [["x"], None]
+        commit = db.commit_log.get(rollback_id)
+        assert (commit["rows_updated"], commit["rows_deleted"]) == (1, 1)
+        # Rollbacks can themselves be undone
+        db.rollback(rollback_id)
+        df2 = db.read_table("table1").sort_values("col1")
+    assert df2["col2"].tolist() == ["e", "c", "d"]
+    assert df2["col3"].tolist() == [["x"], ["y"], None]
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_sqlite",
+        "db_duckdb",
+        "db_sqlite_versioned",
+        "db_duckdb_versioned",
+    ],
+)
+def test_search_table(request, backend):
+    db = request.getfixturevalue(backend)
+    db.set_search_index(True)
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame(
+            {
+                "col1": [1, 2, 3],
+                "col2": ["Red apple", "green apple", "red pear"],
+                "col3": [["fruit"], None, ["fruit", "ripe"]],
+            }
+        )
+        db.commit_table("table1", df)
+        assert db.get_tables_list() == ["table1"]
+        assert db.search_table("table1", "apple")["col1"].tolist() == [1, 2]
+        assert db.search_table("table1", "red FRUIT")["col1"].tolist() == [1, 3]
+        assert db.search_table("table1", "ri*")["col3"].tolist() == [["fruit", "ripe"]]
+        assert db.search_table("table1", "banana").empty
+        # The index is maintained on commit and rollback
+        db.commit_table("table1", pd.DataFrame({"col1": [2], "col2": ["banana"]}))
+        assert db.search_table("table1", "apple")["col1"].tolist() == [1]
+        assert db.search_table("table1", "banana")["col1"].tolist() == [2]
+        db.rollback(2)
+        assert db.search_table("table1", "apple")["col1"].tolist() == [1, 2]
+        assert db.search_table("table1", "banana").empty
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "db_sqlite_versioned",
+        "db_duckdb_versioned",
+    ],
+)
+def test_commit_table__versioned_history(request, backend):
+    db = request.getfixturevalue(backend)
+    with patch(
+        "InsightBoard.database.database.DatabaseBase.get_table_schema"
+    ) as mock_schema:
+        mock_schema.return_value = schema
+        df = pd.DataFrame({"col1": [1, 2], "col2": ["a", "b"], "col3": [["x"], None]})
+        db.commit_table("table1", df)
+        df = pd.DataFrame({"col1": [2, 3], "col2": ["c", "d"], "col3": [["y"], None]})
+        db.commit_table("table1", df)
+        db.rollback(2)
+        assert db.read_table("table1").sort_values("col1")["col2"].tolist() == [
+            "a",
+            "b",
+        ]
+    conn = db.connect()
+    versions = conn.execute(
+        "SELECT col1, col2, _valid_from, _valid_to, _deleted FROM _versions_table1 "
+        "ORDER BY col1, _valid_from"
+    ).fetchall()
+    conn.close()
+    # Each version is valid from the commit that wrote it until it was replaced
+    assert versions == [
+        (1, "a", 1, None, 0),
+        (2, "b", 1, 2, 0),
+        (2, "c", 2, 3, 0),
+        (2, "b", 3, None, 0),
+        (3, "d", 2, 3, 0),
+        (3, "d", 3, None, 1),
+    ]
+
+
+def test_sqlite_pragmas(db_sqlite):
+    conn = db_sqlite.connect()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    conn.close()
+    db_sqlite.set_backend_options({"cache_size": -1000})
+    conn = db_sqlite.connect()
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -1000
+    conn.close()
+
+
+def test_sqlite_pragmas__invalid(db_sqlite):
+    with pytest.raises(ValueError):
+        db_sqlite.set_backend_options({"not_a_pragma": 1})
+    with pytest.raises(ValueError):
+        db_sqlite.set_backend_options({"journal_mode": "WAL; DROP TABLE x"})
@@ -1,6 +1,9 @@
+import csv
 import importlib
+import io
 from unittest import mock
 import pytest
+import numpy as np
 import pandas as pd
 from unittest.mock import patch
 
@@ -8,6 +11,7 @@ from InsightBoard.parsers import (
     adtl_check_command,
     adtl_check_parser,
     adtl,
+    adtl_rows,
     parse_adtl,
 )
 
@@ -116,3 +120,50 @@ def test_parse_adtl__list():
     assert db1["data"]["name"].equals(df["name"])
     assert db2["table"] == "table2"
     assert db2["data"]["name"].equals(df["name"])
+
+
+class mock_adtl_parser__rows:
+    class Parser:
+        empty_fields = "N/A"
+
+        def __init__(self, *args, **kwargs):
+            self.fieldnames = {"table1": ["name", "age"]}
+
+        def parse_rows(self, rows, file_name, row_count=None):
+            self.data = {
+                "table1": [
+                    {"adtl_valid": True, "name": row["name"] or None, "age": 30}
+                    for row in rows
+                ]
+            }
+            return self
+
+        def read_table(self, table):
+            yield from self.data[table]
+
+
+@patch("InsightBoard.parsers.adtl_parser", mock_adtl_parser__rows)
+def test_parse_adtl__in_memory():
+    df = pd.DataFrame({"name": ["test1", "N/A", None]})
+    dbs = parse_adtl(df, "some_file.json", "table1")
+    data = dbs[0]["data"]
+    assert list(data.columns) == ["name", "age"]
+    assert data["name"][0] == "test1"
+    assert data["name"][1:].isna().all()  # 'N/A' is an empty field
+    assert data["age"].dtype == np.int64
+
+
+def test_adtl_rows__matches_csv():
+    df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-01-01", None]),
+            "float": [0.1 + 0.2, np.nan],
+            "int": [1, 2],
+            "bool": [True, False],
+            "object": ['a,"b"', None],
+            "arrow": pd.array([1, None], dtype="int64[pyarrow]"),
+            1: ["x", "y"],
+        }
+    )
+    rows = list(csv.DictReader(io.StringIO(df.to_csv(index=False))))
+    assert adtl_rows(df) == rows
@@ -4,6 +4,7 @@ from pathlib import Path
 from tempfile import TemporaryDirectory
 from unittest import mock
 from unittest.mock import patch
+from InsightBoard.database import DtypeBackend
 from InsightBoard.project.project import (
     get_projects_folder,
     get_default_project,
@@ -95,6 +96,18 @@ def test_Project___init__(project):
     assert project.get_schemas_folder() == "/projects/project_name/schemas"
 
 
+def test_Project_get_db_dtype_backend(project):
+    assert project.get_db_dtype_backend() == DtypeBackend.NUMPY
+    assert project.database.dtype_backend == DtypeBackend.NUMPY
+    with patch.object(project, "save_config") as mock_save_config:
+        project.set_db_dtype_backend(DtypeBackend.PYARROW)
+        mock_save_config.assert_called_once()
+    assert project.get_db_dtype_backend() == DtypeBackend.PYARROW
+    assert project.database.dtype_backend == DtypeBackend.PYARROW
+    with pytest.raises(ValueError):
+        project.set_db_dtype_backend("pyarrow")
+
+
 def test_Project_get_schema(project):
     mock_json_data = {"name": "Test Schema", "version": 1}
     with mock.patch(
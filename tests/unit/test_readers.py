@@ -0,0 +1,112 @@
+"""Unit tests for the file readers."""
+
+import io
+import gzip
+import pytest
+import pandas as pd
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from InsightBoard import readers
+
+CSV = (
+    b"id,age,name,onset,flag,score,empty\n"
+    b"1,25,Alice,2024-01-01,True,1.5,\n"
+    b"2,,Bob,2024-02-01,false,NA,\n"
+    b"3,40,,12:00,TRUE,2.25,\n"
+)
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        {
+            "id": [1, 2, 3],
+            "age": [25.0, None, 40.0],
+            "name": ["Alice", float("nan"), "Carol"],
+            "flag": [True, False, True],
+        }
+    )
+
+
+def test_file_extension():
+    assert readers.file_extension("data.CSV") == "csv"
+    assert readers.file_extension("data.2024.csv.gz") == "csv.gz"
+    assert readers.file_extension("data") == ""
+    assert readers.is_supported("data.parquet")
+    assert not readers.is_supported("data.txt")
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        CSV,
+        b"id,x\n12345678901234567890123,1\n2,\n",  # integers beyond uint64
+        b"id,x\n18446744073709551615,1\n2,\n",  # integers beyond int64
+    ],
+)
+@pytest.mark.parametrize("dtype_backend", [None, "pyarrow"])
+def test_read_csv__matches_pandas(data, dtype_backend):
+    kwargs = {"dtype_backend": dtype_backend} if dtype_backend else {}
+    expected = pd.read_csv(io.BytesIO(data), **kwargs)
+    df = readers.read_file(io.BytesIO(data), "data.csv", dtype_backend)
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_read_csv__gzip():
+    expected = pd.read_csv(io.BytesIO(CSV))
+    df = readers.read_file(io.BytesIO(gzip.compress(CSV)), "data.csv.gz")
+    pd.testing.assert_frame_equal(df, expected)
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "data.csv.gz"
+        path.write_bytes(gzip.compress(CSV))
+        pd.testing.assert_frame_equal(readers.read_file(path, path.name), expected)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"a,a,\n1,2,3\n",  # duplicate and empty column names
+        b"a\n" + b"1\n" * 100_000 + b"x\n",  # type changes after the first block
+    ],
+)
+def test_read_csv__pandas_fallback(data):
+    pd.testing.assert_frame_equal(
+        readers.read_file(io.BytesIO(data), "data.csv"), pd.read_csv(io.BytesIO(data))
+    )
+
+
+def test_read_columnar(df):
+    with TemporaryDirectory() as temp_dir:
+        for filename, write in [
+            ("data.parquet", df.to_parquet),
+            ("data.arrow", df.to_feather),
+            ("data.jsonl", lambda p: df.to_json(p, orient="records", lines=True)),
+        ]:
+            path = Path(temp_dir) / filename
+            write(path)
+            pd.testing.assert_frame_equal(readers.read_file(path, filename), df)
+            with open(path, "rb") as f:
+                source = io.BytesIO(f.read())
+            pd.testing.assert_frame_equal(readers.read_file(source, filename), df)
+
+
+def test_read_excel_sheets(df):
+    source = io.BytesIO()
+    with pd.ExcelWriter(source) as writer:
+        df.to_excel(writer, sheet_name="cases", index=False)
+        df.iloc[:1].to_excel(writer, sheet_name="other", index=False)
+    sheets = readers.read_excel_sheets(io.BytesIO(source.getvalue()))
+    expected = pd.read_excel(io.BytesIO(source.getvalue()), sheet_name=None)
+    assert list(sheets) == ["cases", "other"]
+    for sheet_name, sheet in sheets.items():
+        pd.testing.assert_frame_equal(sheet, expected[sheet_name])
+    pd.testing.assert_frame_equal(
+        readers.read_file(io.BytesIO(source.getvalue()), "data.xlsx"), df
+    )
+
+
+def test_read_file__unsupported():
+    with pytest.raises(readers.UnsupportedFileType):
+        readers.read_file(io.BytesIO(b""), "data.txt")
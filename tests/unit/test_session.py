@@ -0,0 +1,79 @@
+"""Unit tests for the server-side upload session store."""
+
+import pytest
+import pandas as pd
+
+from tempfile import TemporaryDirectory
+
+from InsightBoard.session import UploadSessions, value_nbytes
+
+
+@pytest.fixture
+def sessions():
+    sessions = UploadSessions()
+    sessions.configure(max_memory_mb=1024)
+    yield sessions
+    sessions.configure(max_memory_mb=1024)
+
+
+@pytest.fixture
+def dataset():
+    return [pd.DataFrame({"x": ["a" * 10] * 100, "y": [[1, 2]] * 100}, dtype=object)]
+
+
+def test_value_nbytes(dataset):
+    assert value_nbytes(dataset) == value_nbytes(dataset[0]) > 0
+    assert value_nbytes([[], ["error"]]) > 0
+
+
+def test_UploadSessions__put_get_delete(sessions, dataset):
+    sid = sessions.new_session()
+    assert sessions.get(sid, "parsed") is None
+    assert sessions.get(None, "parsed", []) == []
+    sessions.put(sid, "parsed", dataset)
+    sessions.put(sid, "errors", [[], []])
+    assert sessions.get(sid, "parsed") is dataset
+    sessions.delete(sid)
+    assert sessions.get(sid, "parsed") is None
+    assert sessions.get(sid, "errors") is None
+
+
+def test_UploadSessions__lru_eviction_and_spill(sessions, dataset):
+    size = value_nbytes(dataset)
+    sid = sessions.new_session()
+    with TemporaryDirectory() as spill_folder:
+        sessions.configure(max_memory_mb=2.5 * size / 2**20, spill_folder=spill_folder)
+        for key in ["a", "b", "c"]:
+            sessions.put(sid, key, dataset)
+        assert [k for s, k in sessions.entries if s == sid] == ["b", "c"]
+        # 'a' is restored from the spill (and 'b' evicted in its place)
+        assert sessions.get(sid, "a")[0].equals(dataset[0])
+        assert [k for s, k in sessions.entries if s == sid] == ["c", "a"]
+        sessions.delete(sid)
+        assert sessions.get(sid, "b") is None
+        sessions.configure(max_memory_mb=1024)  # Disable spill before folder is removed
+
+
+def test_UploadSessions__default_spill_folder(dataset, monkeypatch):
+    # Unless configured, evicted values are spilled to a temporary folder
+    monkeypatch.setattr(UploadSessions, "_instance", None)
+    default_sessions = UploadSessions()
+    assert default_sessions.spill_folder.is_dir()
+    sid = default_sessions.new_session()
+    default_sessions.configure(
+        max_memory_mb=value_nbytes(dataset) / 2**20,
+        spill_folder=default_sessions.spill_folder,
+    )
+    default_sessions.put(sid, "a", dataset)
+    default_sessions.put(sid, "b", dataset)
+    assert default_sessions.get(sid, "a")[0].equals(dataset[0])
+    default_sessions.delete(sid)
+
+
+def test_UploadSessions__eviction_without_spill(sessions, dataset):
+    sid = sessions.new_session()
+    sessions.configure(max_memory_mb=value_nbytes(dataset) / 2**20)
+    sessions.put(sid, "a", dataset)
+    sessions.put(sid, "b", dataset)
+    assert sessions.get(sid, "a") is None  # discarded
+    assert sessions.get(sid, "b") is dataset  # most recent value is always kept
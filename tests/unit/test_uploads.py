@@ -0,0 +1,118 @@
+"""Unit tests for chunked (resumable) file uploads."""
+
+import io
+import threading
+import pytest
+import pandas as pd
+
+from flask import Flask
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from InsightBoard.uploads import ChunkedUploads, UploadError, register_upload_routes
+
+
+@pytest.fixture
+def uploads():
+    with TemporaryDirectory() as temp_dir:
+        yield ChunkedUploads(Path(temp_dir) / "uploads")
+
+
+def test_ChunkedUploads(uploads):
+    data = b"col1,col2\n1,a\n2,b\n"
+    upload_id = uploads.create("../data.csv", len(data))
+    assert uploads.status(upload_id)["filename"] == "data.csv"
+    assert uploads.append(upload_id, 0, io.BytesIO(data[:7])) == 7
+    with pytest.raises(UploadError):
+        uploads.path(upload_id)  # incomplete
+    # Chunks must be appended at the current offset (from which uploads resume)
+    with pytest.raises(UploadError) as e:
+        uploads.append(upload_id, 0, io.BytesIO(data[:7]))
+    assert e.value.status == 409
+    assert uploads.append(upload_id, 7, io.BytesIO(data[7:])) == len(data)
+    assert uploads.status(upload_id)["complete"]
+    assert uploads.path(upload_id).read_bytes() == data
+    uploads.delete(upload_id)
+    with pytest.raises(UploadError):
+        uploads.status(upload_id)
+
+
+def test_ChunkedUploads__size_and_ids(uploads):
+    upload_id = uploads.create("data.csv", 4)
+    with pytest.raises(UploadError):
+        uploads.append(upload_id, 0, io.BytesIO(b"12345"))
+    assert uploads.status(upload_id)["offset"] == 0
+    with pytest.raises(UploadError):
+        uploads.status("../../config")
+
+
+def test_ChunkedUploads__concurrent_appends(uploads):
+    data = b"col1\n1\n"
+    upload_id = uploads.create("data.csv", len(data))
+    reading = threading.Event()
+    release = threading.Event()
+
+    class SlowStream(io.BytesIO):
+        def read(self, *args):
+            reading.set()
+            release.wait(timeout=10)
+            return super().read(*args)
+
+    # A second append at the same offset waits for the first, then fails
+    first = threading.Thread(
+        target=uploads.append, args=(upload_id, 0, SlowStream(data))
+    )
+    first.start()
+    reading.wait(timeout=10)
+    errors = []
+
+    def append_again():
+        try:
+            uploads.append(upload_id, 0, io.BytesIO(data))
+        except UploadError as e:
+            errors.append(e)
+
+    second = threading.Thread(target=append_again)
+    second.start()
+    release.set()
+    first.join(timeout=10)
+    second.join(timeout=10)
+    assert [e.status for e in errors] == [409]
+    assert uploads.path(upload_id).read_bytes() == data
+    with pytest.raises(UploadError):
+        uploads.delete("../config")
+
+
+def test_ChunkedUploads__purge(uploads):
+    upload_id = uploads.create("data.csv", 4)
+    uploads.purge(max_age=-1)
+    with pytest.raises(UploadError):
+        uploads.status(upload_id)
+
+
+def test_register_upload_routes(uploads):
+    server = Flask(__name__)
+    register_upload_routes(server)
+    client = server.test_client()
+    data = b"col1\n1\n2\n"
+    with (
+        patch("InsightBoard.uploads.get_projects_list", return_value=["project"]),
+        patch("InsightBoard.uploads.get_project") as mock_get_project,
+    ):
+        mock_get_project.return_value.get_uploads_folder.return_value = uploads.folder
+        response = client.post(
+            "/_uploads/project", json={"filename": "data.csv", "size": len(data)}
+        )
+        assert response.status_code == 201
+        url = f"/_uploads/project/{response.json['upload_id']}"
+        response = client.patch(url, data=data[:4], headers={"Upload-Offset": "0"})
+        assert response.json["offset"] == 4
+        response = client.patch(url, data=data[4:], headers={"Upload-Offset": "0"})
+        assert response.status_code == 409
+        assert client.get(url).json["offset"] == 4  # resume from here
+        response = client.patch(url, data=data[4:], headers={"Upload-Offset": "4"})
+        assert response.json["complete"]
+        assert client.post("/_uploads/other", json={}).status_code == 404
+    path = uploads.path(response.json["upload_id"])
+    assert pd.read_csv(path)["col1"].tolist() == [1, 2]
@@ -3,6 +3,7 @@ import inspect
 import pytest
 import pandas as pd
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import mock
 from unittest.mock import patch
 from InsightBoard.utils import (
@@ -76,6 +77,19 @@ def test_load_module__path():
     assert module.__name__ == "inspect"
 
 
+def test_load_module__cached():
+    with TemporaryDirectory() as temp_dir:
+        module_path = Path(temp_dir) / "parser.py"
+        module_path.write_text("VALUE = 1\n")
+        module = load_module("parser", module_path)
+        assert load_module("parser", str(module_path)) is module
+        # Modules are reloaded when their file changes
+        module_path.write_text("VALUE = 22\n")
+        reloaded = load_module("parser", module_path)
+        assert reloaded is not module
+        assert reloaded.VALUE == 22
+
+
 def test_load_module_fail():
     with pytest.raises(Exception):
         load_module("nonexistent_module")
@@ -0,0 +1,255 @@
+"""Unit tests for the compiled (column-wise) JSON schema validator."""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from jsonschema import Draft7Validator, FormatChecker
+
+from InsightBoard.validation import CompiledSchema, ValidationExecutor
+from InsightBoard.validation.coercion import clean_frame, clean_value, coerce_column
+from InsightBoard.validation.executor import get_pool, pack_chunk, unpack_chunk
+from InsightBoard.validation.incremental import (
+    patch_rows,
+    rows_to_validate,
+    validation_state,
+)
+
+schema = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer", "PrimaryKey": True},
+        "age": {"type": ["integer", "null"], "minimum": 0, "exclusiveMaximum": 120},
+        "sex": {"type": "string", "enum": ["male", "female", None]},
+        "city": {"type": "string", "pattern": "^[A-Z]"},
+        "onset": {"type": ["string", "null"], "format": "date"},
+        "symptoms": {"type": ["array", "null"], "items": {"type": "string"}},
+    },
+    "required": ["id", "age", "country"],
+    "additionalProperties": False,
+}
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame(
+        {
+            "id": [1, 2, 3, 4],
+            "age": [25, -1, 3.5, None],
+            "sex": ["male", "other", None, 1],
+            "city": ["London", "paris", 3, None],
+            "onset": ["2020-01-01", "2020-13-01", "soon", None],
+            "symptoms": [["fever"], ["cough", 1], [], "fever"],
+            "notes": ["a", "b", "c", "d"],
+        }
+    )
+
+
+def jsonschema_errors(df, schema, format_checker=None):
+    validator = Draft7Validator(schema, format_checker=format_checker)
+    rows = df.astype(object).where(df.notna(), None).to_dict("records")
+    return [
+        [(list(e.path), e.validator, e.message) for e in validator.iter_errors(row)]
+        for row in rows
+    ]
+
+
+def compiled_errors(df, schema, check_formats=False):
+    return [
+        [(list(e.path), e.validator, e.message) for e in row]
+        for row in CompiledSchema(schema, check_formats).validate(df)
+    ]
+
+
+@pytest.mark.parametrize(
+    "columns",
+    [
+        {},
+        # Array fields that are blank in every row (float NaN), or only numbers
+        {"symptoms": [np.nan] * 4},
+        {"symptoms": [1, 2, 3, 4]},
+        # Boolean columns with missing values
+        {"sex": pd.array([True, None, False, None], dtype="boolean")},
+        {"sex": [True, None, False, None]},
+    ],
+)
+def test_compiled_schema__matches_jsonschema(data, columns):
+    data = data.assign(**columns)
+    assert compiled_errors(data, schema) == jsonschema_errors(data, schema)
+
+
+def test_compiled_schema__formats(data):
+    errors = compiled_errors(data, schema, check_formats=True)
+    assert errors == jsonschema_errors(data, schema, FormatChecker())
+    assert ["onset"] not in [path for path, *_ in errors[0]]
+    assert (["onset"], "format", "'2020-13-01' is not a 'date'") in errors[1]
+
+
+def test_compiled_schema__no_errors():
+    df = pd.DataFrame({"id": [1, 2], "age": [20.0, None]})
+    errors = CompiledSchema({"properties": schema["properties"]}).validate(df)
+    assert errors == [[], []]
+
+
+def test_compiled_schema__fallback(data):
+    # Keywords that are not compiled are validated by jsonschema
+    fallback_schema = {
+        **schema,
+        "properties": {
+            **schema["properties"],
+            "notes": {"$ref": "#/definitions/note"},
+        },
+        "definitions": {"note": {"type": "string", "maxLength": 0}},
+    }
+    compiled = CompiledSchema(fallback_schema)
+    assert "notes" not in compiled.properties
+    assert compiled.fallback is not None
+    errors = compiled.validate(data)
+    assert sorted((list(e.path), e.message) for e in errors[0]) == sorted(
+        (list(e.path), e.message)
+        for e in Draft7Validator(fallback_schema).iter_errors(
+            data.astype(object).iloc[0].to_dict()
+        )
+    )
+    assert ["notes"] in [list(e.path) for e in errors[0]]
+
+
+def test_pack_chunk(data):
+    chunk = pack_chunk(data.iloc[1:3])
+    columns, buffer, other = chunk
+    # Only columns that Arrow represents exactly are sent as Arrow
+    assert list(other.columns) == ["city", "symptoms"]
+    df = unpack_chunk(chunk)
+    assert list(df.columns) == list(data.columns)
+    assert df.to_dict("records") == data.iloc[1:3].to_dict("records")
+
+
+def test_validation_executor(data):
+    df = pd.concat([data] * 5, ignore_index=True)
+    expected = compiled_errors(df, schema)
+    executor = ValidationExecutor(schema, workers=2, chunk_size=3)
+    errors = [
+        [(list(e.path), e.validator, e.message) for e in row]
+        for row in executor.validate(df)
+    ]
+    assert errors == expected
+    # The pool is kept, and shared with executors of the same schema
+    pool = get_pool(schema, False, 2)
+    assert ValidationExecutor(schema, workers=2, chunk_size=3).validate(df)
+    assert get_pool(schema, False, 2) is pool
+    assert get_pool(schema, True, 2) is not pool
+
+
+def test_validation_executor__invalid_workers():
+    with pytest.raises(ValueError):
+        ValidationExecutor(schema, workers=0)
+
+
+def test_rows_to_validate(data):
+    state = validation_state(data, ["table1"])
+    assert rows_to_validate(state, None) is None
+    assert rows_to_validate(state, state) == []
+    # Only edited rows are re-validated (values of a different type are edits)
+    edited = data.copy()
+    edited.loc[2, "city"] = "3"
+    edited.at[3, "symptoms"] = ["cough"]
+    assert rows_to_validate(validation_state(edited, ["table1"]), state) == [2, 3]
+    # Every row is validated for a different key, or a different number of rows
+    assert rows_to_validate(validation_state(data, ["table2"]), state) is None
+    assert rows_to_validate(validation_state(data.iloc[:2], ["table1"]), state) is None
+
+
+def test_patch_rows(data):
+    errors = compiled_errors(data, schema)
+    edited = data.copy()
+    edited.loc[1, ["age", "sex", "city", "onset"]] = [30, "male", "Paris", None]
+    rows = rows_to_validate(
+        validation_state(edited, ["table1"]), validation_state(data, ["table1"])
+    )
+    patched = patch_rows(errors, rows, compiled_errors(edited.iloc[rows], schema))
+    assert patched == compiled_errors(edited, schema)
+    assert errors == compiled_errors(data, schema)
+
+
+# Values and target types of the clean_value cases (tests/unit/pages/test_upload.py),
+#  and other values whose coercion depends on Python's parsing or truthiness
+coercion_values = [
+    "1",
+    "1.0",
+    "1.1.1",
+    "[1, 2, 3]",
+    "[1]",
+    "[a]",
+    "[a, b, c]",
+    '["a", "b", "c"]',
+    "'a', 'b', 'c'",
+    "a, b, c",
+    "0",
+    0,
+    "False",
+    False,
+    " 2 ",
+    "",
+    "[]",
+    "[[1], 2]",
+    "nan",
+    "1.5e3",
+    "1e5",
+    "1_000",
+    "\u0663",
+    "99999999999999999999",
+    "TRUE",
+    "'",
+    None,
+    0.0,
+    float("nan"),
+    [],
+    ["a"],
+    np.int64(0),
+    "\ud800",
+]
+coercion_types = [
+    [None],
+    ["number"],
+    ["integer"],
+    ["array"],
+    ["number", "null"],
+    ["boolean", "null"],
+    ["integer", "null"],
+    ["array", "null"],
+    ["string", "number", "boolean", "array"],
+]
+
+
+def coerced(value):
+    # Value with its type (NaN compares equal to NaN)
+    if isinstance(value, list):
+        return "list", [coerced(v) for v in value]
+    if isinstance(value, float) and value != value:
+        return float, "nan"
+    return type(value), value
+
+
+@pytest.mark.parametrize("types", coercion_types)
+def test_coerce_column__matches_clean_value(types):
+    values = pd.Series(coercion_values * 3, dtype=object)
+    expected = [clean_value(v, "k", {"k": {"type": types}}) for v in values]
+    assert list(map(coerced, coerce_column(values, types))) == list(
+        map(coerced, expected)
+    )
+
+
+def test_clean_frame():
+    properties = {"n": {"type": "number"}, "a": {"type": ["array", "null"]}}
+    df = pd.DataFrame(
+        {"n": ["1", " 2.5 ", "x"], "a": ["[1, b]", "", "c"], "Row": [1, 2, 3]},
+        dtype=object,
+        index=[5, 6, 7],
+    )
+    cleaned = clean_frame(df, properties)
+    assert list(cleaned.index) == [5, 6, 7]
+    assert cleaned.to_dict("list") == {
+        "n": [1, 2.5, "x"],
+        "a": [[1, "b"], None, "c"],
+        "Row": [1, 2, 3],
+    }